@@ -0,0 +1,194 @@
+"""
+Batches in the background.
+
+Encoding and building the geometry of a large batch takes a while, so it
+runs in a worker thread. The nodes have to be created on the kernel thread
+though: the worker hands its results over in chunks, and a scheduler job
+(running in the main thread) turns every chunk into nodes. A batch can be
+cancelled, the worker stops before the next code.
+"""
+
+from collections import deque
+from itertools import count
+from threading import Condition, Event
+
+_job_numbers = count(1)
+
+
+class BatchJob:
+    """
+    Runs produce for every item in a worker thread and consume for the
+    results, a chunk at a time, in the scheduler.
+    """
+
+    def __init__(
+        self,
+        name,
+        items,
+        produce,
+        consume,
+        channel=None,
+        finish=None,
+        chunk_size=50,
+        progress_steps=10,
+        prepare=None,
+        max_pending=4,
+    ):
+        """
+        @param name: name of the thread and the scheduler job
+        @param items: list of work items or any iterable (e.g. a generator reading a file)
+        @param produce: function(item) -> result or None (skipped), runs in the worker
+        @param consume: function(list of results), runs in the main thread
+        @param channel: receives the progress messages
+        @param finish: function(cancelled, error) called in the main thread after
+            the last chunk, error is the exception that stopped the batch or None
+        @param chunk_size: maximum number of results handed over at once
+        @param progress_steps: number of progress messages during the run
+        @param prepare: function() called in the worker before the first item
+        @param max_pending: the worker waits while this many chunks are waiting for the scheduler
+        """
+        self.name = name
+        self.items = items
+        self.produce = produce
+        self.consume = consume
+        self.channel = channel
+        self.finish = finish
+        self.prepare = prepare
+        self.chunk_size = max(1, chunk_size)
+        self.total = len(items) if hasattr(items, "__len__") else None
+        if self.total is None:
+            self.progress_every = self.chunk_size
+        else:
+            self.progress_every = max(1, self.total // max(1, progress_steps))
+        self.max_pending = max(1, max_pending)
+        self.done = 0
+        self.error = None
+        self._cancel = Event()
+        self._finished = Event()
+        self._sync = False
+        self._space = Condition()
+        self._chunks = deque()
+        self._job = None
+        self._kernel = None
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    @property
+    def running(self):
+        return not self._finished.is_set() or bool(self._chunks)
+
+    def cancel(self):
+        """
+        Stops the worker before the next item, results already produced
+        are still turned into nodes.
+        """
+        self._cancel.set()
+        with self._space:
+            self._space.notify_all()
+
+    def start(self, kernel):
+        self._kernel = kernel
+        self._job = kernel.add_job(
+            self.deliver, name=self.name, interval=0.1, run_main=True
+        )
+        kernel.threaded(self.work, thread_name=self.name, daemon=True)
+
+    def run(self):
+        """
+        Runs the whole batch in the calling thread.
+        """
+        self._sync = True
+        try:
+            self.work()
+        finally:
+            self.deliver()
+
+    def work(self):
+        pending = []
+        try:
+            if self.prepare is not None:
+                self.prepare()
+            items = iter(self.items)
+            while not self._cancel.is_set():
+                try:
+                    item = next(items)
+                except StopIteration:
+                    break
+                except (OSError, ValueError) as e:
+                    # Reading the items failed (e.g. a job file), we stop there
+                    self.error = e
+                    break
+                result = self.produce(item)
+                self.done += 1
+                if result is not None:
+                    pending.append(result)
+                if len(pending) >= self.chunk_size:
+                    self._hand_over(pending)
+                    pending = []
+                if self.channel is not None and self.done % self.progress_every == 0:
+                    if self.total is None:
+                        self.channel(f"{self.name}: {self.done}")
+                    else:
+                        self.channel(f"{self.name}: {self.done}/{self.total}")
+        except Exception as e:
+            # Anything else is a bug: the results so far are delivered and
+            # finish reports it, then it is raised again
+            self.error = e
+            raise
+        finally:
+            self._hand_over(pending)
+            self._finished.set()
+
+    def _hand_over(self, results):
+        """
+        Queues results for the scheduler, waits while too many are queued,
+        so the memory used stays bounded however many items there are.
+        """
+        if not results:
+            return
+        if self._sync:
+            self.consume(results)
+            return
+        with self._space:
+            while len(self._chunks) >= self.max_pending and not self._cancel.is_set():
+                self._space.wait(0.5)
+            self._chunks.append(results)
+
+    def deliver(self, *args):
+        """
+        Scheduler job: creates the nodes of the chunks produced so far.
+        """
+        while True:
+            with self._space:
+                if not self._chunks:
+                    break
+                chunk = self._chunks.popleft()
+                self._space.notify_all()
+            self.consume(chunk)
+        if self._finished.is_set() and not self._chunks:
+            if self._kernel is not None and self._job is not None:
+                self._kernel.remove_job(self._job)
+                self._job = None
+            if self.finish is not None:
+                finish = self.finish
+                self.finish = None
+                finish(self.cancelled, self.error)
+
+
+def start_batch(kernel, job):
+    """
+    Starts a job in the background and registers it, so it can be cancelled.
+    Every job gets a name of its own, the kernel would wait for a running
+    thread of the same name.
+    """
+    jobs = kernel.lookup("barcode/jobs")
+    if jobs is None:
+        jobs = []
+        kernel.register("barcode/jobs", jobs)
+    jobs[:] = [other for other in jobs if other.running]
+    job.name = f"{job.name}-{next(_job_numbers)}"
+    jobs.append(job)
+    job.start(kernel)
+    return job
@@ -0,0 +1,123 @@
+"""
+Helper routines to create a whole batch of codes with one command.
+"""
+
+# The console takes unquoted commas for spaces between arguments, semicolons
+# are left alone. Commas still separate values inside double quotes.
+SEPARATORS = ";,"
+
+
+def serial_codes(template, start, end, step=1):
+    """
+    Creates the codes for a serial range.
+    If the template contains a %-format placeholder (e.g. 'A-%05d') the serial
+    number is formatted into it, otherwise it's appended to the template.
+    @param template: code template
+    @param start: first serial number
+    @param end: last serial number (inclusive)
+    @param step: increment, may be negative
+    @return: generator of codes
+    """
+    if step == 0:
+        raise ValueError("step may not be 0")
+    if end is None:
+        end = start
+    stop = end + 1 if step > 0 else end - 1
+    has_format = template is not None and "%" in template
+    for serial in range(start, stop, step):
+        if has_format:
+            yield template % serial
+        elif template:
+            yield f"{template}{serial}"
+        else:
+            yield str(serial)
+
+
+def split_list(text, separators=SEPARATORS):
+    """
+    Splits at any of the separators.
+    """
+    for separator in separators[1:]:
+        text = text.replace(separator, separators[0])
+    return text.split(separators[0])
+
+
+def code_list(text, separators=SEPARATORS):
+    """
+    Splits a list of codes, empty entries are ignored.
+    """
+    return [c.strip() for c in split_list(text, separators) if c.strip() != ""]
+
+
+def parse_pitch(pitch):
+    """
+    A pitch is either one length for both directions or 'dx;dy' (or 'dx,dy').
+    @return: tuple of (dx, dy) strings, either may be None if not given
+    """
+    if pitch is None or pitch == "":
+        return None, None
+    parts = split_list(pitch)
+    if len(parts) == 1:
+        return parts[0].strip(), parts[0].strip()
+    return parts[0].strip(), parts[1].strip()
+
+
+def grid_positions(count, columns, pitch_x, pitch_y, origin_x, origin_y):
+    """
+    Establishes the positions of count symbols in a grid, row by row.
+    @param count: number of symbols
+    @param columns: number of symbols per row
+    @param pitch_x: horizontal distance between two symbols
+    @param pitch_y: vertical distance between two rows
+    @param origin_x: x-position of the first symbol
+    @param origin_y: y-position of the first symbol
+    @return: generator of (x, y) tuples
+    """
+    if columns is None or columns < 1:
+        columns = 1
+    for idx in range(count):
+        row, col = divmod(idx, columns)
+        yield origin_x + col * pitch_x, origin_y + row * pitch_y
+
+
+def snake_order(count, columns):
+    """
+    The order to visit the symbols of a grid (see grid_positions) in:
+    every other row backwards, so the laser continues with the closest
+    symbol of the next row.
+    @param count: number of symbols
+    @param columns: number of symbols per row
+    @return: list of indices
+    """
+    if columns is None or columns < 1:
+        columns = 1
+    order = []
+    for row, first in enumerate(range(0, count, columns)):
+        indices = range(first, min(first + columns, count))
+        order.extend(reversed(indices) if row % 2 else indices)
+    return order
+
+
+def parallel_map(func, jobs, workers, chunksize=None):
+    """
+    Runs func for every job in a process pool and returns the results in
+    the order of jobs, so the outcome is deterministic regardless of the
+    number of workers. func must be importable by the worker processes.
+    @param func: module level function
+    @param jobs: list of arguments for func
+    @param workers: number of worker processes, less than 2 runs everything in this process
+    @param chunksize: number of jobs handed to a worker at once
+    @return: list of results
+    """
+    if workers is None or workers < 2 or len(jobs) < 2:
+        return [func(job) for job in jobs]
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    workers = min(workers, len(jobs))
+    if chunksize is None:
+        chunksize = max(1, len(jobs) // (4 * workers))
+    # spawn: forking a process with a running gui is asking for trouble
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        return list(executor.map(func, jobs, chunksize=chunksize))
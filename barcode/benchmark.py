@@ -0,0 +1,625 @@
+"""
+Benchmarks for the barcode and qrcode command.
+
+The commands run headless against a minimal stand-in of the meerk40t kernel
+and its elements service (see headless.py), so no gui (and no device) is
+involved. Every case is one command invocation with a cold geometry cache.
+We record the wall time (best of --repeat runs), the peak memory (measured
+in a separate run, tracemalloc slows everything down) and the number of
+created nodes and path segments.
+
+The results are written as json lines, one record per case, so two commits
+can be compared:
+
+    python -m barcode.benchmark --output before.jsonl
+    python -m barcode.benchmark --output after.jsonl
+    python -m barcode.benchmark --compare before.jsonl after.jsonl
+
+--startup measures what registering the plugin adds to the start of
+meerk40t, in a fresh interpreter. --insertion 500 compares the cost per
+node of inserting 500 codes as groups of rects into a real node tree,
+node by node (as it used to be) and in bulk. --clones 1000 places 1000
+copies of one qr code into a real node tree, every copy with a geometry of
+its own (as it used to be) and sharing one geometry. --roundtrip 100
+creates 100 random codes for every symbology and output mode (and as many
+qr codes), reads every one of them back (see verify.py) and reports the
+codes that don't match and the codes verified per second. --engine
+encodes a full qr code of every version with the native encoder and with
+the qrcode library, which is needed for this (and the tests) only.
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from .headless import StubElements, create_kernel, real_tree
+
+QR_LEVELS = ("L", "M", "Q", "H")
+BAR_MODES = ("path", "asgroup", "notext", "hatch", "image")
+QR_MODES = ("path", "outline", "hatch", "image")
+# Versions for a --quick run
+QUICK_VERSIONS = (1, 10, 25, 40)
+# Libraries that shouldn't be loaded just by registering the plugin
+HEAVY_MODULES = ("numpy", "barcode.writer", "PIL", "qrcode")
+# Fields that identify a case
+CASE_KEYS = ("command", "symbology", "payload", "version", "errcorr", "mode")
+
+
+def bar_payloads(btype):
+    """
+    Valid sample codes for a symbology: fixed length codes just have one,
+    variable length codes a short and a long one.
+    @return: list of (payload name, code)
+    """
+    from .linear import python_barcode
+
+    barcode = python_barcode()
+    digits = getattr(barcode.get_barcode_class(btype), "digits", 0)
+    if digits:
+        prefix = {"isbn": "978", "isbn13": "978", "gs1": "978", "isbn10": "3", "jan": "45"}
+        code = (prefix.get(btype, "") + "1234567890123")[:digits]
+        return [("fixed", code)]
+    numbers = "1234567890" * 4
+    text = "CODE-1234567890" * 3
+    if btype in ("codabar", "nw-7"):
+        return [("short", f"A{numbers[:8]}B"), ("long", f"A{numbers[:40]}B")]
+    if btype == "itf":
+        return [("short", numbers[:8]), ("long", numbers[:40])]
+    return [("short", text[:8]), ("long", text[:40])]
+
+
+def qr_payload(version, errcorr):
+    """
+    A text that fills a qr code of the given version (in byte mode).
+    """
+    from .qrengine import BIT_LIMIT_TABLE
+
+    length_bits = 8 if version < 10 else 16
+    count = (BIT_LIMIT_TABLE[errcorr][version] - 4 - length_bits) // 8
+    return ("abcdefghijklmnopqrstuvwxyz" * (count // 26 + 1))[:count]
+
+
+def measure(kernel, command, args, options, repeat):
+    """
+    Runs one case.
+    @return: dictionary with the measurements
+    """
+    best = None
+    for __ in range(repeat):
+        start = time.perf_counter()
+        nodes, messages = kernel.run(command, *args, **options)
+        wall = time.perf_counter() - start
+        if best is None or wall < best:
+            best = wall
+    tracemalloc.start()
+    kernel.run(command, *args, **options)
+    __, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "wall": best,
+        "peak_kib": peak / 1024,
+        "nodes": len(nodes),
+        "segments": sum(node.segments for node in nodes),
+        "messages": messages,
+    }
+
+
+def bar_cases():
+    from .linear import python_barcode
+
+    barcode = python_barcode()
+    for btype in barcode.PROVIDED_BARCODES:
+        for payload, code in bar_payloads(btype):
+            for mode in BAR_MODES:
+                options = {}
+                if mode in ("asgroup", "notext", "image"):
+                    options[mode] = True
+                elif mode == "hatch":
+                    options["hatch"] = "0.1mm"
+                case = {
+                    "command": "barcode",
+                    "symbology": btype,
+                    "payload": payload,
+                    "version": None,
+                    "errcorr": None,
+                    "mode": mode,
+                }
+                yield case, ("1cm", "1cm", "6cm", "2cm", btype, code), options
+
+
+def qr_cases(versions):
+    for version in versions:
+        for errcorr in QR_LEVELS:
+            code = qr_payload(version, errcorr)
+            for mode in QR_MODES:
+                options = {"errcorr": errcorr, "version": version}
+                if mode in ("outline", "image"):
+                    options[mode] = True
+                elif mode == "hatch":
+                    options["hatch"] = "0.1mm"
+                case = {
+                    "command": "qrcode",
+                    "symbology": "qr",
+                    "payload": len(code),
+                    "version": version,
+                    "errcorr": errcorr,
+                    "mode": mode,
+                }
+                yield case, ("1cm", "1cm", "5cm", code), options
+
+
+STARTUP_SCRIPT = """
+import json, sys, time
+import meerk40t.svgelements, meerk40t.core.units  # meerk40t has them loaded anyway
+before = set(sys.modules)
+start = time.perf_counter()
+from {package}.headless import create_kernel
+create_kernel()
+wall = time.perf_counter() - start
+loaded = [m for m in {heavy!r} if m in sys.modules and m not in before]
+print(json.dumps({{"command": "startup", "wall": wall, "loaded": loaded}}))
+"""
+
+
+def measure_startup(repeat=3):
+    """
+    Registers the plugin in fresh interpreters.
+    @return: record with the best wall time and the heavy libraries it loaded
+    """
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    script = STARTUP_SCRIPT.format(
+        package=os.path.basename(package_dir), heavy=HEAVY_MODULES
+    )
+    best = None
+    for __ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-c", script],
+            cwd=os.path.dirname(package_dir),
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        record = json.loads(result.stdout.strip().splitlines()[-1])
+        if best is None or record["wall"] < best["wall"]:
+            best = record
+    return best
+
+
+def measure_engine(versions=QUICK_VERSIONS, errcorr="M", repeat=3):
+    """
+    Encodes a full qr code of every version with the native encoder and,
+    if it's installed, with the qrcode library.
+    @return: one record per version, the times are the best of repeat runs
+    """
+    from .qrengine import encode
+
+    try:
+        import qrcode
+    except ImportError:
+        qrcode = None
+
+    def library(data, version):
+        level = getattr(qrcode.constants, f"ERROR_CORRECT_{errcorr}")
+        qr = qrcode.QRCode(version=version, error_correction=level)
+        qr.add_data(data)
+        qr.make(fit=False)
+        return qr.modules
+
+    def best(func, *args):
+        times = []
+        for __ in range(repeat):
+            start = time.perf_counter()
+            func(*args)
+            times.append(time.perf_counter() - start)
+        return min(times)
+
+    for version in versions:
+        data = qr_payload(version, errcorr)
+        native = best(encode, data, errcorr, version)
+        other = None if qrcode is None else best(library, data, version)
+        yield {
+            "command": "engine",
+            "version": version,
+            "errcorr": errcorr,
+            "native": native,
+            "library": other,
+            "speedup": None if other is None else other / native,
+        }
+
+
+def legacy_rect_nodes(branch, layout, offset_x, offset_y, scale):
+    """
+    How --asgroup inserted a code before the bulk insertion: every node on
+    its own, bars via an intermediate Rect, then moved into the group.
+    """
+    from meerk40t.svgelements import Color, Matrix, Rect
+
+    groupnode = branch.add(type="group", label="Barcode")
+    for x, y, wd, ht in layout.bars:
+        rect = Rect(
+            x=offset_x + scale * x,
+            y=offset_y + scale * y,
+            width=scale * wd,
+            height=scale * ht,
+        )
+        node = branch.add(shape=rect, type="elem rect")
+        node.stroke = None
+        node.fill = Color("black")
+        groupnode.append_child(node)
+    for text, x, y in layout.texts:
+        node = branch.add(
+            text=text,
+            matrix=Matrix(f"translate({offset_x + scale * x}, {offset_y + scale * y})"),
+            type="elem text",
+        )
+        node.stroke = None
+        node.fill = Color("black")
+        groupnode.append_child(node)
+
+
+def measure_insertion(count=200, repeat=3):
+    """
+    Inserts a batch of code128 as groups of rects into a real node tree,
+    the old way and with the bulk insertion of the barcode command.
+    @return: one record for each
+    """
+    from .linear import LayoutWriter, python_barcode
+
+    barcode = python_barcode()
+    codes = [f"CODE-{index:05d}" for index in range(count)]
+    barcode_class = barcode.get_barcode_class("code128")
+    layouts = [barcode_class(code, writer=LayoutWriter()).render({}) for code in codes]
+    kernel = create_kernel()
+    kernel.root.barcode_background = 0
+    stats = kernel.lookup("barcode/stats")
+    records = []
+    for mode in ("before", "after"):
+        best = None
+        for __ in range(repeat):
+            branch, listener = real_tree()
+            if mode == "before":
+                start = time.perf_counter()
+                for index, layout in enumerate(layouts):
+                    legacy_rect_nodes(branch, layout, 0, index * 1000, 100)
+                wall = time.perf_counter() - start
+            else:
+                kernel.elements = StubElements(kernel)
+                kernel.elements.elem_branch = branch
+                stats.reset()
+                kernel.commands["barcode"](
+                    "barcode",
+                    lambda message: None,
+                    kernel.translation,
+                    "1cm",
+                    "1cm",
+                    "6cm",
+                    "2cm",
+                    "code128",
+                    codes=",".join(codes),
+                    asgroup=True,
+                )
+                wall = stats.stages["nodes"][0]
+            if best is None or wall < best[0]:
+                best = wall, len(list(branch.flat())), listener.notifications
+        wall, nodes, notifications = best
+        records.append(
+            {
+                "command": "insertion",
+                "mode": mode,
+                "payload": count,
+                "wall": wall,
+                "nodes": nodes,
+                "per_node_us": wall * 1000000 / nodes,
+                "notifications": notifications,
+            }
+        )
+    return records
+
+
+def measure_clones(count=1000, repeat=3):
+    """
+    Places count copies of one qr code into a real node tree, the old way
+    (every node converts a copy of the path into a geometry of its own)
+    and with the shared geometry of the qrcode command.
+    @return: one record for each
+    """
+    from copy import copy
+
+    from meerk40t.svgelements import Matrix
+
+    from .geometry import symbol_path
+    from .qrencode import qr_symbol
+
+    code = "CALIBRATION-TARGET-0001"
+    kernel = create_kernel()
+    kernel.root.barcode_background = 0
+
+    def place(mode):
+        branch, listener = real_tree()
+        kernel.lookup("barcode/cache").clear()
+        kernel.lookup("barcode/geometries").clear()
+        start = time.perf_counter()
+        if mode == "before":
+            symbol = qr_symbol(code, "M", None, 10, 4)
+            path = symbol_path(symbol, fill="black", stroke=None)
+            for index in range(count):
+                branch.add(
+                    path=copy(path),
+                    matrix=Matrix(10, 0, 0, 10, index * 500, 0),
+                    type="elem path",
+                )
+        else:
+            kernel.elements = StubElements(kernel)
+            kernel.elements.elem_branch = branch
+            kernel.commands["qrcode"](
+                "qrcode",
+                lambda message: None,
+                kernel.translation,
+                "1cm",
+                "1cm",
+                "1cm",
+                code,
+                codes=",".join([code] * count),
+            )
+        return time.perf_counter() - start, branch
+
+    records = []
+    for mode in ("before", "after"):
+        wall = min(place(mode)[0] for __ in range(repeat))
+        # Memory in a separate run, tracemalloc slows everything down
+        tracemalloc.start()
+        __, branch = place(mode)
+        __, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        nodes = list(branch.flat(types=("elem path",)))
+        records.append(
+            {
+                "command": "clones",
+                "mode": mode,
+                "payload": count,
+                "wall": wall,
+                "peak_kib": peak / 1024,
+                "nodes": len(nodes),
+                "geometries": len({id(node.geometry) for node in nodes}),
+            }
+        )
+    return records
+
+
+# Code 128 text without the separator of --codes and wordlist patterns
+ROUNDTRIP_TEXT = "".join(chr(n) for n in range(32, 127) if chr(n) not in ",;{}%")
+ROUNDTRIP_QR = ROUNDTRIP_TEXT + "äöüßéñ€☃"
+
+
+def random_payload(btype, rng):
+    """
+    A random valid code for a symbology.
+    """
+    from .linear import python_barcode
+    from .validate import CODABAR_CHARS, CODE39_CHARS, check_barcode
+
+    barcode = python_barcode()
+    digits = getattr(barcode.get_barcode_class(btype), "digits", 0)
+    if digits:
+        prefix = {"isbn": "978", "isbn13": "978", "gs1": "978", "jan": "45"}.get(btype, "")
+        while True:
+            code = prefix + "".join(rng.choices("0123456789", k=digits - len(prefix)))
+            try:
+                # Some PZN numbers have no check digit
+                return check_barcode(btype, code)[0]
+            except ValueError:
+                pass
+    length = rng.randint(1, 20)
+    if btype in ("codabar", "nw-7"):
+        body = "".join(rng.choices(sorted(CODABAR_CHARS), k=length))
+        return rng.choice("ABCD") + body + rng.choice("ABCD")
+    if btype == "itf":
+        return "".join(rng.choices("0123456789", k=length))
+    if btype == "code39":
+        return "".join(rng.choices(sorted(CODE39_CHARS - {","}), k=length))
+    return "".join(rng.choices(ROUNDTRIP_TEXT, k=length))
+
+
+def roundtrip_cases(count, rng):
+    from .linear import python_barcode
+
+    barcode = python_barcode()
+    for btype in barcode.PROVIDED_BARCODES:
+        codes = [random_payload(btype, rng) for __ in range(count)]
+        for mode in BAR_MODES:
+            options = {"codes": ",".join(codes)}
+            if mode in ("asgroup", "notext", "image"):
+                options[mode] = True
+            elif mode == "hatch":
+                options["hatch"] = "0.1mm"
+            args = ("1cm", "1cm", "6cm", "2cm", btype, codes[0])
+            yield {"command": "barcode", "symbology": btype, "mode": mode}, args, options
+    codes = [
+        "".join(rng.choices(ROUNDTRIP_QR, k=rng.randint(1, 200))) for __ in range(count)
+    ]
+    for mode in QR_MODES:
+        options = {"codes": ",".join(codes), "errcorr": rng.choice(QR_LEVELS)}
+        if mode in ("outline", "image"):
+            options[mode] = True
+        elif mode == "hatch":
+            options["hatch"] = "0.1mm"
+        args = ("1cm", "1cm", "5cm", codes[0])
+        yield {"command": "qrcode", "symbology": "qr", "mode": mode}, args, options
+
+
+def measure_roundtrip(count=100, seed=None):
+    """
+    Creates count random codes for every symbology and mode and reads them
+    back.
+    @return: one record per symbology and mode, with the failed codes
+    """
+    from .verify import verify_code
+
+    rng = random.Random(seed)
+    kernel = create_kernel()
+    kernel.root.barcode_background = 0
+    records = []
+    for case, args, options in roundtrip_cases(count, rng):
+        nodes, messages = kernel.run(case["command"], *args, **options)
+        codes = [node for node in nodes if isinstance(getattr(node, "mkbarcode", None), dict)]
+        start = time.perf_counter()
+        failures = []
+        for node in codes:
+            reason = verify_code(node)
+            if reason is not None:
+                failures.append([node.mkbarcode["payload"], reason])
+        wall = time.perf_counter() - start
+        record = dict(case)
+        record.update(
+            {
+                "codes": len(codes),
+                "failed": len(failures),
+                "per_second": len(codes) / wall if wall else None,
+                "failures": failures[:5],
+            }
+        )
+        records.append(record)
+    return records
+
+
+def run_benchmarks(output, commands=("barcode", "qrcode"), quick=False, repeat=3):
+    """
+    Runs all cases and writes a json record per case to output.
+    """
+    kernel = create_kernel()
+    cases = []
+    if "barcode" in commands:
+        cases.extend(bar_cases())
+    if "qrcode" in commands:
+        cases.extend(qr_cases(QUICK_VERSIONS if quick else range(1, 41)))
+    for case, args, options in cases:
+        record = dict(case)
+        record.update(measure(kernel, case["command"], args, options, repeat))
+        output.write(json.dumps(record) + "\n")
+        output.flush()
+
+
+def load_records(filename):
+    records = {}
+    with open(filename) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                records[tuple(record.get(key) for key in CASE_KEYS)] = record
+    return records
+
+
+def compare(before_file, after_file, threshold=1.1, output=sys.stdout):
+    """
+    Lists the cases that got slower (or faster) by more than threshold.
+    @return: number of regressions
+    """
+    before = load_records(before_file)
+    after = load_records(after_file)
+    regressions = 0
+    total_before = 0
+    total_after = 0
+    for key, record in after.items():
+        old = before.get(key)
+        if old is None or not old["wall"]:
+            continue
+        total_before += old["wall"]
+        total_after += record["wall"]
+        ratio = record["wall"] / old["wall"]
+        label = " ".join(str(k) for k in key if k is not None)
+        if ratio > threshold:
+            regressions += 1
+            output.write(f"SLOWER {ratio:6.2f}x {label}\n")
+        elif ratio < 1 / threshold:
+            output.write(f"faster {ratio:6.2f}x {label}\n")
+        for field in ("nodes", "segments"):
+            if record[field] != old[field]:
+                output.write(f"{field} {old[field]} -> {record[field]}: {label}\n")
+    if total_before:
+        output.write(
+            f"Total: {total_before:.3f}s -> {total_after:.3f}s ({total_after / total_before:.2f}x)\n"
+        )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks for barcode and qrcode")
+    parser.add_argument("--output", "-o", help="json lines file (default: stdout)")
+    parser.add_argument(
+        "--only", choices=("barcode", "qrcode"), help="just benchmark one command"
+    )
+    parser.add_argument(
+        "--quick", action="store_true", help="qr versions 1, 10, 25 and 40 only"
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case")
+    parser.add_argument(
+        "--startup", action="store_true", help="just measure the plugin registration"
+    )
+    parser.add_argument(
+        "--insertion",
+        type=int,
+        metavar="CODES",
+        help="insertion cost per node for a batch of CODES rect groups, old and bulk",
+    )
+    parser.add_argument(
+        "--clones",
+        type=int,
+        metavar="COPIES",
+        help="time, memory and geometries for COPIES copies of one qr code, old and shared",
+    )
+    parser.add_argument(
+        "--roundtrip",
+        type=int,
+        metavar="CODES",
+        help="read back CODES random codes per symbology and mode, report the failures",
+    )
+    parser.add_argument("--seed", type=int, help="random seed for --roundtrip")
+    parser.add_argument(
+        "--engine",
+        action="store_true",
+        help="native qr encoder against the qrcode library (if installed)",
+    )
+    parser.add_argument(
+        "--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two result files"
+    )
+    args = parser.parse_args(argv)
+    if args.compare:
+        return 1 if compare(*args.compare) else 0
+    if args.insertion:
+        for record in measure_insertion(args.insertion, max(1, args.repeat)):
+            print(json.dumps(record))
+        return 0
+    if args.clones:
+        for record in measure_clones(args.clones, max(1, args.repeat)):
+            print(json.dumps(record))
+        return 0
+    if args.roundtrip:
+        failed = 0
+        for record in measure_roundtrip(args.roundtrip, args.seed):
+            failed += record["failed"]
+            print(json.dumps(record))
+        return 1 if failed else 0
+    if args.engine:
+        versions = QUICK_VERSIONS if args.quick else range(1, 41)
+        for record in measure_engine(versions, repeat=max(1, args.repeat)):
+            print(json.dumps(record))
+        return 0
+    if args.startup:
+        print(json.dumps(measure_startup(max(1, args.repeat))))
+        return 0
+    commands = (args.only,) if args.only else ("barcode", "qrcode")
+    if args.output:
+        with open(args.output, "w") as output:
+            run_benchmarks(output, commands, args.quick, max(1, args.repeat))
+    else:
+        run_benchmarks(sys.stdout, commands, args.quick, max(1, args.repeat))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
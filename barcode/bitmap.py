@@ -0,0 +1,64 @@
+"""
+1-bit images of barcodes for raster engraving.
+
+A vector code has to be rasterized by meerk40t before it can be burnt, for
+a large qr code that means filling thousands of subpaths. The module data
+is a bitmap already: every module becomes a block of whole pixels, and the
+pixels are whole laser steps. An image node whose matrix scales a pixel to
+exactly one raster step goes to the rasterizer without being resampled.
+"""
+
+import numpy as np
+
+UNITS_PER_INCH = 65535
+
+
+def pixel_size(dpi, step=None):
+    """
+    The size of a pixel at a resolution, snapped to whole laser steps.
+    @param dpi: requested resolution
+    @param step: size of a laser step in native units, None if unknown
+    @return: tuple (pixel size in native units, effective dpi)
+    """
+    pixel = UNITS_PER_INCH / dpi
+    if step:
+        pixel = max(1, round(pixel / step)) * step
+    return pixel, UNITS_PER_INCH / pixel
+
+
+def module_pixels(size, pixel):
+    """
+    @return: number of whole pixels for a length (at least one)
+    """
+    return max(1, round(size / pixel))
+
+
+def symbol_bitmap(symbol, module_x, module_y, guard_y=None):
+    """
+    Scales the modules of a Symbol up to blocks of whole pixels.
+    @param module_x: pixels per module horizontally
+    @param module_y: pixels per module row (the bar height of 1D codes)
+    @param guard_y: pixels of the guard bars of 1D codes, default module_y
+    @return: boolean array (height, width), True for dark pixels
+    """
+    modules = symbol.modules
+    guards = symbol.guard_modules
+    if guards is None or guard_y is None or guard_y <= module_y:
+        return np.repeat(np.repeat(modules, module_y, axis=0), module_x, axis=1)
+    # 1D code: the guards reach below the other bars
+    bars = np.repeat(modules[0], module_x)
+    longer = np.repeat(modules[0] & guards[0], module_x)
+    dark = np.empty((guard_y, bars.size), dtype=bool)
+    dark[:module_y] = bars
+    dark[module_y:] = longer
+    return dark
+
+
+def bitmap_image(dark):
+    """
+    @param dark: boolean array, True for dark pixels
+    @return: PIL image of mode '1', dark pixels black
+    """
+    from PIL import Image
+
+    return Image.fromarray(~dark)
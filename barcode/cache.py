@@ -0,0 +1,122 @@
+"""
+Geometry cache for barcodes.
+
+Encoding a code is by far the most expensive part of creating it, while
+identical codes are requested over and over again (fixture labels, reruns,
+the same code at different positions). So we keep the encoded symbols (see
+symbol.Symbol, a few bytes per module) of the last codes in a bounded LRU
+cache, a new instance of a cached code only needs its geometry and a
+placement matrix.
+
+A persistent store (see diskcache.DiskCache) can be attached as a second
+level: symbols missing in memory are looked up there, new ones are stored
+in both.
+"""
+
+from collections import OrderedDict
+from threading import Lock
+
+
+class GeometryCache:
+    """
+    Bounded least-recently-used cache with hit/miss counters.
+    A size of 0 disables caching.
+    """
+
+    def __init__(self, size=256, store=None):
+        """
+        @param size: maximum number of entries in memory
+        @param store: optional persistent second level with get, put, clear and __contains__
+        """
+        self._entries = OrderedDict()
+        self.store = store
+        self._lock = Lock()
+        self._size = max(0, int(size))
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        if key in self._entries:
+            return True
+        return self.store is not None and key in self.store
+
+    @property
+    def size(self):
+        return self._size
+
+    @size.setter
+    def size(self, value):
+        with self._lock:
+            self._size = max(0, int(value))
+            self._shrink()
+
+    def _shrink(self):
+        while len(self._entries) > self._size:
+            self._entries.popitem(last=False)
+
+    def get(self, key, default=None):
+        """
+        Returns the cached value for key and marks it as most recently used.
+        """
+        with self._lock:
+            try:
+                value = self._entries[key]
+            except KeyError:
+                value = None
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            self.misses += 1
+        if self.store is not None:
+            value = self.store.get(key)
+            if value is not None:
+                self._remember(key, value)
+                return value
+        return default
+
+    def _remember(self, key, value):
+        with self._lock:
+            if self._size == 0:
+                return
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            self._shrink()
+
+    def put(self, key, value):
+        self._remember(key, value)
+        if self.store is not None:
+            self.store.put(key, value)
+
+    def fetch(self, key, create):
+        """
+        Returns the cached value for key, if there is none create() is called
+        and its result is stored, unless it is None.
+        """
+        value = self.get(key)
+        if value is None:
+            value = create()
+            if value is not None:
+                self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+        if self.store is not None:
+            self.store.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "size": self._size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "ratio": self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,280 @@
+"""
+Persistent symbol cache.
+
+The same codes are engraved again after a restart (asset labels, reruns of
+a job), so the encoded symbols can be kept in a SQLite database in the
+MeerK40t work directory as well, as a second level below the GeometryCache.
+
+Every entry is keyed by the versions of the encoders and of the stored
+format too: a new version of python-barcode, of the qr engine or of the
+classes that are stored simply doesn't find the old entries, they are
+evicted eventually. An entry that can't be unpickled anyway counts as an
+error and a miss. The database is limited in size, the least recently
+used entries are removed first. SQLite takes care of concurrent access: two
+MeerK40t instances may use the same file, every thread has a connection of
+its own, and a cache that can't be read or written (locked for too long,
+read-only, damaged) just behaves like an empty one.
+"""
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+FILENAME = "barcode_cache.sqlite"
+
+# Eviction removes entries until the database is this fraction of its maximum size
+EVICT_TO = 0.8
+# The size is checked after this many writes
+CHECK_EVERY = 64
+# Hits are marked as used in batches of this many (and before an eviction)
+TOUCH_EVERY = 64
+# Version of what is stored (Symbol, LinearLayout): increase it whenever
+# their attributes change, so old entries aren't unpickled any more
+FORMAT_VERSION = 1
+
+
+def encoder_versions():
+    """
+    Versions of everything that decides what a code looks like.
+    @return: text to prefix the keys with
+    """
+    from importlib.metadata import PackageNotFoundError, version
+
+    from .qrengine import ENGINE_VERSION
+
+    try:
+        barcode_version = version("python-barcode")
+    except PackageNotFoundError:
+        barcode_version = "none"
+    return (
+        f"format={FORMAT_VERSION};qrengine={ENGINE_VERSION};"
+        f"python-barcode={barcode_version}"
+    )
+
+
+class DiskCache:
+    """
+    Key/value store in SQLite with least-recently-used eviction by size.
+    Keys are tuples of plain values, values anything that can be pickled.
+    """
+
+    def __init__(self, filename, max_bytes, namespace="", timeout=2.0):
+        """
+        @param filename: database file, created if needed
+        @param max_bytes: maximum size of the stored values
+        @param namespace: prefix of all keys (see encoder_versions)
+        @param timeout: seconds to wait for a lock held by another instance
+        """
+        self.filename = filename
+        self.max_bytes = max(0, int(max_bytes))
+        self.namespace = namespace
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._writes = 0
+        # key: time of the hits not written yet
+        self._used = {}
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            return connection
+        directory = os.path.dirname(self.filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(
+            self.filename, timeout=self.timeout, check_same_thread=False
+        )
+        # WAL: readers don't block the writer of the other instance
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        with connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS symbols ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+                "size INTEGER NOT NULL, used REAL NOT NULL)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS symbols_used ON symbols (used)"
+            )
+        self._local.connection = connection
+        with self._lock:
+            self._connections.append(connection)
+        return connection
+
+    def _key(self, key):
+        return f"{self.namespace}|{key!r}"
+
+    def get(self, key, default=None):
+        """
+        Returns the stored value for key and marks it as used (see touch).
+        """
+        if self.max_bytes == 0:
+            return default
+        db_key = self._key(key)
+        try:
+            row = (
+                self._connection()
+                .execute("SELECT value FROM symbols WHERE key = ?", (db_key,))
+                .fetchone()
+            )
+        except (sqlite3.Error, OSError):
+            self.errors += 1
+            return default
+        if row is None:
+            self.misses += 1
+            return default
+        try:
+            value = pickle.loads(row[0])
+        except Exception:
+            # Stale or damaged, whatever the unpickling raises
+            self.errors += 1
+            return default
+        self.hits += 1
+        with self._lock:
+            self._used[db_key] = time.time()
+            pending = len(self._used)
+        if pending >= TOUCH_EVERY:
+            self.touch()
+        return value
+
+    def touch(self):
+        """
+        Writes the times of the hits since the last call, in one transaction.
+        """
+        with self._lock:
+            used = self._used
+            self._used = {}
+        if not used:
+            return
+        try:
+            connection = self._connection()
+            with connection:
+                connection.executemany(
+                    "UPDATE symbols SET used = ? WHERE key = ?",
+                    [(when, db_key) for db_key, when in used.items()],
+                )
+        except (sqlite3.Error, OSError):
+            self.errors += 1
+
+    def __contains__(self, key):
+        if self.max_bytes == 0:
+            return False
+        try:
+            row = (
+                self._connection()
+                .execute("SELECT 1 FROM symbols WHERE key = ?", (self._key(key),))
+                .fetchone()
+            )
+        except (sqlite3.Error, OSError):
+            self.errors += 1
+            return False
+        return row is not None
+
+    def put(self, key, value):
+        if self.max_bytes == 0:
+            return
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(data) > self.max_bytes:
+            return
+        try:
+            connection = self._connection()
+            with connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO symbols (key, value, size, used) "
+                    "VALUES (?, ?, ?, ?)",
+                    (self._key(key), sqlite3.Binary(data), len(data), time.time()),
+                )
+            self._writes += 1
+            if self._writes % CHECK_EVERY == 0:
+                self.evict()
+        except (sqlite3.Error, OSError):
+            self.errors += 1
+
+    def evict(self):
+        """
+        Removes the least recently used entries while the stored values
+        exceed the maximum size (all instances share the limit).
+        """
+        self.touch()
+        try:
+            connection = self._connection()
+            with connection:
+                total = connection.execute(
+                    "SELECT COALESCE(SUM(size), 0) FROM symbols"
+                ).fetchone()[0]
+                if total <= self.max_bytes:
+                    return 0
+                removed = 0
+                target = self.max_bytes * EVICT_TO
+                rows = connection.execute(
+                    "SELECT key, size FROM symbols ORDER BY used"
+                ).fetchall()
+                keys = []
+                for key, size in rows:
+                    if total <= target:
+                        break
+                    keys.append((key,))
+                    total -= size
+                    removed += 1
+                connection.executemany("DELETE FROM symbols WHERE key = ?", keys)
+            return removed
+        except (sqlite3.Error, OSError):
+            self.errors += 1
+            return 0
+
+    def resize(self, max_bytes):
+        self.max_bytes = max(0, int(max_bytes))
+        if self.max_bytes:
+            self.evict()
+
+    def clear(self):
+        try:
+            connection = self._connection()
+            with connection:
+                connection.execute("DELETE FROM symbols")
+        except (sqlite3.Error, OSError):
+            self.errors += 1
+        with self._lock:
+            self._used = {}
+        self.hits = 0
+        self.misses = 0
+
+    def close(self):
+        self.touch()
+        with self._lock:
+            connections = self._connections
+            self._connections = []
+        for connection in connections:
+            try:
+                connection.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
+
+    def stats(self):
+        entries = 0
+        stored = 0
+        if self.max_bytes:
+            try:
+                entries, stored = (
+                    self._connection()
+                    .execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM symbols")
+                    .fetchone()
+                )
+            except (sqlite3.Error, OSError):
+                self.errors += 1
+        return {
+            "entries": entries,
+            "bytes": stored,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+        }
@@ -0,0 +1,404 @@
+"""
+Geometry generation for barcodes.
+
+The routines in here work directly on the module data of a code (a matrix of
+dark/light modules) and create the path segments for meerk40t, so there is no
+need to render an svg-string first and parse it back again.
+"""
+
+
+def module_runs(modules):
+    """
+    Establishes the horizontal runs of dark modules inside a module matrix.
+    @param modules: sequence of rows, every row being a sequence of truthy/falsy values
+    @return: generator of (row, first_column, last_column + 1) tuples
+    """
+    for row, line in enumerate(modules):
+        start = None
+        for col, dark in enumerate(line):
+            if dark:
+                if start is None:
+                    start = col
+            elif start is not None:
+                yield row, start, col
+                start = None
+        if start is not None:
+            yield row, start, len(line)
+
+
+def serpentine_rows(rects):
+    """
+    Orders rectangles given row by row (like matrix_rects) in serpentine
+    order: every other row runs from right to left, so the laser moves on
+    to the closest rectangle of the next row instead of back to the left.
+    @param rects: list of (x, y, width, height) tuples, row by row
+    @return: generator of (rect, backwards) tuples
+    """
+    from itertools import groupby
+
+    backwards = False
+    for __, row in groupby(rects, key=lambda rect: rect[1]):
+        row = list(row)
+        if backwards:
+            row.reverse()
+        for rect in row:
+            yield rect, backwards
+        backwards = not backwards
+
+
+def rect_segments(rects, serpentine=False):
+    """
+    Creates the closed path segments for a list of axis-aligned rectangles.
+    @param rects: iterable of (x, y, width, height) tuples
+    @param serpentine: emit the rows in serpentine order (see serpentine_rows),
+        rectangles of a backwards row start at their top right corner
+    @return: list of svgelements path segments
+    """
+    from meerk40t.svgelements import Close, Line, Move
+
+    if serpentine:
+        ordered = serpentine_rows(rects)
+    else:
+        ordered = ((rect, False) for rect in rects)
+    segments = []
+    last = None
+    for (x, y, wd, ht), backwards in ordered:
+        p0 = (x, y)
+        p1 = (x + wd, y)
+        p2 = (x + wd, y + ht)
+        p3 = (x, y + ht)
+        if backwards:
+            # Same orientation, just another start
+            p0, p1, p2, p3 = p1, p2, p3, p0
+        segments.append(Move(last, p0))
+        segments.append(Line(p0, p1))
+        segments.append(Line(p1, p2))
+        segments.append(Line(p2, p3))
+        segments.append(Close(p3, p0))
+        last = p0
+    return segments
+
+
+def matrix_rects(modules, offset_x, offset_y, module_size):
+    """
+    Converts a module matrix into rectangles in physical units. Neighbouring
+    dark modules in a row are combined into one rectangle.
+    @param modules: module matrix (rows of dark/light values), without quiet zone
+    @param offset_x: physical x-position of the top left module
+    @param offset_y: physical y-position of the top left module
+    @param module_size: physical size of one module
+    @return: list of (x, y, width, height) tuples
+    """
+    return [
+        (
+            offset_x + start * module_size,
+            offset_y + row * module_size,
+            (end - start) * module_size,
+            module_size,
+        )
+        for row, start, end in module_runs(modules)
+    ]
+
+
+def matrix_path(modules, offset_x, offset_y, module_size, **kwargs):
+    """
+    Creates a svgelements Path from a module matrix.
+    @param modules: module matrix (rows of dark/light values), without quiet zone
+    @param offset_x: physical x-position of the top left module
+    @param offset_y: physical y-position of the top left module
+    @param module_size: physical size of one module
+    @param kwargs: additional keywords handed over to Path (fill, stroke...)
+    @return: Path
+    """
+    from meerk40t.svgelements import Path
+
+    rects = matrix_rects(modules, offset_x, offset_y, module_size)
+    return Path(rect_segments(rects, serpentine=True), **kwargs)
+
+
+def module_contours(modules):
+    """
+    Traces the outlines of the connected dark areas of a module matrix.
+    Every contour runs with the dark modules on its right side, so outer
+    boundaries and holes have opposite orientations and the result fills
+    correctly with the nonzero (as well as the evenodd) rule.
+    Only corners are part of a contour, straight edges are merged.
+    @param modules: module matrix (rows of dark/light values), without quiet zone
+    @return: list of contours, every contour being a list of (x, y) corners in module units
+    """
+    import numpy as np
+
+    dark = np.asarray(modules, dtype=bool)
+    if dark.size == 0:
+        return []
+    dark = np.pad(dark, 1)
+    # Directed unit edges as (x0, y0) -> (x1, y1), keyed by their start point.
+    # Horizontal edges lie between a module and the one above it.
+    outgoing = {}
+
+    def add_edges(mask, start, end):
+        ys, xs = np.nonzero(mask)
+        for x, y in zip(xs.tolist(), ys.tolist()):
+            outgoing.setdefault((x + start[0], y + start[1]), []).append(
+                (x + end[0], y + end[1])
+            )
+
+    below = dark[1:, 1:-1]
+    above = dark[:-1, 1:-1]
+    add_edges(below & ~above, (0, 0), (1, 0))
+    add_edges(above & ~below, (1, 0), (0, 0))
+    # Vertical edges lie between a module and the one to its left
+    right = dark[1:-1, 1:]
+    left = dark[1:-1, :-1]
+    add_edges(left & ~right, (0, 0), (0, 1))
+    add_edges(right & ~left, (0, 1), (0, 0))
+
+    contours = []
+    while outgoing:
+        first = next(iter(outgoing))
+        contour = []
+        point = first
+        direction = None
+        while True:
+            targets = outgoing[point]
+            if len(targets) == 1 or direction is None:
+                target = targets.pop()
+            else:
+                # Two areas touch at a corner: turn right, so they stay apart
+                wanted = (point[0] - direction[1], point[1] + direction[0])
+                target = wanted if wanted in targets else targets[0]
+                targets.remove(target)
+            if not targets:
+                del outgoing[point]
+            new_direction = (target[0] - point[0], target[1] - point[1])
+            if new_direction != direction:
+                contour.append(point)
+                direction = new_direction
+            point = target
+            if point == first:
+                break
+        # The start point is no corner if the contour arrives straight at it
+        if (contour[1][0] == contour[0][0]) == (direction[0] == 0):
+            contour.pop(0)
+        contours.append(contour)
+    return contours
+
+
+def serpentine_contours(contours):
+    """
+    Orders contours for a short travel of the laser: rows of contours (by
+    their top edge) alternately from left to right and from right to left,
+    every contour starting at its corner closest to the end of the last one.
+    A contour is closed, so it ends where it started.
+    @param contours: list of lists of (x, y) corners as created by module_contours
+    @return: list of contours, the corners in the same orientation
+    """
+    rows = {}
+    for contour in contours:
+        top = min(y for __, y in contour)
+        left = min(x for x, __ in contour)
+        rows.setdefault(top, []).append((left, contour))
+    ordered = []
+    last = (0, 0)
+    backwards = False
+    for top in sorted(rows):
+        row = sorted(rows[top], key=lambda item: item[0], reverse=backwards)
+        for __, contour in row:
+            nearest = min(
+                range(len(contour)),
+                key=lambda idx: abs(contour[idx][0] - last[0])
+                + abs(contour[idx][1] - last[1]),
+            )
+            contour = contour[nearest:] + contour[:nearest]
+            ordered.append(contour)
+            last = contour[0]
+        backwards = not backwards
+    return ordered
+
+
+def contour_segments(contours, offset_x, offset_y, module_size):
+    """
+    Creates closed path segments for contours in module units.
+    @param contours: list of lists of (x, y) corners as created by module_contours
+    @return: list of svgelements path segments
+    """
+    from meerk40t.svgelements import Close, Line, Move
+
+    segments = []
+    last = None
+    for contour in contours:
+        points = [
+            (offset_x + x * module_size, offset_y + y * module_size)
+            for x, y in contour
+        ]
+        segments.append(Move(last, points[0]))
+        for p0, p1 in zip(points, points[1:]):
+            segments.append(Line(p0, p1))
+        segments.append(Close(points[-1], points[0]))
+        last = points[0]
+    return segments
+
+
+def outline_path(modules, offset_x, offset_y, module_size, **kwargs):
+    """
+    Creates a svgelements Path with the merged outlines of a module matrix,
+    a fraction of the segments of matrix_path for larger codes.
+    Parameters are the same as for matrix_path.
+    @return: Path
+    """
+    from meerk40t.svgelements import Path
+
+    contours = serpentine_contours(module_contours(modules))
+    return Path(contour_segments(contours, offset_x, offset_y, module_size), **kwargs)
+
+
+def _lines_per_band(size, spacing):
+    """
+    Number of hatch lines for a band of the given size, at least one so
+    even a band narrower than the line distance gets burned.
+    """
+    return max(1, int(round(size / spacing)))
+
+
+def hatch_lines(modules, spacing):
+    """
+    Establishes horizontal fill lines through the dark modules of a matrix.
+    Every row of modules gets the same number of evenly distributed lines
+    (the distance is adjusted slightly so they fit into a row), a line runs
+    along a whole run of dark modules. The direction alternates from line
+    to line, so the laser just moves on to the next line.
+    @param modules: module matrix (rows of dark/light values), without quiet zone
+    @param spacing: distance between two lines in module units
+    @return: list of ((x0, y0), (x1, y1)) lines in module units
+    """
+    rows = {}
+    for row, start, end in module_runs(modules):
+        rows.setdefault(row, []).append((start, end))
+    count = _lines_per_band(1, spacing)
+    lines = []
+    forward = True
+    for row in sorted(rows):
+        runs = rows[row]
+        for idx in range(count):
+            y = row + (idx + 0.5) / count
+            if forward:
+                lines.extend(((start, y), (end, y)) for start, end in runs)
+            else:
+                lines.extend(((end, y), (start, y)) for start, end in reversed(runs))
+            forward = not forward
+    return lines
+
+
+def bar_hatch_lines(bars, spacing):
+    """
+    Establishes vertical fill lines for the bars of a 1D code, every bar
+    gets evenly distributed lines with roughly the given distance and at
+    least one line. The direction alternates from line to line.
+    @param bars: list of (x, y, width, height) rectangles
+    @param spacing: distance between two lines, same unit as the bars
+    @return: list of ((x0, y0), (x1, y1)) lines
+    """
+    lines = []
+    downwards = True
+    for x, y, wd, ht in sorted(bars):
+        count = _lines_per_band(wd, spacing)
+        for idx in range(count):
+            lx = x + (idx + 0.5) * wd / count
+            if downwards:
+                lines.append(((lx, y), (lx, y + ht)))
+            else:
+                lines.append(((lx, y + ht), (lx, y)))
+            downwards = not downwards
+    return lines
+
+
+def line_segments(lines):
+    """
+    Creates open path segments for a list of lines.
+    @param lines: iterable of ((x0, y0), (x1, y1)) tuples
+    @return: list of svgelements path segments
+    """
+    from meerk40t.svgelements import Line, Move
+
+    segments = []
+    last = None
+    for p0, p1 in lines:
+        segments.append(Move(last, p0))
+        segments.append(Line(p0, p1))
+        last = p1
+    return segments
+
+
+def symbol_rects(symbol):
+    """
+    Rectangles of a Symbol in its own units. Neighbouring dark modules in a
+    row are combined, as long as they are of the same kind (guard or not).
+    @param symbol: Symbol
+    @return: list of (x, y, width, height) tuples
+    """
+    from itertools import groupby
+
+    mw = symbol.module_width
+    mh = symbol.module_height
+    modules = symbol.modules
+    guards = symbol.guard_modules
+    if guards is None:
+        return [
+            (start * mw, row * mh, (end - start) * mw, mh)
+            for row, start, end in module_runs(modules.tolist())
+        ]
+    heights = (0, mh, mh * symbol.guard_factor)
+    kinds = modules.astype(int) + (modules & guards)
+    rects = []
+    for row, line in enumerate(kinds.tolist()):
+        pos = 0
+        for kind, group in groupby(line):
+            count = sum(1 for __ in group)
+            if kind:
+                rects.append((pos * mw, row * mh, count * mw, heights[kind]))
+            pos += count
+    return rects
+
+
+def symbol_path(symbol, outline=False, **kwargs):
+    """
+    Creates a filled svgelements Path of a Symbol in its own units, the
+    subpaths in serpentine order (the bars of a 1D code from left to right).
+    @param outline: merge the dark areas into outlines (2D codes only)
+    @param kwargs: additional keywords handed over to Path (fill, stroke...)
+    @return: Path
+    """
+    from meerk40t.svgelements import Path
+
+    if outline and symbol.guards is None and symbol.module_width == symbol.module_height:
+        contours = serpentine_contours(module_contours(symbol.modules))
+        segments = contour_segments(contours, 0, 0, symbol.module_width)
+    else:
+        segments = rect_segments(symbol_rects(symbol), serpentine=True)
+    return Path(segments, **kwargs)
+
+
+def symbol_hatch_lines(symbol, spacing):
+    """
+    Fill lines of a Symbol in its own units: vertical lines through the bars
+    of a 1D code, horizontal lines through the rows of a 2D code.
+    @param spacing: distance between two lines
+    @return: list of ((x0, y0), (x1, y1)) lines
+    """
+    if symbol.rows == 1:
+        return bar_hatch_lines(symbol_rects(symbol), spacing)
+    mw = symbol.module_width
+    mh = symbol.module_height
+    return [
+        ((x0 * mw, y0 * mh), (x1 * mw, y1 * mh))
+        for (x0, y0), (x1, y1) in hatch_lines(symbol.modules.tolist(), spacing / mh)
+    ]
+
+
+def symbol_hatch_path(symbol, spacing, **kwargs):
+    """
+    Creates a Path with the fill lines of a Symbol, see symbol_hatch_lines.
+    """
+    from meerk40t.svgelements import Path
+
+    return Path(line_segments(symbol_hatch_lines(symbol, spacing)), **kwargs)
@@ -0,0 +1,158 @@
+"""
+Built-in single-stroke glyphs for the human readable text of 1D codes.
+
+A text node needs a font lookup and has to be rendered (or converted to
+outlines) for every label again. The glyphs in here are plain polylines,
+so the text becomes path geometry right away: every glyph is scaled once
+per size (and cached), a text is put together by translating the glyphs
+to their positions. A laser burns them as single lines, there is no fill.
+
+The glyphs are defined on a grid GRID_WIDTH wide and GRID_HEIGHT high,
+y pointing down and the baseline at GRID_HEIGHT. They cover the digits,
+the capital letters and the punctuation the human readable text of the
+supported symbologies uses.
+"""
+
+from functools import lru_cache
+
+GRID_WIDTH = 4
+GRID_HEIGHT = 6
+# Distance between two characters, in grid units
+GRID_ADVANCE = 5
+# Height of the capital letters relative to the font size
+CAP_HEIGHT = 0.7
+
+_O = ((1, 0), (3, 0), (4, 1), (4, 5), (3, 6), (1, 6), (0, 5), (0, 1), (1, 0))
+_P = ((0, 6), (0, 0), (3, 0), (4, 1), (4, 2), (3, 3), (0, 3))
+_S = (
+    (4, 1), (3, 0), (1, 0), (0, 1), (0, 2), (1, 3),
+    (3, 3), (4, 4), (4, 5), (3, 6), (1, 6), (0, 5),
+)
+
+GLYPHS = {
+    " ": (),
+    "0": (_O, ((4, 1), (0, 5))),
+    "1": (((1, 1), (2, 0), (2, 6)), ((1, 6), (3, 6))),
+    "2": (((0, 1), (1, 0), (3, 0), (4, 1), (4, 2), (0, 6), (4, 6)),),
+    "3": (((0, 0), (4, 0), (2, 2), (3, 2), (4, 3), (4, 5), (3, 6), (1, 6), (0, 5)),),
+    "4": (((3, 6), (3, 0), (0, 4), (4, 4)),),
+    "5": (((4, 0), (0, 0), (0, 2), (3, 2), (4, 3), (4, 5), (3, 6), (1, 6), (0, 5)),),
+    "6": (
+        ((3, 0), (1, 0), (0, 1), (0, 5), (1, 6), (3, 6), (4, 5), (4, 4), (3, 3), (0, 3)),
+    ),
+    "7": (((0, 0), (4, 0), (1, 6)),),
+    "8": (
+        (
+            (1, 3), (0, 2), (0, 1), (1, 0), (3, 0), (4, 1), (4, 2), (3, 3), (1, 3),
+            (0, 4), (0, 5), (1, 6), (3, 6), (4, 5), (4, 4), (3, 3),
+        ),
+    ),
+    "9": (
+        ((4, 3), (1, 3), (0, 2), (0, 1), (1, 0), (3, 0), (4, 1), (4, 5), (3, 6), (1, 6)),
+    ),
+    "A": (((0, 6), (0, 2), (2, 0), (4, 2), (4, 6)), ((0, 4), (4, 4))),
+    "B": (
+        ((0, 6), (0, 0), (3, 0), (4, 1), (4, 2), (3, 3), (0, 3)),
+        ((3, 3), (4, 4), (4, 5), (3, 6), (0, 6)),
+    ),
+    "C": (((4, 1), (3, 0), (1, 0), (0, 1), (0, 5), (1, 6), (3, 6), (4, 5)),),
+    "D": (((0, 0), (0, 6), (3, 6), (4, 5), (4, 1), (3, 0), (0, 0)),),
+    "E": (((4, 0), (0, 0), (0, 6), (4, 6)), ((0, 3), (3, 3))),
+    "F": (((4, 0), (0, 0), (0, 6)), ((0, 3), (3, 3))),
+    "G": (
+        ((4, 1), (3, 0), (1, 0), (0, 1), (0, 5), (1, 6), (3, 6), (4, 5), (4, 3), (2, 3)),
+    ),
+    "H": (((0, 0), (0, 6)), ((4, 0), (4, 6)), ((0, 3), (4, 3))),
+    "I": (((1, 0), (3, 0)), ((2, 0), (2, 6)), ((1, 6), (3, 6))),
+    "J": (((4, 0), (4, 5), (3, 6), (1, 6), (0, 5)),),
+    "K": (((0, 0), (0, 6)), ((4, 0), (0, 4)), ((1, 3), (4, 6))),
+    "L": (((0, 0), (0, 6), (4, 6)),),
+    "M": (((0, 6), (0, 0), (2, 3), (4, 0), (4, 6)),),
+    "N": (((0, 6), (0, 0), (4, 6), (4, 0)),),
+    "O": (_O,),
+    "P": (_P,),
+    "Q": (_O, ((2, 4), (4, 6))),
+    "R": (_P, ((2, 3), (4, 6))),
+    "S": (_S,),
+    "T": (((0, 0), (4, 0)), ((2, 0), (2, 6))),
+    "U": (((0, 0), (0, 5), (1, 6), (3, 6), (4, 5), (4, 0)),),
+    "V": (((0, 0), (2, 6), (4, 0)),),
+    "W": (((0, 0), (1, 6), (2, 3), (3, 6), (4, 0)),),
+    "X": (((0, 0), (4, 6)), ((4, 0), (0, 6))),
+    "Y": (((0, 0), (2, 3), (4, 0)), ((2, 3), (2, 6))),
+    "Z": (((0, 0), (4, 0), (0, 6), (4, 6)),),
+    "-": (((1, 3), (3, 3)),),
+    ".": (((1.5, 6), (2.5, 6)),),
+    "/": (((0, 6), (4, 0)),),
+    "+": (((2, 1.5), (2, 4.5)), ((0.5, 3), (3.5, 3))),
+    "$": (_S, ((2, -0.5), (2, 6.5))),
+    "%": (
+        ((0, 6), (4, 0)),
+        ((0, 0), (1, 0), (1, 1), (0, 1), (0, 0)),
+        ((3, 5), (4, 5), (4, 6), (3, 6), (3, 5)),
+    ),
+    ":": (((2, 1.5), (2, 2.5)), ((2, 4.5), (2, 5.5))),
+    "*": (((2, 1), (2, 5)), ((0.5, 2), (3.5, 4)), ((0.5, 4), (3.5, 2))),
+    "<": (((4, 0.5), (0, 3), (4, 5.5)),),
+    ">": (((0, 0.5), (4, 3), (0, 5.5)),),
+}
+
+
+def supported(text):
+    """
+    @return: True if there is a glyph for every character of text
+    """
+    return all(char in GLYPHS for char in text)
+
+
+@lru_cache(maxsize=512)
+def glyph_lines(char, height):
+    """
+    The polylines of a glyph scaled to a height of the capital letters,
+    relative to the left end of its baseline. Cached per size.
+    @return: tuple of polylines, every polyline a tuple of (x, y) points
+    """
+    scale = height / GRID_HEIGHT
+    return tuple(
+        tuple((x * scale, (y - GRID_HEIGHT) * scale) for x, y in line)
+        for line in GLYPHS[char]
+    )
+
+
+def text_width(text, height):
+    if not text:
+        return 0.0
+    return (GRID_ADVANCE * (len(text) - 1) + GRID_WIDTH) * height / GRID_HEIGHT
+
+
+def text_segments(text, x, y, height, anchor="middle"):
+    """
+    Puts the glyphs of a text together, by translation only.
+    @param x: position of the anchor point
+    @param y: position of the baseline
+    @param height: height of the capital letters
+    @param anchor: 'start', 'middle' or 'end', like the text anchor of svg
+    @return: list of svgelements path segments, None if a character has no glyph
+    """
+    from meerk40t.svgelements import Line, Move
+
+    if not supported(text):
+        return None
+    if anchor == "middle":
+        x -= text_width(text, height) / 2
+    elif anchor == "end":
+        x -= text_width(text, height)
+    advance = GRID_ADVANCE * height / GRID_HEIGHT
+    segments = []
+    last = None
+    for char in text:
+        for line in glyph_lines(char, height):
+            start = (x + line[0][0], y + line[0][1])
+            segments.append(Move(last, start))
+            last = start
+            for px, py in line[1:]:
+                point = (x + px, y + py)
+                segments.append(Line(last, point))
+                last = point
+        x += advance
+    return segments
@@ -0,0 +1,310 @@
+"""
+A headless stand-in of the meerk40t kernel and its elements service, just
+the part the commands of this plugin need, for the tests and the benchmark.
+The commands are collected instead of registered and called directly,
+signals are delivered right away and scheduled jobs run on request
+(run_jobs). real_tree() provides a real meerk40t node tree instead of the
+stub nodes.
+"""
+
+import os
+import tempfile
+import threading
+
+
+class StubNode:
+    def __init__(self, **kwargs):
+        self.parent = None
+        self.__dict__.update(kwargs)
+        if "shape" in kwargs and "matrix" not in kwargs:
+            self.matrix = kwargs["shape"].transform
+        elif kwargs.get("type") == "elem rect" and "matrix" not in kwargs:
+            from meerk40t.svgelements import Matrix
+
+            self.matrix = Matrix()
+        self.children = []
+
+    def append_child(self, node):
+        if node.parent is not None:
+            node.parent.children.remove(node)
+        self.children.append(node)
+        node.parent = self
+
+    def append_children(self, nodes, fast=False):
+        for node in nodes:
+            self.append_child(node)
+
+    def altered(self):
+        pass
+
+    def modified(self):
+        pass
+
+    def update(self, context):
+        pass
+
+    def remove_node(self):
+        if self.parent is not None:
+            self.parent.children.remove(self)
+            self.parent = None
+
+    @property
+    def segments(self):
+        path = getattr(self, "path", None)
+        if path is not None:
+            return len(path)
+        geometry = getattr(self, "geometry", None)
+        if geometry is not None:
+            return len(geometry.as_path())
+        if self.type == "elem rect":
+            # Move, three lines, close: same as a rect in a path
+            return 5
+        return 0
+
+
+class StubBranch(StubNode):
+    def __init__(self):
+        super().__init__(type="branch elems")
+
+    def create(self, type=None, **kwargs):
+        return StubNode(type=type, **kwargs)
+
+    def add(self, type=None, **kwargs):
+        node = self.create(type=type, **kwargs)
+        self.append_child(node)
+        return node
+
+    def flat(self, types=None):
+        """
+        All nodes below the branch, depth first.
+        """
+        nodes = []
+        stack = list(reversed(self.children))
+        while stack:
+            node = stack.pop()
+            if types is None or node.type in types:
+                nodes.append(node)
+            stack.extend(reversed(node.children))
+        return nodes
+
+
+class StubWordlist:
+    """
+    Static entries in values, counters advance every time they are used
+    (like meerk40t's wordlist counters) unless increment is False.
+    """
+
+    def __init__(self):
+        self.values = {}
+        self.counters = {}
+
+    def translate(self, text, increment=True):
+        for key, value in self.values.items():
+            text = text.replace(f"{{{key}}}", str(value))
+        for key, value in self.counters.items():
+            pattern = f"{{{key}}}"
+            if pattern in text:
+                text = text.replace(pattern, str(value))
+                if increment:
+                    self.counters[key] = value + 1
+        return text
+
+
+class StubElements:
+    """
+    Just the part of the elements service the commands need.
+    """
+
+    def __init__(self, kernel=None):
+        self.kernel = kernel
+        self.elem_branch = StubBranch()
+        self.mywordlist = StubWordlist()
+        self.signals = 0
+
+    def elems(self, emphasized=None):
+        return [
+            node
+            for node in self.elem_branch.flat()
+            if node.type.startswith("elem")
+            and (emphasized is None or getattr(node, "emphasized", False) == emphasized)
+        ]
+
+    def length(self, value):
+        from meerk40t.core.units import Length
+
+        return float(Length(value))
+
+    def length_x(self, value):
+        return self.length(value)
+
+    def length_y(self, value):
+        return self.length(value)
+
+    def stop_updates(self, source, stop_notify=False):
+        root = getattr(self.elem_branch, "_root", None)
+        if root is not None:
+            root.pause_notify = stop_notify
+
+    def resume_updates(self, source, force_an_update=True):
+        root = getattr(self.elem_branch, "_root", None)
+        if root is not None:
+            root.pause_notify = False
+        if force_an_update:
+            self.signal("tree_changed")
+
+    def signal(self, *args):
+        self.signals += 1
+        if self.kernel is not None:
+            self.kernel.signal(*args)
+
+
+class StubSettings:
+    def setting(self, setting_type, name, default):
+        if not hasattr(self, name):
+            setattr(self, name, setting_type(default))
+        return getattr(self, name)
+
+
+class StubKernel:
+    """
+    Collects the console commands instead of registering them.
+    """
+
+    def __init__(self):
+        self.elements = StubElements(self)
+        self.root = StubSettings()
+        self.current_directory = os.getcwd()
+        self.os_information = {"WORKDIR": tempfile.gettempdir()}
+        self.commands = {}
+        self.listeners = {}
+        self.jobs = {}
+        self.threads = []
+        self._registry = {}
+
+    @staticmethod
+    def translation(text):
+        return text
+
+    def register(self, path, obj):
+        self._registry[path] = obj
+
+    def lookup(self, path):
+        return self._registry.get(path)
+
+    def listen(self, signal, func, lifecycle_object=None):
+        self.listeners.setdefault(signal, []).append(func)
+
+    def signal(self, signal, *args):
+        """
+        Delivers a signal right away (meerk40t queues them).
+        """
+        for func in self.listeners.get(signal, ()):
+            func("stub", *args)
+
+    def threaded(self, func, *args, thread_name=None, daemon=False, **kwargs):
+        thread = threading.Thread(target=func, args=args, name=thread_name, daemon=daemon)
+        self.threads.append(thread)
+        thread.start()
+        return thread
+
+    def add_job(self, run, name=None, args=(), interval=1.0, times=None, run_main=False):
+        self.jobs[name] = run
+        return name
+
+    def remove_job(self, job):
+        self.jobs.pop(job, None)
+        return job
+
+    def run_jobs(self):
+        """
+        One pass of the scheduler.
+        """
+        for run in list(self.jobs.values()):
+            run()
+
+    def console_option(self, *args, **kwargs):
+        return lambda func: func
+
+    def console_argument(self, *args, **kwargs):
+        return lambda func: func
+
+    def console_command(self, name, **kwargs):
+        def decorator(func):
+            for alias in name if isinstance(name, tuple) else (name,):
+                self.commands[alias] = func
+            return func
+
+        return decorator
+
+    def run(self, command, *args, **kwargs):
+        """
+        Runs a command with a fresh set of elements.
+        @return: (list of created nodes, list of channel messages)
+        """
+        self.elements = StubElements(self)
+        for name in ("barcode/cache", "barcode/geometries"):
+            cache = self.lookup(name)
+            if cache is not None:
+                cache.clear()
+        messages = []
+        self.commands[command](command, messages.append, self.translation, *args, **kwargs)
+        return self.elements.elem_branch.flat(), messages
+
+
+def create_kernel(real_nodes=False):
+    """
+    A stub kernel with the commands of the plugin.
+    @param real_nodes: the codes are created in a real node tree (see real_tree)
+    """
+    from .main import (
+        register_bar_code_stuff,
+        register_cache_stuff,
+        register_edit_stuff,
+        register_job_stuff,
+        register_qr_code_stuff,
+        register_stats_stuff,
+    )
+
+    kernel = StubKernel()
+    register_cache_stuff(kernel)
+    register_stats_stuff(kernel)
+    register_job_stuff(kernel)
+    register_edit_stuff(kernel)
+    register_qr_code_stuff(kernel)
+    register_bar_code_stuff(kernel)
+    if real_nodes:
+        kernel.elements.elem_branch, __ = real_tree()
+    return kernel
+
+
+class TreeListener:
+    """
+    Stands in for the gui tree, which does some work for every notification.
+    """
+
+    def __init__(self):
+        self.notifications = 0
+
+    def notified(self, *args, **kwargs):
+        self.notifications += 1
+
+    node_created = notified
+    node_attached = notified
+    node_detached = notified
+    structure_changed = notified
+
+
+def real_tree():
+    """
+    A real meerk40t node tree with a listener.
+    @return: (element branch, listener)
+    """
+    from meerk40t.core.node.rootnode import RootNode
+
+    class Context:
+        _ = staticmethod(lambda text: text)
+
+    root = RootNode(Context())
+    listener = TreeListener()
+    root.listen(listener)
+    return root.get(type="branch elems"), listener
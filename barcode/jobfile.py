@@ -0,0 +1,126 @@
+"""
+Job files: one code per row, as exported by a production system.
+
+CSV files need a header line, JSONL files hold one object per line. Every
+row has the symbology ('qr' or a barcode type), the payload, the position
+and the size of one code, plus optional settings:
+
+    symbology,payload,x,y,width,height,errcorr
+    qr,SN-000001,10,10,20,,H
+    code128,SN-000001,40,10,50,15,
+
+Plain numbers are millimetres. The rows are streamed, a file is never
+read as a whole, and rows are numbered from 1 (header and blank lines
+don't count) so a run can be resumed with a given row.
+"""
+
+import csv
+import json
+import os
+
+# Column names we accept for every field
+FIELDS = {
+    "symbology": ("symbology", "type", "btype"),
+    "payload": ("payload", "code", "data", "text"),
+    "x": ("x", "x_pos"),
+    "y": ("y", "y_pos"),
+    "width": ("width", "size", "dim", "dimx"),
+    "height": ("height", "dimy"),
+}
+INT_OPTIONS = ("version", "boxsize", "border", "dpi")
+BOOL_OPTIONS = ("outline", "notext", "asgroup", "glyphs", "image")
+TEXT_OPTIONS = ("errcorr", "hatch")
+QR_NAMES = ("qr", "qrcode", "qr-code")
+JSON_EXTENSIONS = (".jsonl", ".ndjson", ".json")
+
+
+def read_rows(filename, start_row=1):
+    """
+    Streams the rows of a job file.
+    @param filename: csv or jsonl file (by extension)
+    @param start_row: first row to yield, the rows before are skipped
+    @return: generator of (row number, row), row is a dict (csv) or a line of json
+    """
+    is_json = os.path.splitext(filename)[1].lower() in JSON_EXTENSIONS
+    with open(filename, newline="", encoding="utf-8-sig") as f:
+        if is_json:
+            rows = (line for line in f if line.strip())
+        else:
+            rows = csv.DictReader(f)
+        for number, row in enumerate(rows, 1):
+            if number >= start_row:
+                yield number, row
+
+
+def length_text(value):
+    """
+    Lengths without a unit are millimetres.
+    """
+    text = str(value).strip()
+    try:
+        float(text)
+    except ValueError:
+        return text
+    return f"{text}mm"
+
+
+def parse_row(row):
+    """
+    Validates a row and brings it into a common form.
+    @param row: dict or line of json
+    @return: dict with command ('qrcode' or 'barcode'), symbology, payload,
+        x, y, width, height (lengths as text, height may be None) and the
+        options given
+    @raise ValueError: if the row is invalid
+    """
+    if isinstance(row, str):
+        try:
+            row = json.loads(row)
+        except ValueError:
+            raise ValueError("invalid json") from None
+    if not isinstance(row, dict):
+        raise ValueError("a row needs to be an object")
+    values = {}
+    for key, value in row.items():
+        if key is None or value is None:
+            continue
+        if isinstance(value, str):
+            value = value.strip()
+            if value == "":
+                continue
+        values[str(key).strip().lower()] = value
+    result = {}
+    for field, names in FIELDS.items():
+        value = None
+        for name in names:
+            if name in values:
+                value = values[name]
+                break
+        if value is None and field != "height":
+            raise ValueError(f"{field} is missing")
+        result[field] = value
+    symbology = str(result["symbology"]).lower()
+    result["symbology"] = symbology
+    result["command"] = "qrcode" if symbology in QR_NAMES else "barcode"
+    result["payload"] = str(result["payload"])
+    for field in ("x", "y", "width", "height"):
+        if result[field] is not None:
+            result[field] = length_text(result[field])
+    for option in INT_OPTIONS:
+        if option in values:
+            try:
+                result[option] = int(values[option])
+            except ValueError:
+                raise ValueError(f"{option} needs to be a number") from None
+    for option in BOOL_OPTIONS:
+        if option in values:
+            value = values[option]
+            if isinstance(value, str):
+                value = value.lower() in ("1", "true", "yes", "y", "x")
+            result[option] = bool(value)
+    for option in TEXT_OPTIONS:
+        if option in values:
+            result[option] = str(values[option])
+    if "hatch" in result:
+        result["hatch"] = length_text(result["hatch"])
+    return result
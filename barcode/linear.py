@@ -0,0 +1,207 @@
+"""
+Layout engine for 1D barcodes.
+
+python-barcode provides the module pattern of a code via build() (a string
+of '0', '1' and 'G' for guard modules) and the writer options (module width,
+font size etc.) via render(). We take both and turn the pattern into a
+Symbol, the text positions are established analytically in a single pass,
+there is no svg involved.
+"""
+
+import os
+import sys
+from itertools import groupby
+
+from .symbol import Symbol
+
+# Writer defaults as established by python-barcode's BaseWriter
+WRITER_DEFAULTS = {
+    "module_width": 0.2,
+    "module_height": 15.0,
+    "quiet_zone": 6.5,
+    "font_size": 10,
+    "text_distance": 5.0,
+    "text_line_distance": 1,
+    "center_text": True,
+    "guard_height_factor": 1.1,
+    "margin_top": 1,
+    "text": "",
+    "human": "",
+}
+
+
+_python_barcode = None
+
+
+def python_barcode():
+    """
+    The python-barcode package, imported on first use. This package may be
+    installed as 'barcode' as well and shadow it, python-barcode is then
+    loaded from its distribution, with its own modules in place of ours for
+    the time of the import.
+    @return: module
+    """
+    global _python_barcode
+    if _python_barcode is not None:
+        return _python_barcode
+    import barcode
+
+    if hasattr(barcode, "get_barcode_class"):
+        _python_barcode = barcode
+        return barcode
+    from importlib.metadata import distribution
+    from importlib.util import module_from_spec, spec_from_file_location
+
+    init = str(distribution("python-barcode").locate_file("barcode/__init__.py"))
+    spec = spec_from_file_location(
+        "barcode", init, submodule_search_locations=[os.path.dirname(init)]
+    )
+
+    def package_modules():
+        return [name for name in sys.modules if name.split(".")[0] == "barcode"]
+
+    shadowed = {name: sys.modules.pop(name) for name in package_modules()}
+    try:
+        module = module_from_spec(spec)
+        sys.modules["barcode"] = module
+        spec.loader.exec_module(module)
+    finally:
+        for name in package_modules():
+            del sys.modules[name]
+        sys.modules.update(shadowed)
+    _python_barcode = module
+    return module
+
+
+def pt2mm(pt):
+    return pt * 0.352777778
+
+
+class LinearLayout:
+    """
+    Geometry of a 1D barcode in mm. All coordinates are relative to
+    the top left corner of the first bar, so the quiet zone is not part of it.
+    """
+
+    def __init__(self):
+        # Modules from the first to the last bar, None if there are no bars
+        self.symbol = None
+        # list of (text, x, y), y is the baseline
+        self.texts = []
+        self.width = 0
+        self.height = 0
+        self.font_size = None
+        self.anchor = "middle"
+
+    @property
+    def bars(self):
+        """
+        list of (x, y, width, height)
+        """
+        if self.symbol is None:
+            return []
+        from .geometry import symbol_rects
+
+        return symbol_rects(self.symbol)
+
+
+class LayoutWriter:
+    """
+    Minimal stand-in for a python-barcode writer: the barcode class hands over
+    its writer options and the module pattern, we turn that into a LinearLayout.
+    Use it like any other writer: bcode_class(code, writer=LayoutWriter()).render()
+    """
+
+    def __init__(self):
+        self.options = dict(WRITER_DEFAULTS)
+
+    def set_options(self, options):
+        for key, value in options.items():
+            self.options[key.lstrip("_")] = value
+
+    def render(self, code):
+        if len(code) != 1:
+            raise NotImplementedError("Only one line of code is supported")
+        return linear_layout(code[0], self.options)
+
+
+def linear_layout(line, options=None):
+    """
+    Establishes bars and text positions of a module pattern.
+    @param line: module pattern, a string of '0', '1' and 'G'
+    @param options: writer options, missing values are taken from WRITER_DEFAULTS
+    @return: LinearLayout
+    """
+    opt = dict(WRITER_DEFAULTS)
+    if options is not None:
+        opt.update(options)
+    module_width = opt["module_width"]
+    module_height = opt["module_height"]
+    guard_factor = opt["guard_height_factor"]
+
+    layout = LinearLayout()
+    guard_start = []
+    guard_end = []
+    was_guard = False
+    first = None
+    last = None
+    pos = 0
+    for char, group in groupby(line):
+        count = sum(1 for __ in group)
+        if char != "0":
+            is_guard = char == "G"
+            if first is None:
+                first = pos
+            last = pos + count
+            if was_guard and not is_guard:
+                guard_end.append(pos)
+                was_guard = False
+            elif not was_guard and is_guard:
+                guard_start.append(pos)
+                was_guard = True
+            factor = guard_factor if is_guard else 1
+            layout.height = max(layout.height, module_height * factor)
+        pos += count
+    if line and line[-1] != "1":
+        guard_end.append(pos)
+    if first is None:
+        return layout
+    pattern = line[first:last]
+    layout.symbol = Symbol.from_modules(
+        [char != "0" for char in pattern],
+        guards=[char == "G" for char in pattern] if "G" in pattern else None,
+        module_width=module_width,
+        module_height=module_height,
+        guard_factor=guard_factor,
+        quiet_zone=opt["quiet_zone"] / module_width if module_width else 0,
+    )
+    layout.width = layout.symbol.width
+
+    text = opt["human"] if opt["human"] else opt["text"]
+    font_size = opt["font_size"]
+    if not text or not font_size:
+        return layout
+    layout.font_size = font_size
+    # Writer positions are relative to the start of the pattern,
+    # the first bar may be a couple of modules to the right.
+    shift = first * module_width
+    ypos = module_height
+    if not guard_start:
+        ypos += opt["text_distance"]
+        if opt["center_text"]:
+            xpos = pos * module_width / 2.0 - shift
+        else:
+            xpos = -shift
+        for subtext in text.split("\n"):
+            layout.texts.append((subtext, xpos, ypos))
+            ypos += pt2mm(font_size) + opt["text_line_distance"]
+    else:
+        xpositions = [-4 * module_width - shift]
+        guard_start.pop(0)
+        for s, e in zip(guard_start, guard_end):
+            xpositions.append((e + (s - e) / 2) * module_width - shift)
+        xpositions.append(guard_end[-1] * module_width + 4 * module_width - shift)
+        ypos += pt2mm(font_size)
+        for block, xpos in zip(text.split(" "), xpositions):
+            layout.texts.append((block, xpos, ypos))
+    return layout
@@ -1,3 +1,11 @@
+from contextlib import contextmanager
+from functools import lru_cache
+from importlib.util import find_spec
+from math import ceil, sqrt
+import os
+import re
+
+
 def module_plugin(module, lifecycle):
     """
     This plugin attaches to the module/wxMeerK40t for the opening and closing of the gui. If the gui is never
@@ -30,6 +38,229 @@ def invalidating_plugin(kernel, lifecycle):
         return True
 
 
+# The libraries the commands depend on: our qr encoder just needs numpy
+QR_LIBRARY = "numpy"
+BAR_LIBRARY = "barcode"
+# Resolution of image output without a device, meerk40t's default for images
+DEFAULT_IMAGE_DPI = 500
+
+
+def library_available(name):
+    """
+    Checks whether a library is installed without importing it.
+    """
+    try:
+        return find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def attach_nodes(parent, nodes):
+    """
+    Attaches newly created nodes to parent in one go: the tree gets a single
+    structure notification instead of one (or two) per node.
+    """
+    if not nodes:
+        return
+    if hasattr(parent, "append_children"):
+        parent.append_children(nodes, fast=True)
+    else:
+        for node in nodes:
+            parent.add_node(node)
+
+
+@contextmanager
+def paused_notifications(elements):
+    """
+    No tree notifications while the nodes of a batch are created and
+    attached, the tree is told to update once at the end.
+    """
+    if not hasattr(elements, "stop_updates"):
+        yield
+        return
+    elements.stop_updates("barcode", True)
+    try:
+        yield
+    finally:
+        elements.resume_updates("barcode")
+
+
+def shared_geometry(geometries, key, create):
+    """
+    The geometry of the path nodes showing a code: all nodes of the same
+    code (and output style) share one geometry, every node just has a
+    matrix of its own. The geometry is read-only. meerk40t gives an edited
+    node a new geometry instead of changing it in place, so an edited copy
+    gets a geometry of its own (copy-on-write), the other copies keep theirs.
+    @param geometries: GeometryCache of the shared geometries, None: no sharing
+    @param key: code and output style
+    @param create: function() -> svgelements Path of the code
+    @return: tuple (geometry, number of path segments)
+    """
+    from meerk40t.core.geomstr import Geomstr
+
+    def freeze():
+        path = create()
+        geometry = Geomstr.svg(path)
+        geometry.segments.flags.writeable = False
+        return geometry, len(path)
+
+    if geometries is None:
+        return freeze()
+    return geometries.fetch(key, freeze)
+
+
+def report_check(channel, _, notes, errors):
+    """
+    Reports the result of a batch validation (see validate.check_batch):
+    every corrected and every invalid code, with its reason.
+    @return: True if the batch can be created, i.e. no code is invalid
+    """
+    for index, code, text in notes + errors:
+        channel(
+            _("Code {index} ({code}): {text}").format(index=index + 1, code=code, text=text)
+        )
+    if errors:
+        channel(
+            _("Nothing created, {count} invalid codes").format(count=len(errors))
+        )
+        return False
+    return True
+
+
+def report_travel(kernel, channel, _, estimate):
+    """
+    Reports the estimated travel of the laser between the subpaths of the
+    codes created by a command (see travel.TravelEstimate), compared with
+    the raster order.
+    """
+    if not len(estimate):
+        return
+    mm = kernel.elements.length("1mm")
+    raster, created = estimate.result()
+    channel(
+        _(
+            "Estimated travel: {raster:.1f}mm in raster order, {created:.1f}mm as created"
+        ).format(raster=raster / mm, created=created / mm)
+    )
+
+
+def text_placeholders(elements, data):
+    """
+    The text nodes codes are created from (--fromtext): the piped ones, or
+    the selected ones if nothing is piped.
+    @return: tuple (list of (node, text, (x, y), (width, height)) with the
+        bounds in scene units, list of text nodes without bounds)
+    """
+    if data is None:
+        data = elements.elems(emphasized=True)
+    found = []
+    unsized = []
+    for node in data:
+        if node.type != "elem text":
+            continue
+        bounds = node.bounds
+        if bounds is None:
+            unsized.append(node)
+            continue
+        x0, y0, x1, y1 = bounds
+        found.append((node, node.text or "", (x0, y0), (x1 - x0, y1 - y0)))
+    return found, unsized
+
+
+def report_placeholders(channel, _, texts, unsized):
+    """
+    Reports the texts of a --fromtext batch that can't be used.
+    @return: True if there are texts to create codes from
+    """
+    for node in unsized:
+        channel(_("Text '{text}' has no size yet, skipped").format(text=node.text))
+    if not texts:
+        channel(_("No text elements selected"))
+        return False
+    return True
+
+
+def remove_placeholders(channel, _, texts, created):
+    """
+    Deletes the texts of a --fromtext batch (--remove), unless a text
+    didn't become a code: a placeholder isn't lost.
+    @param created: number of codes created from the texts
+    """
+    if created != len(texts):
+        channel(_("Not every text became a code, the texts are kept"))
+        return
+    for node, *__ in texts:
+        if node.parent is not None:
+            node.remove_node()
+
+
+def wordlist_state(wordlist, template):
+    """
+    The current values of the wordlist patterns a code template uses, without
+    advancing counters. Stored with a code: it is only rendered again when
+    one of them differs, a counter the code itself advanced doesn't count.
+    @return: dict pattern -> value, empty if the template has no patterns
+    """
+    return {
+        pattern: wordlist.translate(pattern, increment=False)
+        for pattern in set(re.findall(r"\{[^{}]+\}", template))
+    }
+
+
+def image_resolution(kernel, dpi=None):
+    """
+    The pixel size of image output. A pixel is a whole number of laser
+    steps, so the rasterizer can take the image as it is.
+    @param dpi: requested resolution, None: setting barcode_image_dpi,
+        0 is the native resolution of the device
+    @return: tuple (pixel size in native units, effective dpi)
+    """
+    from .bitmap import UNITS_PER_INCH, pixel_size
+
+    if dpi is None:
+        dpi = kernel.root.barcode_image_dpi
+    view = getattr(getattr(kernel, "device", None), "view", None)
+    step = getattr(view, "native_scale_x", None)
+    if not dpi:
+        if not step:
+            dpi = DEFAULT_IMAGE_DPI
+        else:
+            return step, UNITS_PER_INCH / step
+    return pixel_size(dpi, step)
+
+
+def shared_image(geometries, key, create):
+    """
+    The image of image nodes, shared like the geometry of path nodes (see
+    shared_geometry): meerk40t replaces the image of an edited node.
+    @param create: function() -> boolean array of the dark pixels
+    @return: PIL image
+    """
+    from .bitmap import bitmap_image
+
+    if geometries is None:
+        return bitmap_image(create())
+    return geometries.fetch(key, lambda: bitmap_image(create()))
+
+
+def image_node(branch, image, x, y, pixel, dpi, label):
+    """
+    Creates an image node (not attached yet) showing every pixel of the
+    image as one pixel of the given resolution, no dithering.
+    """
+    from meerk40t.svgelements import Matrix
+
+    return branch.create(
+        type="elem image",
+        image=image,
+        matrix=Matrix(pixel, 0, 0, pixel, x, y),
+        dpi=dpi,
+        dither=False,
+        label=label,
+    )
+
+
 def simple_plugin(kernel, lifecycle):
     """
     Simple plugin. Catches the lifecycle it needs registers some values.
@@ -41,24 +272,24 @@ def simple_plugin(kernel, lifecycle):
         """
         Register the barcodes we are able to create.
         """
-        has_qr_code_module = False
-        try:
-            import qrcode
-            has_qr_code_module = True
-        except ModuleNotFoundError:
-            pass
-
-        has_bar_code_module = False
-        try:
-            import barcode
-            has_bar_code_module = True
-        except ModuleNotFoundError:
-            pass
+        # We don't import anything yet, that's postponed until the first
+        # code gets created, so we don't slow down the start of meerk40t.
+        has_qr_code_module = library_available(QR_LIBRARY)
+        has_bar_code_module = library_available(BAR_LIBRARY)
 
+        if has_qr_code_module or has_bar_code_module:
+            register_cache_stuff(kernel)
+            register_stats_stuff(kernel)
+            register_job_stuff(kernel)
+            register_edit_stuff(kernel)
         if has_qr_code_module:
             register_qr_code_stuff(kernel)
         if has_bar_code_module:
             register_bar_code_stuff(kernel)
+    elif lifecycle == "shutdown":
+        cache = kernel.lookup("barcode/cache")
+        if cache is not None and cache.store is not None:
+            cache.store.close()
 
 
 def plugin(kernel, lifecycle):
@@ -111,15 +342,10 @@ def plugin(kernel, lifecycle):
         often useful if a plugin is only valid for a particular OS. For example `winsleep` serve no purpose for other
         operating systems, so it invalidates itself.
         """
-        try:
-            import qrcode
-            import qrcode.image.svg
-        except ImportError:
-            # print("Barcode plugin could not load because qrcode is not installed.")
+        if not library_available(QR_LIBRARY):
+            # print("Barcode plugin could not load because numpy is not installed.")
             return True
-        try:
-            import barcode
-        except ImportError:
+        if not library_available(BAR_LIBRARY):
             # print("Barcode plugin could not load because barcode is not installed.")
             return True
 
@@ -215,570 +441,2317 @@ def plugin(kernel, lifecycle):
         """
         pass
 
-def register_bar_code_stuff(kernel):
+def register_cache_stuff(kernel):
     """
-    We use the python-barcode library (https://github.com/WhyNotHugo/python-barcode)
+    The geometry cache is shared by the barcode and the qrcode command,
+    optionally backed by a persistent cache in the work directory.
     """
     _ = kernel.translation
-    _kernel = kernel
-    import barcode
-    from meerk40t.svgelements import Path, Matrix, Rect, Text, Color
+    from .cache import GeometryCache
+
+    kernel.root.setting(int, "barcode_cache_size", 256)
+    # Size of the persistent cache in MB, 0: no persistent cache
+    kernel.root.setting(int, "barcode_disk_cache", 0)
+    cache = GeometryCache(kernel.root.barcode_cache_size)
+    kernel.register("barcode/cache", cache)
+    # Path geometries shared by the nodes of identical codes, never persisted
+    geometries = GeometryCache(kernel.root.barcode_cache_size)
+    kernel.register("barcode/geometries", geometries)
+
+    def disk_store(megabytes):
+        """
+        Attaches (or with 0 detaches) the persistent cache.
+        """
+        from .diskcache import FILENAME, DiskCache, encoder_versions
+
+        max_bytes = megabytes * 1024 * 1024
+        if cache.store is not None:
+            if max_bytes:
+                cache.store.resize(max_bytes)
+                return
+            cache.store.close()
+            cache.store = None
+        if max_bytes:
+            cache.store = DiskCache(
+                os.path.join(kernel.os_information["WORKDIR"], FILENAME),
+                max_bytes,
+                encoder_versions(),
+            )
+
+    if kernel.root.barcode_disk_cache > 0:
+        disk_store(kernel.root.barcode_disk_cache)
+
+    @kernel.console_argument(
+        "action",
+        type=str,
+        help=_("'clear', 'size' or 'disk' (default: show statistics)"),
+    )
+    @kernel.console_argument(
+        "value", type=int, help=_("New cache size (entries, for 'disk' in MB)")
+    )
+    @kernel.console_command(
+        "barcode_cache",
+        help=_("Shows, resizes or clears the barcode geometry cache."),
+        input_type=None,
+        output_type=None,
+    )
+    def barcode_cache(command, channel, _, action=None, value=None, **kwargs):
+        if action is not None:
+            action = action.lower()
+        if action == "clear":
+            cache.clear()
+            geometries.clear()
+            channel(_("Barcode cache cleared"))
+        elif action == "size":
+            if value is None or value < 0:
+                channel(_("Please provide a valid size"))
+                return
+            cache.size = value
+            geometries.size = value
+            kernel.root.barcode_cache_size = value
+        elif action == "disk":
+            if value is None or value < 0:
+                channel(_("Please provide a valid size in MB, 0 disables it"))
+                return
+            disk_store(value)
+            kernel.root.barcode_disk_cache = value
+        elif action is not None:
+            channel(_("Unknown action, use 'clear', 'size' or 'disk'"))
+            return
+        stats = cache.stats()
+        channel(
+            _(
+                "Barcode cache: {entries}/{size} entries, {hits} hits, {misses} misses ({ratio:.1%})"
+            ).format(**stats)
+        )
+        if cache.store is not None:
+            stats = cache.store.stats()
+            stats["megabytes"] = stats["bytes"] / (1024 * 1024)
+            stats["max_megabytes"] = stats["max_bytes"] / (1024 * 1024)
+            channel(
+                _(
+                    "Persistent cache: {entries} entries, {megabytes:.1f}/{max_megabytes:.0f} MB, {hits} hits, {misses} misses, {errors} errors"
+                ).format(**stats)
+            )
+
+
+def register_stats_stuff(kernel):
+    """
+    Stage timings and counters, shared by the barcode and the qrcode command.
+    """
+    _ = kernel.translation
+    from .stats import Statistics
+
+    stats = Statistics()
+    kernel.register("barcode/stats", stats)
 
     @kernel.console_option(
-        "notext", "n", type=bool, action="store_true", help=_("suppress text display")
+        "keep", "k", type=bool, action="store_true", help=_("Don't reset the statistics")
+    )
+    @kernel.console_command(
+        ("barcode_stats", "barcode-stats"),
+        help=_("Shows (and resets) the timings of the barcode commands."),
+        input_type=None,
+        output_type=None,
+    )
+    def barcode_stats(command, channel, _, keep=None, **kwargs):
+        lines = stats.report()
+        if not lines:
+            channel(_("No barcodes created yet"))
+        for line in lines:
+            channel(line)
+        if not keep:
+            stats.reset()
+
+
+def register_job_stuff(kernel):
+    """
+    Large batches and job files run in the background, shared by the
+    barcode and the qrcode command.
+    """
+    _ = kernel.translation
+    from .background import BatchJob, start_batch
+    from .stats import Statistics
+
+    stats = kernel.lookup("barcode/stats")
+    if stats is None:
+        stats = Statistics()
+
+    # Batches with at least this many codes run in the background (0: never)
+    kernel.root.setting(int, "barcode_background", 200)
+    jobs = []
+    kernel.register("barcode/jobs", jobs)
+
+    @kernel.console_command(
+        ("barcode_cancel", "barcode-cancel"),
+        help=_("Stops the barcode batches running in the background."),
+        input_type=None,
+        output_type=None,
     )
+    def barcode_cancel(command, channel, _, **kwargs):
+        running = [job for job in jobs if job.running and not job.cancelled]
+        if not running:
+            channel(_("No batch running"))
+            return
+        for job in running:
+            job.cancel()
+            channel(
+                _("Cancelling {name} after {done} codes").format(
+                    name=job.name, done=job.done
+                )
+            )
+
     @kernel.console_option(
-        "asgroup",
-        "a",
+        "resume", "r", type=int, help=_("Start with this row (rows count from 1)")
+    )
+    @kernel.console_option(
+        "chunk", "c", type=int, help=_("Rows added to the tree at once (default 500)")
+    )
+    @kernel.console_option(
+        "wait", "w", type=bool, action="store_true", help=_("Don't run in the background")
+    )
+    @kernel.console_option(
+        "check",
         type=bool,
         action="store_true",
-        help=_("create a group of rects instead of a path"),
+        help=_("Check all rows first, create nothing if a row is invalid"),
     )
-    @kernel.console_argument("x_pos", type=str, help=_("X-Position of barcode"))
-    @kernel.console_argument("y_pos", type=str, help=_("Y-Position of barcode"))
-    @kernel.console_argument("dimx", type=str, help=_("Width of barcode, may be 'auto' to keep native width"))
-    @kernel.console_argument("dimy", type=str, help=_("Height of barcode, may be 'auto' to keep native height"))
-    @kernel.console_argument("btype", type=str, help=_("Barcode type"))
-    @kernel.console_argument("code", type=str, help=_("The code to process"))
+    @kernel.console_option(
+        "verify",
+        type=bool,
+        action="store_true",
+        help=_("Read every created code back and report the ones that don't match"),
+    )
+    @kernel.console_argument("filename", type=str, help=_("CSV or JSONL job file"))
     @kernel.console_command(
-        "barcode",
-        help=_("Creates a barcode."),
-        input_type=("elements", None),
-        output_type="elements",
+        ("barcode_job", "barcode-job"),
+        help=_("Creates the codes of a job file, one code per row."),
+        input_type=None,
+        output_type=None,
     )
-    def create_barcode(
+    def barcode_job(
         command,
         channel,
         _,
-        x_pos=None,
-        y_pos=None,
-        dimx=None,
-        dimy=None,
-        btype=None,
-        code=None,
-        notext=None,
-        asgroup=None,
-        data=None,
+        filename=None,
+        resume=None,
+        chunk=None,
+        wait=None,
+        check=None,
+        verify=None,
         **kwargs,
     ):
-        def poor_mans_svg_parser(svg_str, actionable):
-            origin_x = float("inf")
-            origin_y = float("inf")
-            maximum_height = 0
-            maximum_width = 0
-            if actionable:
-                # We run through it just to establish
-                # the maximum_width and maximum_height
-                (
-                    maximum_width,
-                    maximum_height,
-                    origin_x,
-                    origin_y,
-                ) = poor_mans_svg_parser(svg_str, False)
-                scale_x = 1
-                scale_y = 1
-                if dimx != "auto":
-                    if maximum_width - origin_x != 0:
-                        scale_x = elements.length_x(dimx) / (maximum_width - origin_x)
-                if dimy != "auto":
-                    if maximum_height - origin_y != 0:
-                        scale_y = elements.length_y(dimy) / (maximum_height - origin_y)
-                offset_x = elements.length_x(x_pos)
-                offset_y = elements.length_y(y_pos)
-            groupnode = None
-            barcodepath = None
-            pathcode = ""
-            data = []
-            pattern_rect = "<rect"
-            pattern_text = "<text"
-            pattern_group_start = "<g "
-            pattern_group_end = "</g>"
-            # A barcode just contains a couple of rects and
-            # a text inside a group, so no need to get overly fancy...
-            # print(svg_str)
-            svg_lines = svg_str.split("\r\n")
-            for line in svg_lines:
-                # print (f"{line}")
-                if pattern_rect in line:
-                    subpattern = (
-                        ('height="', "height"),
-                        ('width="', "width"),
-                        ('x="', "x"),
-                        ('y="', "y"),
-                        ('style="', ""),
+        """
+        Streams a CSV or JSONL file (see jobfile.py for the columns) row by
+        row: every row is validated and encoded in a worker thread, the
+        nodes are added to the tree a chunk of rows at a time. Only a few
+        chunks are in memory at any time, whatever the size of the file.
+        An interrupted job continues with --resume. Invalid rows are
+        reported and skipped, with --check the file is read twice: all
+        rows are checked (without encoding them) before the first code
+        gets created, so the job runs completely or not at all. With
+        --verify every created code is read back (see verify.py) and the
+        rows whose code doesn't match their payload are reported.
+        """
+        from .jobfile import parse_row, read_rows
+        from .verify import verify_code
+
+        elements = kernel.elements
+        if filename is None:
+            channel(_("Please provide a job file"))
+            return
+        filename = os.path.join(kernel.current_directory, filename)
+        if not os.path.isfile(filename):
+            channel(_("No such file."))
+            return
+        start_row = 1 if resume is None else max(1, resume)
+        last_row = start_row - 1
+        codes = 0
+        errors = 0
+        failed = 0
+        rejected = []
+
+        def encode_row(row, encode=True):
+            row = parse_row(row)
+            encoder = kernel.lookup(f"barcode/row/{row['command']}")
+            if encoder is None:
+                raise ValueError(
+                    _("Unsupported symbology: {symbology}").format(
+                        symbology=row["symbology"]
                     )
-                    line_items = line.strip().split(" ")
-                    elem = {
-                        "type": "elem rect",
-                        "x": None,
-                        "y": None,
-                        "width": None,
-                        "height": None,
-                        "fill": None,
-                        "stroke": None,
-                    }
-                    for idx, item in enumerate(line_items):
-                        for pattern in subpattern:
-                            if item.startswith(pattern[0]):
-                                content = item[len(pattern[0]) : -1]
-                                # print (f"Found '{content}' for '{pattern[0]}' in '{item}' --> {pattern[1]}")
-                                key = pattern[1]
-                                if key == "":
-                                    # Special case fill/stroke
-                                    if "fill:black" in content:
-                                        elem["fill"] = "black"
-                                    if "stroke:black" in content:
-                                        elem["stroke"] = "black"
-                                else:
-                                    elem[pattern[1]] = content
-                    # print (f"Line {line}")
-                    # print (f"Decoded {elem['type']}: x={elem['x']}, y={elem['y']}, w={elem['width']}, h={elem['height']}, stroke={elem['stroke']}, fill={elem['fill']}")
-                    if elem["x"] is None or elem["y"] is None:
-                        continue
-                    if actionable:
-                        this_x = offset_x + scale_x * (
-                            elements.length_x(elem["x"]) - origin_x
-                        )
-                        this_y = offset_y + scale_y * (
-                            elements.length_y(elem["y"]) - origin_y
-                        )
-                        this_wd = scale_x * elements.length_x(elem["width"])
-                        this_ht = scale_y * elements.length_y(elem["height"])
-                        if aspath:
-                            # barcodepath.move(this_x, this_y)
-                            # barcodepath.line(this_x + this_wd, this_y)
-                            # barcodepath.line(this_x + this_wd, this_y + this_ht)
-                            # barcodepath.line(this_x, this_y + this_ht)
-                            # barcodepath.line(this_x, this_y)
-                            # barcodepath.closed(relative=True)
-                            pathcode += f"M {this_x:.1f} {this_y:.1f} "
-                            pathcode += f"L {this_x + this_wd:.1f} {this_y:.1f} "
-                            pathcode += f"L {this_x + this_wd:.1f} {this_y + this_ht:.1f} "
-                            pathcode += f"L {this_x:.1f} {this_y + this_ht:.1f} "
-                            pathcode += f"L {this_x:.1f} {this_y:.1f} "
-                            pathcode += f"z "
-                        else:
-                            rect = Rect(
-                                x=this_x,
-                                y=this_y,
-                                width=this_wd,
-                                height=this_ht,
-                            )
-                            node = elements.elem_branch.add(
-                                shape=rect, type="elem rect"
-                            )
-                            node.stroke = (
-                                None
-                                if elem["stroke"] is None
-                                else Color(elem["stroke"])
-                            )
-                            node.fill = (
-                                None if elem["fill"] is None else Color(elem["fill"])
-                            )
-                            data.append(node)
-                            if groupnode is not None:
-                                groupnode.append_child(node)
-                    else:
-                        # just establish dimensions
-                        # print (f"check rect extent for x={elem['x']}, y={elem['y']}, wd={elem['width']}, ht={elem['height']}")
-                        this_extent_x = elements.length_x(elem["x"])
-                        this_extent_y = elements.length_y(elem["y"])
-                        this_extent_maxx = this_extent_x + elements.length_x(
-                            elem["width"]
-                        )
-                        this_extent_maxy = this_extent_y + elements.length_y(
-                            elem["height"]
+                )
+            return encoder(row, encode)
+
+        def check_rows():
+            """
+            --check: a first pass over the file, in the worker.
+            """
+            for number, row in read_rows(filename, start_row):
+                if job.cancelled:
+                    return
+                try:
+                    encode_row(row, False)
+                except ValueError as e:
+                    rejected.append(number)
+                    channel(_("Row {row}: {error}").format(row=number, error=e))
+            if rejected:
+                job.cancel()
+
+        def produce(item):
+            nonlocal last_row, errors
+            number, row = item
+            last_row = number
+            try:
+                return number, encode_row(row)
+            except ValueError as e:
+                errors += 1
+                channel(_("Row {row}: {error}").format(row=number, error=e))
+                return None
+
+        def check_codes(number, nodes):
+            nonlocal failed
+            for node in nodes:
+                if not isinstance(getattr(node, "mkbarcode", None), dict):
+                    continue
+                reason = verify_code(node)
+                if reason is not None:
+                    failed += 1
+                    channel(
+                        _("Row {row}: verification failed, {reason}").format(
+                            row=number, reason=reason
                         )
-                        origin_x = min(origin_x, this_extent_x)
-                        origin_y = min(origin_y, this_extent_y)
-                        maximum_width = max(maximum_width, this_extent_maxx)
-                        maximum_height = max(maximum_height, this_extent_maxy)
-                elif pattern_text in line:
-                    NATIVE_UNIT_PER_INCH = 65535
-                    DEFAULT_PPI = 96.0
-                    UNITS_PER_PIXEL = NATIVE_UNIT_PER_INCH / DEFAULT_PPI
-                    subpattern = (
-                        ('height="', "height"),
-                        ('width="', "width"),
-                        ('x="', "x"),
-                        ('y="', "y"),
-                        ('style="', ""),
-                    )
-                    stylepattern = (
-                        ("fill:", "fill"),
-                        ("font-size:", "size"),
-                        ("text-anchor:", "anchor"),
                     )
-                    elem = {
-                        "type": "elem text",
-                        "text": None,
-                        "x": None,
-                        "y": None,
-                        "size": None,
-                        "anchor": None,
-                        "fill": None,
-                        "stroke": None,
-                    }
-                    line_items = line.strip().split(" ")
-                    for idx, item in enumerate(line_items):
-                        for pattern in subpattern:
-                            if item.startswith(pattern[0]):
-                                content = item[len(pattern[0]) : -1]
-                                # print (f"Found '{content}' for '{pattern[0]}' in '{item}' --> {pattern[1]}")
-                                key = pattern[1]
-                                if key == "":
-                                    style_items = content.strip().split(";")
-                                    for sidx, sitem in enumerate(style_items):
-                                        # print(f"Styleitem: {sitem}")
-                                        if sitem.startswith('">'):
-                                            content = sitem[2:]
-                                            eidx = content.find("</text")
-                                            if eidx > 0:
-                                                content = content[:eidx]
-                                            elem["text"] = content
-                                            continue
-                                        for spattern in stylepattern:
-                                            if sitem.startswith(spattern[0]):
-                                                content = sitem[len(spattern[0]) :]
-                                                # print (f"Found '{content}' for '{pattern[0]}' in '{item}' --> {pattern[1]}")
-                                                key = spattern[1]
-                                                if key != "":
-                                                    elem[spattern[1]] = content
-                                else:
-                                    elem[pattern[1]] = content
-
-                    # print (f"Line {line}")
-                    # print (f"Decoded {elem['type']}: txt='{elem['text']}', x={elem['x']}, y={elem['y']}, anchor={elem['anchor']}, size={elem['size']}, stroke={elem['stroke']}, fill={elem['fill']}")
-                    if elem["x"] is None or elem["y"] is None:
-                        continue
-                    if actionable and not skiptext:
-                        this_x = offset_x + scale_x * (
-                            elements.length_x(elem["x"]) - origin_x
-                        )
-                        # Y is always too high - we compensate that by bringing it up
-                        #
-                        compensation = 0
-                        if elem["size"] is not None:
-                            if elem["size"].endswith("pt"):
-                                this_size = float(elem["size"][:-2])
-                            else:
-                                this_size = float(elem["size"])
-                            compensation = 1.25 * this_size * NATIVE_UNIT_PER_INCH / 72
-                        # print (f"Size: {this_size:.1f}, Compensation: {compensation:.1f}")
-                        this_y = offset_y - scale_y * compensation + scale_y * (
-                            elements.length_y(elem["y"]) - origin_y
-                        )
-                        node = elements.elem_branch.add(
-                            text=elem["text"],
-                            matrix=Matrix(
-                                f"translate({this_x}, {this_y}) scale({UNITS_PER_PIXEL})"
-                            ),
-                            anchor="start" if elem["anchor"] is None else elem["anchor"],
-                            type="elem text",
-                        )
-                        if elem["size"] is not None:
-                            font_size = int(this_size * min(scale_x, scale_y))
-                            if font_size <= 1:
-                                font_size = this_size
-                            node.font_size = font_size
-                        node.stroke = (
-                            None if elem["stroke"] is None else Color(elem["stroke"])
-                        )
-                        node.fill = (
-                            None if elem["fill"] is None else Color(elem["fill"])
-                        )
-                        data.append(node)
-                        if groupnode is not None:
-                            groupnode.append_child(node)
-                    else:
-                        # We establish dimensions, but we don't apply it
-                        # print (f"check text extent for x={elem['x']}, y={elem['y']}")
-                        this_extent_x = elements.length_x(elem["x"])
-                        this_extent_y = elements.length_y(elem["y"])
-                        # maximum_width = max(maximum_width, this_extent_x)
-                        # maximum_height = max(maximum_height, this_extent_y)
-                elif pattern_group_end in line:
-                    #  print (f"Group end: '{line}'")
-                    if actionable and aspath:
-                        # We need to close and add the path
-                        barcodepath = Path(
-                            fill=Color("black"),
-                            stroke=None,
-                            fillrule=0,  # FILLRULE_NONZERO,
-                            matrix=Matrix(),
-                        )
-                        barcodepath.parse(pathcode)
-                        node = elements.elem_branch.add(
-                            path=abs(barcodepath),
-                            stroke_width=0,
-                            stroke_scaled=False,
-                            type="elem path",
-                            fillrule=0,  # nonzero
-                            label=f"{btype}={code}",
-                        )
-                        node.matrix.post_translate(
-                            -node.bounds[0] + offset_x, -node.bounds[1] + offset_y
-                        )
-                        node.modified()
-                        node.stroke = (
-                            None if elem["stroke"] is None else Color(elem["stroke"])
-                        )
-                        node.fill = (
-                            None if elem["fill"] is None else Color(elem["fill"])
-                        )
-                        data.append(node)
-                        if groupnode is not None:
-                            groupnode.append_child(node)
-
-                    groupnode = None
-                elif pattern_group_start in line:
-                    # print(f"Group start: '{line}'")
-                    if actionable:
-                        if aspath:
-                            pathcode = ""
-                        if not skiptext:
-                            groupnode = elements.elem_branch.add(
-                                type="group",
-                                label=f"Barcode {btype}: {code}",
-                                id=f"{btype}",
-                            )
-                            data.append(groupnode)
-            return maximum_width, maximum_height, origin_x, origin_y
 
-        # ---------------------------------
+        def consume(results):
+            nonlocal codes
+            created = []
+            placed = []
+            with paused_notifications(elements):
+                with stats.stage("nodes"):
+                    for number, place in results:
+                        nodes = place()
+                        placed.append((number, nodes))
+                        created.extend(nodes)
+                    attach_nodes(
+                        elements.elem_branch,
+                        [node for node in created if node.parent is None],
+                    )
+            if verify:
+                with stats.stage("verify"):
+                    for number, nodes in placed:
+                        check_codes(number, nodes)
+            codes += len(results)
+            with stats.stage("signal"):
+                elements.signal("element_added", created)
 
-        elements = _kernel.elements
-        data = []
-        if code is not None:
-            code = elements.mywordlist.translate(code)
-        if btype is None:
-            btype = "ean14"
-        btype = btype.lower()
-        if (
-            x_pos is None
-            or y_pos is None
-            or dimx is None
-            or dimy is None
-            or code is None
-            or code == ""
-        ):
-            params = "barcode x_pos y_pos dimx dimy btype code"
-            channel(_("Please provide all parameters: {params}").format(params=params))
-            channel(
-                _("Supported formats: {all}").format(
-                    all=",".join(barcode.PROVIDED_BARCODES)
+        def finish(cancelled, error):
+            if error is not None:
+                channel(
+                    _("Job stopped by an error ({error}), {count} codes created").format(
+                        error=error, count=codes
+                    )
                 )
-            )
-            return
-        if btype not in barcode.PROVIDED_BARCODES:
-            channel(
-                _("Invalid format, supported: {all}").format(
-                    all=",".join(barcode.PROVIDED_BARCODES)
+            elif rejected:
+                channel(
+                    _("Nothing created, {count} invalid rows").format(count=len(rejected))
+                )
+            elif cancelled:
+                channel(
+                    _(
+                        "Stopped after row {row}, {count} codes created. Continue with --resume {next}"
+                    ).format(row=last_row, count=codes, next=last_row + 1)
+                )
+            else:
+                channel(
+                    _("Job done: {count} codes created, {errors} invalid rows").format(
+                        count=codes, errors=errors
+                    )
+                )
+            if verify and not rejected:
+                channel(
+                    _("{failed} of {count} codes failed verification").format(
+                        failed=failed, count=codes
+                    )
                 )
-            )
-            return
-        # Check lengths for validity
-        try:
-            if dimx != "auto":
-              __ = elements.length_x(dimx)
-            if dimy != "auto":
-              __ = elements.length_x(dimy)
-            __ = elements.length_x(x_pos)
-            __ = elements.length_y(y_pos)
-        except ValueError:
-            channel(_("Invalid dimensions provided"))
-            return
-        aspath = True
-        skiptext = False
-        if asgroup is not None:
-            aspath = False
-        if notext is not None:
-            skiptext = True
 
-        bcode_class = barcode.get_barcode_class(btype)
-        if hasattr(bcode_class, "digits"):
-            digits = getattr(bcode_class, "digits", 0)
-            if digits > 0:
-                while len(code) < digits:
-                    code = "0" + code
-        writer = barcode.writer.SVGWriter()
-        try:
-            my_barcode = bcode_class(code, writer=writer)
-        except:
-            channel(_("Invalid characters in barcode"))
+        job = BatchJob(
+            "barcode_job",
+            read_rows(filename, start_row),
+            produce,
+            consume,
+            channel,
+            finish,
+            chunk_size=500 if chunk is None else max(1, chunk),
+            prepare=check_rows if check else None,
+        )
+        if wait:
+            job.run()
             return
-        if hasattr(my_barcode, "build"):
-            my_barcode.build()
-        bytes_result = my_barcode.render()
-        result = bytes_result.decode("utf-8")
-        max_wd, max_ht, ox, oy = poor_mans_svg_parser(result, True)
-        elements.signal("element_added", data)
-        return "elements", data
+        channel(_("Processing the job in the background, barcode_cancel stops it"))
+        start_batch(kernel, job)
 
 
-def register_qr_code_stuff(kernel):
+def register_edit_stuff(kernel):
     """
-    We use the qrcode library (https://github.com/lincolnloop/python-qrcode)
+    The nodes created by the barcode and the qrcode command carry their
+    generation parameters (mkbarcode), so they can be changed afterwards:
+    by barcode_edit or by a change of the wordlist their template uses.
+    Both commands register a function that applies new parameters in place
+    under barcode/apply/<command>.
     """
     _ = kernel.translation
-    _kernel = kernel
-    import qrcode
-    import qrcode.image.svg
-    from meerk40t.svgelements import Path, Matrix
+    from meerk40t.svgelements import Matrix, Point
+    from .batch import parse_pitch
 
-    # QR-Code generation
+    def code_params(node):
+        params = getattr(node, "mkbarcode", None)
+        if isinstance(params, dict) and "command" in params:
+            return params
+        return None
+
+    def code_nodes(nodes):
+        """
+        @return: the nodes carrying the parameters of the codes the given nodes belong to
+        """
+        found = []
+        for node in nodes:
+            if code_params(node) is None:
+                node = node.parent
+                if node is None or code_params(node) is None:
+                    continue
+            if node not in found:
+                found.append(node)
+        return found
+
+    def regenerate(node, params):
+        apply = kernel.lookup(f"barcode/apply/{params['command']}")
+        if apply is None:
+            return False
+        return apply(node, params)
+
+    def code_origin(node):
+        """
+        The position of the upper left corner of a code (without quiet zone).
+        """
+        bars = node.children if node.type == "group" else [node]
+        for bar in bars:
+            if bar.type in ("elem path", "elem image"):
+                return bar.matrix.point_in_matrix_space(Point(0, 0))
+            if bar.type == "elem rect":
+                return bar.matrix.point_in_matrix_space(Point(*node.mkbarcode["origin"]))
+        return None
+
+    def on_wordlist(origin, *args):
+        elements = kernel.elements
+        updated = 0
+        for node in elements.elem_branch.flat(types=("group", "elem path", "elem image")):
+            params = code_params(node)
+            if params is None:
+                continue
+            state = wordlist_state(elements.mywordlist, params["template"])
+            if state == params.get("wordlist"):
+                # Unrelated entry, or a counter advanced by creating codes
+                continue
+            payload = elements.mywordlist.translate(params["template"], increment=False)
+            if payload == "":
+                continue
+            if payload == params["payload"]:
+                # Never modify the dictionary, copies of the node share it
+                node.mkbarcode = dict(params, wordlist=state)
+                continue
+            if regenerate(node, dict(params, payload=payload, wordlist=state)):
+                updated += 1
+        if updated:
+            elements.signal("refresh_scene", "Scene")
+
+    kernel.listen("wordlist", on_wordlist)
+    kernel.listen("wordlist_modified", on_wordlist)
+
+    @kernel.console_option("code", "c", type=str, help=_("New code (wordlist patterns allowed)"))
+    @kernel.console_option("width", type=str, help=_("New width (barcodes: may be 'auto')"))
+    @kernel.console_option("height", type=str, help=_("New height (barcodes: may be 'auto')"))
     @kernel.console_option(
-        "errcorr",
-        "e",
+        "position",
+        "p",
         type=str,
-        help=_("error correction, one of L (7%), M (15%), Q (25%), H (30%"),
+        help=_("Move the upper left corner to 'x;y' (or \"x,y\")"),
     )
-    @kernel.console_option("boxsize", "x", type=int, help=_("Boxsize (default 10)"))
-    @kernel.console_option("border", "b", type=int, help=_("Border around qr-code (default 4)"))
-    @kernel.console_option("version", "v", type=int, help=_("size (1..40)"))
-    @kernel.console_argument("x_pos", type=str, help=_("X-position of qr-code"))
-    @kernel.console_argument("y_pos", type=str, help=_("Y-position of qr-code"))
-    @kernel.console_argument("dim", type=str, help=_("Width/length of qr-code"))
-    @kernel.console_argument("code", type=str, help=_("Text to create qr-code from"))
+    @kernel.console_option("btype", "t", type=str, help=_("Barcode: new type"))
+    @kernel.console_option("errcorr", "e", type=str, help=_("QR: new error correction"))
+    @kernel.console_option("version", "v", type=int, help=_("QR: new size (1..40, 0 for auto)"))
+    @kernel.console_option("border", "b", type=int, help=_("QR: new border"))
     @kernel.console_command(
-        "qrcode",
-        help=_("Creates a qr code."),
-        input_type=("elements", None),
+        ("barcode_edit", "barcode-edit"),
+        help=_("Changes the parameters of the selected barcodes and qr codes."),
+        input_type=(None, "elements"),
         output_type="elements",
     )
-    def create_qr(
+    def barcode_edit(
         command,
         channel,
         _,
-        x_pos=None,
+        code=None,
+        width=None,
+        height=None,
+        position=None,
+        btype=None,
+        errcorr=None,
+        version=None,
+        border=None,
+        data=None,
+        **kwargs,
+    ):
+        """
+        Changes any generation parameter of all selected codes at once.
+        Codes are only encoded again if their payload or encoding changed,
+        a new size or position is just a new matrix.
+        """
+        elements = kernel.elements
+        if data is None:
+            data = list(elements.elems(emphasized=True))
+        nodes = code_nodes(data)
+        if not nodes:
+            channel(_("No barcodes selected"))
+            return
+        pos_x, pos_y = parse_pitch(position)
+        try:
+            for length in (width, height):
+                if length is not None and length != "auto":
+                    elements.length(length)
+            if pos_x is not None:
+                pos_x = elements.length_x(pos_x)
+                pos_y = elements.length_y(pos_y)
+        except ValueError:
+            channel(_("Invalid dimensions provided"))
+            return
+        if errcorr is not None:
+            errcorr = errcorr.upper()
+            if errcorr not in ("L", "M", "Q", "H"):
+                channel(_("Invalid error correction, use one of L, M, Q, H"))
+                return
+        if version is not None and not 0 <= version <= 40:
+            channel(_("Invalid version, use 1..40 (0 for auto)"))
+            return
+        if btype is not None:
+            btype = btype.lower()
+        if border is not None:
+            border = max(4, border)
+        updated = 0
+        for node in nodes:
+            old = node.mkbarcode
+            params = dict(old)
+            if code is not None:
+                params["template"] = code
+                params["payload"] = elements.mywordlist.translate(code, increment=False)
+                params["wordlist"] = wordlist_state(elements.mywordlist, code)
+            if params["command"] == "qrcode":
+                size = width if width is not None else height
+                if size is not None and size != "auto":
+                    params["dim"] = elements.length(size)
+                if errcorr is not None:
+                    params["errcorr"] = errcorr
+                if version is not None:
+                    params["version"] = version if version > 0 else None
+                if border is not None:
+                    params["border"] = border
+            else:
+                if width is not None:
+                    params["dimx"] = width
+                if height is not None:
+                    params["dimy"] = height
+                if btype is not None:
+                    params["btype"] = btype
+            if params != old:
+                if not regenerate(node, params):
+                    channel(
+                        _("Could not apply the changes to {label}").format(
+                            label=node.label
+                        )
+                    )
+                    continue
+            if pos_x is not None:
+                origin = code_origin(node)
+                if origin is not None:
+                    move = Matrix(1, 0, 0, 1, pos_x - origin.x, pos_y - origin.y)
+                    for child in [node] + list(node.children):
+                        if child.type != "group":
+                            child.matrix = child.matrix * move
+                            child.modified()
+            updated += 1
+        channel(_("Updated {count} codes").format(count=updated))
+        elements.signal("refresh_scene", "Scene")
+        return "elements", nodes
+
+    @kernel.console_command(
+        ("barcode_verify", "barcode-verify"),
+        help=_(
+            "Reads the selected codes (default: all codes) back and compares them with their payload."
+        ),
+        input_type=(None, "elements"),
+        output_type="elements",
+    )
+    def barcode_verify(command, channel, _, data=None, **kwargs):
+        """
+        Rasterizes every code and decodes it again (see verify.py), the
+        codes that don't read as their payload are reported and passed on,
+        e.g. to select them.
+        """
+        from time import perf_counter
+
+        from .verify import verify_code
+
+        elements = kernel.elements
+        if data is None:
+            data = list(elements.elems(emphasized=True))
+            if not data:
+                data = list(
+                    elements.elem_branch.flat(types=("group", "elem path", "elem image"))
+                )
+        nodes = code_nodes(data)
+        if not nodes:
+            channel(_("No barcodes found"))
+            return
+        start = perf_counter()
+        failed = []
+        for node in nodes:
+            reason = verify_code(node)
+            if reason is not None:
+                failed.append(node)
+                channel(_("{label}: {reason}").format(label=node.label, reason=reason))
+        channel(
+            _("Verified {count} codes in {seconds:.2f}s, {failed} failed").format(
+                count=len(nodes), seconds=perf_counter() - start, failed=len(failed)
+            )
+        )
+        return "elements", failed
+
+
+def register_bar_code_stuff(kernel):
+    """
+    We use the python-barcode library (https://github.com/WhyNotHugo/python-barcode)
+    """
+    _ = kernel.translation
+    _kernel = kernel
+    from meerk40t.svgelements import Path, Matrix, Rect, Color
+    from .background import BatchJob, start_batch
+    from .batch import code_list, grid_positions, parse_pitch, serial_codes
+    from .geometry import symbol_hatch_path, symbol_path
+    from .stats import Statistics, profiled
+    from .travel import TravelEstimate, grid_order
+    from .validate import check_barcode, check_batch
+
+    stats = kernel.lookup("barcode/stats")
+    if stats is None:
+        stats = Statistics()
+
+    NATIVE_UNIT_PER_INCH = 65535
+    DEFAULT_PPI = 96.0
+    UNITS_PER_PIXEL = NATIVE_UNIT_PER_INCH / DEFAULT_PPI
+    # Copying a Color is much cheaper than parsing one for every bar
+    BLACK = Color("black")
+
+    # python-barcode (and pillow with it) is imported on first use only
+    @lru_cache(maxsize=None)
+    def provided_barcodes():
+        from .linear import python_barcode
+
+        return tuple(python_barcode().PROVIDED_BARCODES)
+
+    @lru_cache(maxsize=None)
+    def barcode_class(btype):
+        from .linear import python_barcode
+
+        return python_barcode().get_barcode_class(btype)
+
+    def barcode_layout(btype, code):
+        """
+        Encodes a code and establishes the layout of bars and text.
+        We don't need an svg, the writer hands us the module pattern
+        and the writer options, everything else is established analytically.
+        The layout (with the bit-packed symbol of the bars) is cached.
+        @return: tuple (code, layout), layout is None if the code is invalid
+        """
+        from .linear import LayoutWriter, python_barcode
+
+        BarcodeError = python_barcode().errors.BarcodeError
+
+        bcode_class = barcode_class(btype)
+        digits = getattr(bcode_class, "digits", 0)
+        if digits > 0:
+            code = code.rjust(digits, "0")
+
+        def create():
+            with stats.stage("encode"):
+                try:
+                    my_barcode = bcode_class(code, writer=LayoutWriter())
+                except (BarcodeError, ValueError):
+                    return None
+                # ITF insists on the writer options as positional argument
+                return my_barcode.render({})
+
+        cache = _kernel.lookup("barcode/cache")
+        if cache is None:
+            return code, create()
+        return code, cache.fetch((btype, code), create)
+
+    def barcode_scale(layout, dimx, dimy):
+        """
+        The layout is in mm, so we just need to establish
+        the native units per mm in both directions
+        """
+        elements = _kernel.elements
+        mm = elements.length("1mm")
+        scale_x = mm
+        scale_y = mm
+        if dimx != "auto" and layout.width != 0:
+            scale_x = elements.length_x(dimx) / layout.width
+        if dimy != "auto" and layout.height != 0:
+            scale_y = elements.length_y(dimy) / layout.height
+        return scale_x, scale_y
+
+    def barcode_geometry(layout, aspath, hatch, scale_x):
+        """
+        Creates the path of the bars from the symbol of a layout, in mm
+        like the layout, or with hatch the vertical fill lines.
+        @return: Path or None if the bars become rects
+        """
+        if layout.symbol is None:
+            return Path()
+        if hatch is not None:
+            return symbol_hatch_path(layout.symbol, hatch / scale_x)
+        if aspath:
+            return symbol_path(
+                layout.symbol,
+                fill=Color("black"),
+                stroke=None,
+                fillrule=0,  # FILLRULE_NONZERO
+            )
+        return None
+
+    def bar_geometry(btype, code, layout, aspath, hatch, scale_x):
+        """
+        The shared geometry of the bars (see shared_geometry).
+        @return: tuple (geometry, number of segments), (None, 0) if the bars become rects
+        """
+        if hatch is None and not aspath:
+            return None, 0
+        if hatch is None:
+            key = ("bars", btype, code, "path")
+        else:
+            key = ("bars", btype, code, "hatch", hatch / scale_x)
+        return shared_geometry(
+            _kernel.lookup("barcode/geometries"),
+            key,
+            lambda: barcode_geometry(layout, aspath, hatch, scale_x),
+        )
+
+    def bar_image(btype, code, layout, scale_x, scale_y, pixel):
+        """
+        The shared 1-bit image of the bars, every module a block of whole
+        pixels. The scale is adjusted to the pixels, so the texts stay in
+        place relative to the bars.
+        @return: tuple (PIL image, scale_x, scale_y), no image without bars
+        """
+        from .bitmap import module_pixels, symbol_bitmap
+
+        symbol = layout.symbol
+        if symbol is None:
+            return None, scale_x, scale_y
+        module_x = module_pixels(symbol.module_width * scale_x, pixel)
+        module_y = module_pixels(symbol.module_height * scale_y, pixel)
+        guard_y = module_pixels(
+            symbol.module_height * symbol.guard_factor * scale_y, pixel
+        )
+        image = shared_image(
+            _kernel.lookup("barcode/geometries"),
+            ("bars image", btype, code, module_x, module_y, guard_y),
+            lambda: symbol_bitmap(symbol, module_x, module_y, guard_y),
+        )
+        return (
+            image,
+            module_x * pixel / symbol.module_width,
+            module_y * pixel / symbol.module_height,
+        )
+
+    def text_positions(layout, offset_x, offset_y, scale_x, scale_y):
+        """
+        Places the texts of a layout.
+        @return: list of (text, x, y, font size) in native units
+        """
+        if layout.font_size is None:
+            return []
+        # Relative scale factors, as the text is defined in pt
+        mm = _kernel.elements.length("1mm")
+        rel_x = scale_x / mm
+        rel_y = scale_y / mm
+        this_size = layout.font_size
+        # Y is always too high - we compensate that by bringing it up
+        compensation = 1.25 * this_size * NATIVE_UNIT_PER_INCH / 72
+        font_size = int(this_size * min(rel_x, rel_y))
+        if font_size <= 1:
+            font_size = this_size
+        return [
+            (
+                text,
+                offset_x + scale_x * x,
+                offset_y - rel_y * compensation + scale_y * y,
+                font_size,
+            )
+            for text, x, y in layout.texts
+        ]
+
+    def glyph_path(layout, scale_x, scale_y):
+        """
+        The texts of a layout as single-stroke glyphs (see glyphs.py),
+        relative to the origin of the code.
+        @return: Path, None if a character has no glyph
+        """
+        from .glyphs import CAP_HEIGHT, text_segments
+        from .linear import pt2mm
+
+        height = CAP_HEIGHT * pt2mm(layout.font_size) * min(scale_x, scale_y)
+        segments = []
+        for text, x, y in layout.texts:
+            text_path = text_segments(text, scale_x * x, scale_y * y, height, layout.anchor)
+            if text_path is None:
+                return None
+            segments.extend(text_path)
+        path = Path(segments)
+        path.stroke_width = height / 10
+        return path
+
+    def barcode_nodes(
+        layout,
+        geometry,
+        btype,
+        code,
+        offset_x,
+        offset_y,
+        scale_x,
+        scale_y,
+        aspath,
+        skiptext,
+        hatch=None,
+        params=None,
+        glyphs=False,
+        image=None,
+    ):
+        """
+        Creates the nodes for a barcode layout, they are not part of the
+        tree yet: the caller attaches them (see attach_nodes), all nodes of a
+        batch at once. The nodes of a group are already attached to it.
+        @param geometry: shared geometry of the bars in mm (or the hatch lines if
+            hatch is given), None for rects
+        @param hatch: if given the bars are filled with vertical lines of this distance (native units)
+        @param params: generation parameters, attached to the group (or the path without text)
+        @param glyphs: the text becomes a path of built-in glyphs instead of text nodes,
+            if there are glyphs for all characters
+        @param image: tuple (PIL image, pixel size, dpi): the bars are an image node
+        @return: list of created nodes
+        """
+        elements = _kernel.elements
+        branch = elements.elem_branch
+        data = []
+        groupnode = None
+        text_path = None
+        if glyphs and not skiptext and layout.font_size is not None:
+            text_path = glyph_path(layout, scale_x, scale_y)
+            if text_path is None and params is not None:
+                # Text nodes after all, the parameters say what we created
+                params = dict(params, glyphs=False)
+        if not skiptext:
+            groupnode = branch.create(
+                type="group",
+                label=f"Barcode {btype}: {code}",
+                id=f"{btype}",
+            )
+            data.append(groupnode)
+        if image is not None:
+            bitmap, pixel, dpi = image
+            if bitmap is not None:
+                data.append(
+                    image_node(
+                        branch, bitmap, offset_x, offset_y, pixel, dpi, f"{btype}={code}"
+                    )
+                )
+        elif hatch is not None:
+            node = branch.create(
+                geometry=geometry,
+                matrix=Matrix(scale_x, 0, 0, scale_y, offset_x, offset_y),
+                stroke_width=hatch,
+                stroke_scaled=False,
+                type="elem path",
+                label=f"{btype}={code}",
+            )
+            node.stroke = Color("black")
+            node.fill = None
+            data.append(node)
+        elif aspath:
+            # The geometry is in mm, we just need to place it
+            node = branch.create(
+                geometry=geometry,
+                matrix=Matrix(scale_x, 0, 0, scale_y, offset_x, offset_y),
+                stroke_width=0,
+                stroke_scaled=False,
+                type="elem path",
+                fillrule=0,  # nonzero
+                label=f"{btype}={code}",
+            )
+            node.stroke = None
+            node.fill = Color("black")
+            data.append(node)
+        else:
+            # The rects are created right away, without an intermediate Rect
+            for x, y, wd, ht in layout.bars:
+                node = branch.create(
+                    type="elem rect",
+                    x=offset_x + scale_x * x,
+                    y=offset_y + scale_y * y,
+                    width=scale_x * wd,
+                    height=scale_y * ht,
+                    stroke_width=1.0,
+                    stroke_scale=True,
+                )
+                node.stroke = None
+                node.fill = Color(BLACK)
+                data.append(node)
+        if params is not None:
+            # A group of loose rects has nobody to carry the parameters
+            if groupnode is not None:
+                groupnode.mkbarcode = params
+            elif data and (geometry is not None or image is not None):
+                data[0].mkbarcode = params
+        if text_path is not None:
+            node = branch.create(
+                path=text_path,
+                matrix=Matrix(1, 0, 0, 1, offset_x, offset_y),
+                stroke_width=text_path.stroke_width,
+                stroke_scaled=False,
+                type="elem path",
+                label=f"text={code}",
+            )
+            node.stroke = Color(BLACK)
+            node.fill = None
+            data.append(node)
+        elif not skiptext and layout.font_size is not None:
+            for text, this_x, this_y, font_size in text_positions(
+                layout, offset_x, offset_y, scale_x, scale_y
+            ):
+                node = branch.create(
+                    text=text,
+                    matrix=Matrix(
+                        f"translate({this_x}, {this_y}) scale({UNITS_PER_PIXEL})"
+                    ),
+                    anchor=layout.anchor,
+                    type="elem text",
+                )
+                node.font_size = font_size
+                node.stroke = None
+                node.fill = Color("black")
+                data.append(node)
+        if groupnode is not None:
+            attach_nodes(groupnode, data[1:])
+        return data
+
+    @kernel.console_option(
+        "notext", "n", type=bool, action="store_true", help=_("suppress text display")
+    )
+    @kernel.console_option(
+        "glyphs",
+        "g",
+        type=bool,
+        action="store_true",
+        help=_("create the text as path of single-stroke glyphs instead of text"),
+    )
+    @kernel.console_option(
+        "asgroup",
+        "a",
+        type=bool,
+        action="store_true",
+        help=_("create a group of rects instead of a path"),
+    )
+    @kernel.console_option(
+        "hatch",
+        type=str,
+        help=_("Fill the bars with vertical lines of this distance (e.g. 0.1mm)"),
+    )
+    @kernel.console_option(
+        "image",
+        "i",
+        type=bool,
+        action="store_true",
+        help=_("Create the bars as 1-bit image for raster engraving"),
+    )
+    @kernel.console_option(
+        "dpi",
+        type=int,
+        help=_("Image: resolution, snapped to whole laser steps (default: setting barcode_image_dpi)"),
+    )
+    @kernel.console_option(
+        "start",
+        "s",
+        type=int,
+        help=_("Batch: first serial number, code is used as template (e.g. 'A-%05d')"),
+    )
+    @kernel.console_option("end", type=int, help=_("Batch: last serial number"))
+    @kernel.console_option("step", type=int, help=_("Batch: serial increment (default 1)"))
+    @kernel.console_option(
+        "codes",
+        type=str,
+        help=_("Batch: list of codes separated by ';' (or ',' in double quotes)"),
+    )
+    @kernel.console_option(
+        "columns", "c", type=int, help=_("Batch: number of codes per row")
+    )
+    @kernel.console_option(
+        "pitch",
+        "p",
+        type=str,
+        help=_(
+            "Batch: distance between codes, either one length or 'dx;dy' (or \"dx,dy\")"
+        ),
+    )
+    @kernel.console_option(
+        "fromtext",
+        "f",
+        type=bool,
+        action="store_true",
+        help=_(
+            "Create a barcode for every selected text, in its place (the only argument is the type)"
+        ),
+    )
+    @kernel.console_option(
+        "remove",
+        type=bool,
+        action="store_true",
+        help=_("Fromtext: delete the texts the codes are created from"),
+    )
+    @kernel.console_option(
+        "profile", type=str, help=_("Write cProfile statistics of this call to a file")
+    )
+    @kernel.console_argument("x_pos", type=str, help=_("X-Position of barcode"))
+    @kernel.console_argument("y_pos", type=str, help=_("Y-Position of barcode"))
+    @kernel.console_argument("dimx", type=str, help=_("Width of barcode, may be 'auto' to keep native width"))
+    @kernel.console_argument("dimy", type=str, help=_("Height of barcode, may be 'auto' to keep native height"))
+    @kernel.console_argument("btype", type=str, help=_("Barcode type"))
+    @kernel.console_argument("code", type=str, help=_("The code to process"))
+    @kernel.console_command(
+        "barcode",
+        help=_("Creates a barcode."),
+        input_type=("elements", None),
+        output_type="elements",
+    )
+    @profiled
+    def create_barcode(
+        command,
+        channel,
+        _,
+        x_pos=None,
+        y_pos=None,
+        dimx=None,
+        dimy=None,
+        btype=None,
+        code=None,
+        notext=None,
+        asgroup=None,
+        hatch=None,
+        glyphs=None,
+        image=None,
+        dpi=None,
+        start=None,
+        end=None,
+        step=None,
+        codes=None,
+        columns=None,
+        pitch=None,
+        fromtext=None,
+        remove=None,
+        data=None,
+        **kwargs,
+    ):
+        """
+        Creates a barcode at the given position. A whole batch of barcodes
+        can be created with one call, either from a serial range
+        (--start, --end, --step, with code as template) or from a list of
+        codes (--codes). The batch is laid out in a grid starting at
+        x_pos, y_pos with --columns codes per row and a distance of --pitch.
+        --hatch fills the bars with vertical lines right away,
+        so no hatch operation is needed. --image creates the bars as 1-bit
+        image, every module a block of whole laser steps.
+        --fromtext replaces a layout of text placeholders: every piped (or
+        selected) text becomes a barcode of its text, filling the bounds
+        of the text. The only argument is the barcode type, the codes are
+        created as one batch with a single signal, --remove deletes the
+        texts.
+        """
+        elements = _kernel.elements
+        texts = None
+        if fromtext:
+            texts, unsized = text_placeholders(elements, data)
+            if not report_placeholders(channel, _, texts, unsized):
+                return
+            if btype is None:
+                btype = x_pos
+        data = []
+        is_batch = start is not None or codes is not None or texts is not None
+        if texts is not None:
+            sources = [text for node, text, position, size in texts]
+        elif codes is not None:
+            sources = code_list(codes)
+        elif start is not None:
+            try:
+                sources = list(
+                    serial_codes(code, start, end, 1 if step is None else step)
+                )
+            except (ValueError, TypeError):
+                channel(_("Invalid serial range"))
+                return
+        elif code is not None:
+            sources = [code]
+        else:
+            sources = []
+        all_codes = [elements.mywordlist.translate(c) for c in sources]
+        states = {c: wordlist_state(elements.mywordlist, c) for c in set(sources)}
+        if btype is None:
+            btype = "ean14"
+        btype = btype.lower()
+        if (
+            texts is None
+            and (x_pos is None or y_pos is None or dimx is None or dimy is None)
+        ) or (len(all_codes) == 0 or all(c == "" for c in all_codes)):
+            params = "barcode x_pos y_pos dimx dimy btype code"
+            channel(_("Please provide all parameters: {params}").format(params=params))
+            channel(
+                _("Supported formats: {all}").format(
+                    all=",".join(provided_barcodes())
+                )
+            )
+            return
+        if btype not in provided_barcodes():
+            channel(
+                _("Invalid format, supported: {all}").format(
+                    all=",".join(provided_barcodes())
+                )
+            )
+            return
+        pitch_x, pitch_y = parse_pitch(pitch)
+        # Check lengths for validity
+        try:
+            if texts is None:
+                if dimx != "auto":
+                  __ = elements.length_x(dimx)
+                if dimy != "auto":
+                  __ = elements.length_x(dimy)
+                offset_x = elements.length_x(x_pos)
+                offset_y = elements.length_y(y_pos)
+            if pitch_x is not None:
+                pitch_x = elements.length_x(pitch_x)
+                pitch_y = elements.length_y(pitch_y)
+            if hatch is not None:
+                hatch = elements.length(hatch)
+                if hatch <= 0:
+                    raise ValueError
+            if dpi is not None and dpi <= 0:
+                raise ValueError
+        except ValueError:
+            channel(_("Invalid dimensions provided"))
+            return
+        aspath = True
+        skiptext = False
+        if asgroup is not None:
+            aspath = False
+        if notext is not None:
+            skiptext = True
+        use_glyphs = bool(glyphs)
+        pixel = None
+        if image:
+            pixel, dpi = image_resolution(_kernel, dpi)
+            aspath = True
+            hatch = None
+        # All codes are checked before the first one gets created
+        with stats.stage("validate"):
+            all_codes, notes, errors = check_batch(
+                all_codes, lambda this_code: check_barcode(btype, this_code)
+            )
+        if not report_check(channel, _, notes, errors):
+            return
+
+        if not is_batch:
+            __, layout = barcode_layout(btype, all_codes[0])
+            if layout is None:
+                channel(_("Invalid characters in barcode"))
+                return
+        if texts is not None:
+            # Every code takes the place of its text
+            positions = [position for node, text, position, size in texts]
+            sizes = [size for node, text, position, size in texts]
+            items = list(zip(sources, all_codes, positions, sizes))
+        else:
+            if pitch_x is None:
+                # Default pitch: 1.5 times the size of the first valid code
+                pitch_x = pitch_y = 0
+                for this_code in all_codes:
+                    __, layout = barcode_layout(btype, this_code)
+                    if layout is not None:
+                        scale_x, scale_y = barcode_scale(layout, dimx, dimy)
+                        pitch_x = 1.5 * scale_x * layout.width
+                        pitch_y = 1.5 * scale_y * layout.height
+                        break
+            if columns is None:
+                columns = ceil(sqrt(len(all_codes)))
+            positions = list(
+                grid_positions(len(all_codes), columns, pitch_x, pitch_y, offset_x, offset_y)
+            )
+            items = list(zip(sources, all_codes, positions, [(dimx, dimy)] * len(all_codes)))
+            # The grid is created (and burnt) row by row, in alternating
+            # directions if that keeps the travel for the first code shorter
+            geometry = None
+            scale_x = scale_y = 1.0
+            if pixel is None:
+                for this_code in all_codes:
+                    this_code, layout = barcode_layout(btype, this_code)
+                    if layout is not None:
+                        scale_x, scale_y = barcode_scale(layout, dimx, dimy)
+                        geometry, __ = bar_geometry(
+                            btype, this_code, layout, aspath, hatch, scale_x
+                        )
+                        break
+            order = grid_order(positions, columns, geometry, scale_x, scale_y)
+            items = [items[idx] for idx in order]
+        travel = TravelEstimate()
+        count = 0
+
+        def produce(item):
+            """
+            Encoding and geometry, in the worker thread for background batches.
+            """
+            source, this_code, (this_x, this_y), (this_dimx, this_dimy) = item
+            this_code, layout = barcode_layout(btype, this_code)
+            if layout is None:
+                channel(_("Invalid code skipped: {code}").format(code=this_code))
+                return None
+            scale_x, scale_y = barcode_scale(layout, this_dimx, this_dimy)
+            bitmap = None
+            with stats.stage("geometry"):
+                if pixel is not None:
+                    bitmap, scale_x, scale_y = bar_image(
+                        btype, this_code, layout, scale_x, scale_y, pixel
+                    )
+                    geometry, segments = None, 0
+                else:
+                    geometry, segments = bar_geometry(
+                        btype, this_code, layout, aspath, hatch, scale_x
+                    )
+            return (
+                source,
+                this_code,
+                layout,
+                geometry,
+                bitmap,
+                segments,
+                this_x,
+                this_y,
+                this_dimx,
+                this_dimy,
+                scale_x,
+                scale_y,
+            )
+
+        def consume(results):
+            """
+            Creates the nodes, always in the main thread.
+            """
+            nonlocal count
+            created = []
+            with paused_notifications(elements):
+                for (
+                    source,
+                    this_code,
+                    layout,
+                    geometry,
+                    bitmap,
+                    segments,
+                    this_x,
+                    this_y,
+                    this_dimx,
+                    this_dimy,
+                    scale_x,
+                    scale_y,
+                ) in results:
+                    with stats.stage("nodes"):
+                        nodes = barcode_nodes(
+                            layout,
+                            geometry,
+                            btype,
+                            this_code,
+                            this_x,
+                            this_y,
+                            scale_x,
+                            scale_y,
+                            aspath,
+                            skiptext,
+                            hatch,
+                            params={
+                                "command": "barcode",
+                                "template": source,
+                                "payload": this_code,
+                                "wordlist": states[source],
+                                "btype": btype,
+                                "dimx": this_dimx,
+                                "dimy": this_dimy,
+                                "aspath": aspath,
+                                "hatch": hatch,
+                                "glyphs": use_glyphs,
+                                "image": None if pixel is None else dpi,
+                                "origin": (this_x, this_y),
+                                "scale": (scale_x, scale_y),
+                            },
+                            glyphs=use_glyphs,
+                            image=None if pixel is None else (bitmap, pixel, dpi),
+                        )
+                    created.extend(nodes)
+                    count += 1
+                    stats.count("codes")
+                    stats.count("nodes", len(nodes))
+                    if geometry is not None or bitmap is not None:
+                        stats.count("segments", segments)
+                    else:
+                        stats.count("segments", 5 * len(layout.bars))
+                    if geometry is not None:
+                        with stats.stage("travel"):
+                            travel.add(geometry, this_x, this_y, scale_x, scale_y)
+                with stats.stage("nodes"):
+                    attach_nodes(
+                        elements.elem_branch,
+                        [node for node in created if node.parent is None],
+                    )
+                    if remove and texts is not None:
+                        remove_placeholders(channel, _, texts, len(results))
+            data.extend(created)
+            with stats.stage("signal"):
+                elements.signal("element_added", created)
+
+        def finish(cancelled, error):
+            if error is not None:
+                channel(
+                    _("Stopped by an error ({error}), created {count} barcodes").format(
+                        error=error, count=count
+                    )
+                )
+                return
+            if cancelled:
+                channel(_("Cancelled, created {count} barcodes").format(count=count))
+                return
+            report_travel(_kernel, channel, _, travel)
+            if is_batch:
+                channel(_("Created {count} barcodes").format(count=count))
+
+        threshold = _kernel.root.barcode_background
+        if is_batch and 0 < threshold <= len(items):
+            # Codes from texts replace them in one go
+            chunk_size = len(items) if texts is not None else 50
+            job = BatchJob(
+                "barcode", items, produce, consume, channel, finish, chunk_size
+            )
+            channel(
+                _(
+                    "Creating {count} barcodes in the background, barcode_cancel stops it"
+                ).format(count=len(items))
+            )
+            start_batch(_kernel, job)
+            # Empty for now, the codes are added as their chunks are created
+            return "elements", data
+        BatchJob("barcode", items, produce, consume, None, finish, len(items)).run()
+        return "elements", data
+
+    def apply_barcode(node, params):
+        """
+        Brings a barcode in line with new generation parameters, in place.
+        The bars and texts keep any transformation applied after their
+        creation, a new scale (other dimensions, or a longer code in the
+        same dimx) is applied in front of their matrix. The bars are only
+        created again if the code changed (or for hatch lines, which keep
+        their distance), so a new size is just a new matrix.
+        @param node: the node carrying the parameters (group or path)
+        @param params: new parameters, payload already translated
+        @return: False if the code can't be encoded with these parameters
+        """
+        elements = _kernel.elements
+        old = node.mkbarcode
+        btype = params["btype"]
+        if btype not in provided_barcodes():
+            return False
+        code, layout = barcode_layout(btype, params["payload"])
+        if layout is None:
+            return False
+        if dict(params, payload=code) == old:
+            return True
+        __, old_layout = barcode_layout(old["btype"], old["payload"])
+        offset_x, offset_y = old["origin"]
+        old_x, old_y = old["scale"]
+        scale_x, scale_y = barcode_scale(layout, params["dimx"], params["dimy"])
+        pixel = None
+        dpi = params.get("image")
+        if dpi:
+            pixel, dpi = image_resolution(_kernel, dpi)
+            bitmap, scale_x, scale_y = bar_image(
+                btype, code, layout, scale_x, scale_y, pixel
+            )
+        encoded = code != old["payload"] or btype != old["btype"]
+        children = list(node.children) if node.type == "group" else [node]
+        glyph_node = None
+        text_path = None
+        if old.get("glyphs") and node.type == "group" and children and children[-1].type == "elem path":
+            # The glyph path comes after the bars
+            glyph_node = children.pop()
+            if layout.font_size is not None:
+                text_path = glyph_path(layout, scale_x, scale_y)
+                if text_path is None:
+                    return False
+        bars = [c for c in children if c.type in ("elem path", "elem rect", "elem image")]
+        texts = [c for c in children if c.type == "elem text"]
+        with stats.stage("update"):
+            if pixel is not None:
+                # A new image for every change, it keeps its position
+                for bar in bars:
+                    bar.image = bitmap
+                    bar.matrix = Matrix(pixel, 0, 0, pixel, bar.matrix.e, bar.matrix.f)
+                    bar.dpi = dpi
+                    bar.label = f"{btype}={code}"
+                    bar.update(None)
+                    bar.altered()
+            elif params["aspath"] or params["hatch"] is not None:
+                if encoded or params["hatch"] is not None:
+                    geometry, segments = bar_geometry(
+                        btype, code, layout, params["aspath"], params["hatch"], scale_x
+                    )
+                    stats.count("segments", segments)
+                    for bar in bars:
+                        bar.geometry = geometry
+                for bar in bars:
+                    bar.matrix = Matrix(scale_x / old_x, 0, 0, scale_y / old_y, 0, 0) * bar.matrix
+                    bar.label = f"{btype}={code}"
+                    bar.altered()
+            elif bars:
+                # Rects are reused as far as possible
+                rects = layout.bars
+                for bar in bars[len(rects):]:
+                    bar.remove_node()
+                for index, (x, y, wd, ht) in enumerate(rects):
+                    if index < len(bars):
+                        bar = bars[index]
+                    else:
+                        bar = elements.elem_branch.add(
+                            shape=Rect(x=0, y=0, width=1, height=1),
+                            matrix=Matrix(bars[0].matrix),
+                            type="elem rect",
+                        )
+                        bar.stroke = None
+                        bar.fill = Color("black")
+                        node.append_child(bar)
+                    bar.x = offset_x + scale_x * x
+                    bar.y = offset_y + scale_y * y
+                    bar.width = scale_x * wd
+                    bar.height = scale_y * ht
+                    bar.altered()
+                if encoded:
+                    stats.count("segments", 5 * len(rects))
+            if texts and old_layout is not None:
+                old_texts = text_positions(old_layout, offset_x, offset_y, old_x, old_y)
+                new_texts = text_positions(layout, offset_x, offset_y, scale_x, scale_y)
+                for text_node, before, after in zip(texts, old_texts, new_texts):
+                    # The text matrix starts with the scale to pixels
+                    dx = (after[1] - before[1]) / UNITS_PER_PIXEL
+                    dy = (after[2] - before[2]) / UNITS_PER_PIXEL
+                    text_node.matrix = Matrix(1, 0, 0, 1, dx, dy) * text_node.matrix
+                    text_node.text = after[0]
+                    text_node.font_size = after[3]
+                    text_node.altered()
+            if glyph_node is not None:
+                # Relative to the origin, so the matrix stays as it is
+                if text_path is None:
+                    glyph_node.remove_node()
+                else:
+                    glyph_node.path = text_path
+                    glyph_node.stroke_width = text_path.stroke_width
+                    glyph_node.label = f"text={code}"
+                    glyph_node.altered()
+            if node.type == "group":
+                node.label = f"Barcode {btype}: {code}"
+            # Never modify the dictionary, copies of the node share it
+            node.mkbarcode = dict(
+                params, payload=code, scale=(scale_x, scale_y), image=dpi
+            )
+        stats.count("updated")
+        return True
+
+    kernel.register("barcode/apply/barcode", apply_barcode)
+
+    def encode_row(row, encode=True):
+        """
+        Encodes a row of a job file (see jobfile.parse_row), runs in the worker.
+        @param encode: False just checks the row, nothing is encoded
+        @return: function creating the (detached) nodes, to be called in the main thread
+        @raise ValueError: if the row can't be encoded
+        """
+        elements = _kernel.elements
+        btype = row["symbology"]
+        if btype not in provided_barcodes():
+            raise ValueError(
+                _("Invalid format, supported: {all}").format(
+                    all=",".join(provided_barcodes())
+                )
+            )
+        dimx = row["width"]
+        dimy = row["height"] or "auto"
+        aspath = not row.get("asgroup", False)
+        skiptext = row.get("notext", False)
+        use_glyphs = row.get("glyphs", False)
+        pixel = dpi = None
+        try:
+            for length in (dimx, dimy):
+                if length != "auto":
+                    elements.length(length)
+            offset_x = elements.length_x(row["x"])
+            offset_y = elements.length_y(row["y"])
+            hatch = None
+            if "hatch" in row:
+                hatch = elements.length(row["hatch"])
+                if hatch <= 0:
+                    raise ValueError
+            if row.get("dpi", 1) <= 0:
+                raise ValueError
+            if row.get("image", False):
+                pixel, dpi = image_resolution(_kernel, row.get("dpi"))
+                aspath = True
+                hatch = None
+        except ValueError:
+            raise ValueError(_("Invalid dimensions provided")) from None
+        try:
+            code, __ = check_barcode(btype, row["payload"])
+        except ValueError as e:
+            raise ValueError(
+                _("Invalid code {code}: {error}").format(code=row["payload"], error=e)
+            ) from None
+        if not encode:
+            return None
+        code, layout = barcode_layout(btype, code)
+        if layout is None:
+            raise ValueError(_("Invalid code: {code}").format(code=code))
+        scale_x, scale_y = barcode_scale(layout, dimx, dimy)
+        bitmap = None
+        with stats.stage("geometry"):
+            if pixel is not None:
+                bitmap, scale_x, scale_y = bar_image(
+                    btype, code, layout, scale_x, scale_y, pixel
+                )
+                geometry, segments = None, 0
+            else:
+                geometry, segments = bar_geometry(
+                    btype, code, layout, aspath, hatch, scale_x
+                )
+
+        def place():
+            nodes = barcode_nodes(
+                layout,
+                geometry,
+                btype,
+                code,
+                offset_x,
+                offset_y,
+                scale_x,
+                scale_y,
+                aspath,
+                skiptext,
+                hatch,
+                params={
+                    "command": "barcode",
+                    "template": row["payload"],
+                    "payload": code,
+                    "btype": btype,
+                    "dimx": dimx,
+                    "dimy": dimy,
+                    "aspath": aspath,
+                    "hatch": hatch,
+                    "glyphs": use_glyphs,
+                    "image": dpi,
+                    "origin": (offset_x, offset_y),
+                    "scale": (scale_x, scale_y),
+                },
+                glyphs=use_glyphs,
+                image=None if pixel is None else (bitmap, pixel, dpi),
+            )
+            stats.count("codes")
+            stats.count("nodes", len(nodes))
+            if geometry is not None or bitmap is not None:
+                stats.count("segments", segments)
+            else:
+                stats.count("segments", 5 * len(layout.bars))
+            return nodes
+
+        return place
+
+    kernel.register("barcode/row/barcode", encode_row)
+
+
+def register_qr_code_stuff(kernel):
+    """
+    The qr codes are encoded by our own numpy encoder (see qrengine.py),
+    the qrcode library is only needed for the tests.
+    """
+    _ = kernel.translation
+    _kernel = kernel
+    from meerk40t.svgelements import Color, Matrix
+    from .background import BatchJob, start_batch
+    from .batch import (
+        code_list,
+        grid_positions,
+        parallel_map,
+        parse_pitch,
+        serial_codes,
+    )
+    from .geometry import symbol_hatch_path, symbol_path
+    from .stats import Statistics, profiled
+    from .travel import TravelEstimate, grid_order
+    from .validate import check_batch, check_qr
+
+    stats = kernel.lookup("barcode/stats")
+    if stats is None:
+        stats = Statistics()
+
+    kernel.root.setting(int, "barcode_workers", 0)
+    # 0: image output at the native resolution of the device
+    kernel.root.setting(int, "barcode_image_dpi", 0)
+
+    # Batches with fewer codes to encode are not worth starting a process pool
+    PARALLEL_THRESHOLD = 50
+
+    def qr_geometry(symbol, outline=False, hatch=None):
+        """
+        The path is established with a module size of 1,
+        so it just needs a placement matrix.
+        With outline the connected dark areas are merged into polygons,
+        with hatch (line distance relative to the width of the code) we
+        create horizontal fill lines instead of filled shapes.
+        """
+        if hatch is not None:
+            return symbol_hatch_path(
+                symbol, hatch * symbol.columns, fill=None, stroke="black"
+            )
+        return symbol_path(symbol, outline, fill="black", stroke=None)
+
+    def qr_shared(symbol, code, errcorr, version, boxsize, border, outline, hatch):
+        """
+        The shared geometry of a code (see shared_geometry).
+        @param hatch: line distance relative to the width of the code, or None
+        @return: tuple (geometry, number of segments)
+        """
+        return shared_geometry(
+            _kernel.lookup("barcode/geometries"),
+            ("qr", code, errcorr, version, border, boxsize, outline, hatch),
+            lambda: qr_geometry(symbol, outline, hatch),
+        )
+
+    def qr_image(symbol, code, errcorr, version, boxsize, border, wd, pixel):
+        """
+        The shared 1-bit image of a code, every module a square of whole
+        pixels, so the width becomes the closest multiple of the pixel size.
+        @return: PIL image
+        """
+        from .bitmap import module_pixels, symbol_bitmap
+
+        size = module_pixels(wd / symbol.columns, pixel)
+        return shared_image(
+            _kernel.lookup("barcode/geometries"),
+            ("qr image", code, errcorr, version, border, boxsize, size),
+            lambda: symbol_bitmap(symbol, size, size),
+        )
+
+    def qr_symbol(code, errcorr, version, boxsize, border):
+        """
+        Encodes a code, the resulting symbol is cached.
+        @return: Symbol or None if the code doesn't fit into version
+        """
+
+        def create():
+            # numpy is imported on first use only
+            from .qrencode import qr_symbol as encode_qr
+
+            with stats.stage("encode"):
+                return encode_qr(code, errcorr, version, boxsize, border)
+
+        cache = _kernel.lookup("barcode/cache")
+        if cache is None:
+            return create()
+        return cache.fetch(("qr", code, errcorr, version, border, boxsize), create)
+
+    def qr_symbols(all_codes, errcorr, version, boxsize, border, workers):
+        """
+        Encodes all codes of a batch that aren't cached yet in a process pool,
+        the bit-packed symbols come back from the workers.
+        @return: dictionary code: Symbol (None for codes that don't fit)
+        """
+        cache = _kernel.lookup("barcode/cache")
+        missing = []
+        seen = set()
+        for code in all_codes:
+            if code == "" or code in seen:
+                continue
+            seen.add(code)
+            key = ("qr", code, errcorr, version, border, boxsize)
+            if cache is None or key not in cache:
+                missing.append(code)
+        if workers is None or workers < 2 or len(missing) < PARALLEL_THRESHOLD:
+            return {}
+        from .qrencode import encode_symbol
+
+        jobs = [(code, errcorr, version, boxsize, border) for code in missing]
+        with stats.stage("encode"):
+            results = parallel_map(encode_symbol, jobs, workers)
+        symbols = {}
+        for code, symbol in zip(missing, results):
+            symbols[code] = symbol
+            if cache is not None and symbol is not None:
+                cache.put(("qr", code, errcorr, version, border, boxsize), symbol)
+        return symbols
+
+    def qr_node(symbol, geometry, code, xp, yp, wd, line_width=None, params=None):
+        """
+        Places the (shared) geometry of a symbol, line_width is given for hatch lines.
+        The node is not attached to the tree yet.
+        @param params: generation parameters to attach to the node
+        """
+        elements = _kernel.elements
+        module_size = wd / symbol.columns
+        node = elements.elem_branch.create(
+            geometry=geometry,
+            matrix=Matrix(module_size, 0, 0, module_size, xp, yp),
+            stroke_width=0 if line_width is None else line_width,
+            stroke_scaled=False,
+            type="elem path",
+            fillrule=0,  # nonzero
+            label=f"qr={code}",
+        )
+        if line_width is not None:
+            node.stroke = Color("black")
+            node.fill = None
+        if params is not None:
+            node.mkbarcode = params
+        # elements.set_emphasis([node])
+        # node.focus()
+        return node
+
+    def qr_image_node(image, code, xp, yp, pixel, dpi, params=None):
+        """
+        Places the (shared) image of a code, not attached to the tree yet.
+        @param params: generation parameters to attach to the node
+        """
+        node = image_node(
+            _kernel.elements.elem_branch, image, xp, yp, pixel, dpi, f"qr={code}"
+        )
+        if params is not None:
+            node.mkbarcode = params
+        return node
+
+    # QR-Code generation
+    @kernel.console_option(
+        "errcorr",
+        "e",
+        type=str,
+        help=_("error correction, one of L (7%), M (15%), Q (25%), H (30%"),
+    )
+    @kernel.console_option("boxsize", "x", type=int, help=_("Boxsize (default 10)"))
+    @kernel.console_option("border", "b", type=int, help=_("Border around qr-code (default 4)"))
+    @kernel.console_option("version", "v", type=int, help=_("size (1..40)"))
+    @kernel.console_option(
+        "workers",
+        "w",
+        type=int,
+        help=_("Batch: number of encoding processes (default: setting barcode_workers)"),
+    )
+    @kernel.console_option(
+        "outline",
+        "o",
+        type=bool,
+        action="store_true",
+        help=_("Merge neighbouring modules into outlines (fewer path segments)"),
+    )
+    @kernel.console_option(
+        "hatch",
+        type=str,
+        help=_("Fill the modules with horizontal lines of this distance (e.g. 0.1mm)"),
+    )
+    @kernel.console_option(
+        "image",
+        "i",
+        type=bool,
+        action="store_true",
+        help=_("Create a 1-bit image for raster engraving instead of a path"),
+    )
+    @kernel.console_option(
+        "dpi",
+        type=int,
+        help=_("Image: resolution, snapped to whole laser steps (default: setting barcode_image_dpi)"),
+    )
+    @kernel.console_option(
+        "start",
+        "s",
+        type=int,
+        help=_("Batch: first serial number, code is used as template (e.g. 'A-%05d')"),
+    )
+    @kernel.console_option("end", type=int, help=_("Batch: last serial number"))
+    @kernel.console_option("step", type=int, help=_("Batch: serial increment (default 1)"))
+    @kernel.console_option(
+        "codes",
+        type=str,
+        help=_("Batch: list of codes separated by ';' (or ',' in double quotes)"),
+    )
+    @kernel.console_option(
+        "columns", "c", type=int, help=_("Batch: number of codes per row")
+    )
+    @kernel.console_option(
+        "pitch",
+        "p",
+        type=str,
+        help=_(
+            "Batch: distance between codes, either one length or 'dx;dy' (or \"dx,dy\")"
+        ),
+    )
+    @kernel.console_option(
+        "fromtext",
+        "f",
+        type=bool,
+        action="store_true",
+        help=_("Create a qr code for every selected text, in its place (no arguments)"),
+    )
+    @kernel.console_option(
+        "remove",
+        type=bool,
+        action="store_true",
+        help=_("Fromtext: delete the texts the codes are created from"),
+    )
+    @kernel.console_option(
+        "profile", type=str, help=_("Write cProfile statistics of this call to a file")
+    )
+    @kernel.console_argument("x_pos", type=str, help=_("X-position of qr-code"))
+    @kernel.console_argument("y_pos", type=str, help=_("Y-position of qr-code"))
+    @kernel.console_argument("dim", type=str, help=_("Width/length of qr-code"))
+    @kernel.console_argument("code", type=str, help=_("Text to create qr-code from"))
+    @kernel.console_command(
+        "qrcode",
+        help=_("Creates a qr code."),
+        input_type=("elements", None),
+        output_type="elements",
+    )
+    @profiled
+    def create_qr(
+        command,
+        channel,
+        _,
+        x_pos=None,
         y_pos=None,
         dim=None,
         code=None,
-        errcode=None,
+        errcorr=None,
         boxsize=None,
         border=None,
         version=None,
+        workers=None,
+        outline=None,
+        hatch=None,
+        image=None,
+        dpi=None,
+        start=None,
+        end=None,
+        step=None,
+        codes=None,
+        columns=None,
+        pitch=None,
+        fromtext=None,
+        remove=None,
         data=None,
         **kwargs,
     ):
         """
-        Example is part of the meerk40t example plugin this command only prints hello world. This part of the
-        command will show up in the extended help for "help example".
+        Creates a qr code at the given position. A whole batch of qr codes
+        can be created with one call, either from a serial range
+        (--start, --end, --step, with code as template) or from a list of
+        codes (--codes). The batch is laid out in a grid starting at
+        x_pos, y_pos with --columns codes per row and a distance of --pitch.
+        With --outline the dark areas are traced into merged polygons
+        instead of one rectangle per run of modules, --hatch creates fill
+        lines right away, so no hatch operation is needed. --image creates
+        1-bit images instead, with every module a block of whole laser steps
+        (so the size is rounded to the closest multiple of a step).
+        --fromtext replaces a layout of text placeholders: every piped (or
+        selected) text becomes a qr code of its text at its position, as
+        wide as the longer side of the text. No arguments are needed, the
+        codes are created as one batch with a single signal, --remove
+        deletes the texts.
         """
         elements = _kernel.elements
-        if code is not None:
-            code = elements.mywordlist.translate(code)
-        if x_pos is None or y_pos is None or dim is None or code is None or code == "":
+        texts = None
+        if fromtext:
+            texts, unsized = text_placeholders(elements, data)
+            if not report_placeholders(channel, _, texts, unsized):
+                return
+        is_batch = start is not None or codes is not None or texts is not None
+        if texts is not None:
+            sources = [text for node, text, position, size in texts]
+        elif codes is not None:
+            sources = code_list(codes)
+        elif start is not None:
+            try:
+                sources = list(
+                    serial_codes(code, start, end, 1 if step is None else step)
+                )
+            except (ValueError, TypeError):
+                channel(_("Invalid serial range"))
+                return
+        elif code is not None:
+            sources = [code]
+        else:
+            sources = []
+        # Make sure we translate any patterns if needed
+        all_codes = [elements.mywordlist.translate(c) for c in sources]
+        states = {c: wordlist_state(elements.mywordlist, c) for c in set(sources)}
+        if (texts is None and (x_pos is None or y_pos is None or dim is None)) or (
+            len(all_codes) == 0 or all(c == "" for c in all_codes)
+        ):
             params = "qrcode x_pos y_pos dim code"
             channel(_("Please provide all parameters: {params}").format(params=params))
             return
+        pitch_x, pitch_y = parse_pitch(pitch)
         try:
-            xp = elements.length_x(x_pos)
-            yp = elements.length_y(y_pos)
-            wd = elements.length(dim)
+            if texts is None:
+                xp = elements.length_x(x_pos)
+                yp = elements.length_y(y_pos)
+                wd = elements.length(dim)
+                if pitch_x is None:
+                    pitch_x = pitch_y = 1.25 * wd
+                else:
+                    pitch_x = elements.length_x(pitch_x)
+                    pitch_y = elements.length_y(pitch_y)
+            if hatch is not None:
+                hatch = elements.length(hatch)
+                if hatch <= 0:
+                    raise ValueError
+            if dpi is not None and dpi <= 0:
+                raise ValueError
+            if boxsize is not None and boxsize <= 0:
+                raise ValueError
         except ValueError:
             channel(_("Invalid dimensions provided"))
             return
-        # Make sure we translate any patterns if needed
-        code = elements.mywordlist.translate(code)
         # - version=None    We don't preestablish the size but let the routine decide
         # - box_size        controls how many pixels each “box” of the QR code is.
         # - border          how many boxes thick the border should be (the default
         #                   is 4, which is the minimum according to the specs).
-        if errcode is None:
-            errcode = "M"
-        errcode = errcode.upper()
-        if errcode == "L":
-            errc = qrcode.constants.ERROR_CORRECT_L
-        elif errcode == "Q":
-            errc = qrcode.constants.ERROR_CORRECT_Q
-        elif errcode == "H":
-            errc = qrcode.constants.ERROR_CORRECT_H
-        else:
-            errc = qrcode.constants.ERROR_CORRECT_M
+        if errcorr is None:
+            errcorr = "M"
+        errcorr = errcorr.upper()
+        if errcorr not in ("L", "M", "Q", "H"):
+            errcorr = "M"
         if border is None or border < 4:
             border = 4
         if boxsize is None:
             boxsize = 10
-        qr = qrcode.QRCode(
-            version=version,
-            error_correction=errc,
-            box_size=boxsize,
-            border=border,
-        )
-
-        qr.add_data(code)
-        factory = qrcode.image.svg.SvgPathImage
-        qr.image_factory = factory
-        if version is None:
-            img = qr.make_image(fit=True)
+        # All codes are checked before the first one gets created
+        with stats.stage("validate"):
+            __, notes, errors = check_batch(
+                all_codes,
+                lambda this_code: (this_code, None)
+                if this_code == ""
+                else check_qr(this_code, errcorr, version),
+            )
+        if not report_check(channel, _, notes, errors):
+            return
+        if workers is None:
+            workers = _kernel.root.barcode_workers
+        outline = bool(outline)
+        pixel = None
+        if image:
+            # Images have neither outlines nor fill lines
+            pixel, dpi = image_resolution(_kernel, dpi)
+            outline = False
+            hatch = None
+        line_width = hatch
+        if texts is not None:
+            # Every code takes the place of its text
+            items = [
+                (source, this_code, position, max(size))
+                for source, this_code, (node, text, position, size) in zip(
+                    sources, all_codes, texts
+                )
+                if this_code != ""
+            ]
         else:
-            img = qr.make_image()
-        # We do get a ready to go svg string, but let's try to
-        # extract some basic information
-        # 1) Dimension
-        dim_x = "3cm"
-        dim_y = "3cm"
-        txt = str(img.to_string())
-        pattern = 'viewBox="'
-        idx = txt.find(pattern)
-        if idx >= 0:
-            txt = txt[idx + len(pattern) :]
-            idx = txt.find('"')
-            if idx >= 0:
-                txt = txt[:idx]
-                vp = txt.split(" ")
-                dim_x = str(float(vp[2]) - 2 * border) + "mm"
-                dim_y = str(float(vp[3]) - 2 * border) + "mm"
-        svg_x = elements.length_x(dim_x)
-        svg_y = elements.length_y(dim_y)
-        # 2) Path definition
-        txt = str(img.to_string())
-        pathstr = ""
-        pattern = '<path d="'
-        idx = txt.find(pattern)
-        if idx >= 0:
-            txt = txt[idx + len(pattern) :]
-            idx = txt.find(" id=")
-            if idx >= 0:
-                txt = txt[: idx - 1]
-                pathstr = txt
-        if len(pathstr):
-            mm = elements.length("1mm")
-            sx = mm
-            sy = mm
-
-            sx *= wd / svg_x
-            sy *= wd / svg_y
-            px = -border * mm + xp
-            py = -border * mm + yp
-            matrix = Matrix(f"scale({sx},{sy})")
-            # channel(f"scale({sx},{sy})")
-            path = Path(
-                fill="black",
-                stroke=None,
-                width=dim_x,
-                height=dim_y,
-                matrix=Matrix(),
+            if columns is None:
+                columns = ceil(sqrt(len(all_codes)))
+            positions = list(
+                grid_positions(len(all_codes), columns, pitch_x, pitch_y, xp, yp)
             )
-            path.parse(pathstr)
-            matrix = Matrix(f"scale({sx},{sy})")
-            path.transform *= matrix
-            # channel(f"pathstr={pathstr[:10]}...{pathstr[-10:]}")
-            # channel(f"x={dim_x}, y={dim_y},")
-            node = elements.elem_branch.add(
-                path=abs(path),
-                stroke_width=0,
-                stroke_scaled=False,
-                type="elem path",
-                fillrule=0,  # nonzero
-                label=f"qr={code}",
+            items = list(zip(sources, all_codes, positions, [wd] * len(all_codes)))
+            # The grid is created (and burnt) row by row, in alternating
+            # directions if that keeps the travel for the first code shorter
+            geometry = None
+            module_size = 1.0
+            if pixel is None:
+                for this_code in all_codes:
+                    if this_code == "":
+                        continue
+                    symbol = qr_symbol(this_code, errcorr, version, boxsize, border)
+                    if symbol is not None:
+                        module_size = wd / symbol.columns
+                        geometry, __ = qr_shared(
+                            symbol,
+                            this_code,
+                            errcorr,
+                            version,
+                            boxsize,
+                            border,
+                            outline,
+                            None if line_width is None else line_width / wd,
+                        )
+                        break
+            order = grid_order(positions, columns, geometry, module_size, module_size)
+            items = [items[idx] for idx in order if items[idx][1] != ""]
+        symbols = {}
+        data = []
+        travel = TravelEstimate()
+
+        def prepare():
+            symbols.update(
+                qr_symbols(all_codes, errcorr, version, boxsize, border, workers)
             )
-            node.matrix.post_translate(-node.bounds[0] + xp, -node.bounds[1] + yp)
-            node.modified()
-            # elements.set_emphasis([node])
-            # node.focus()
-
-        data = [node]
-        elements.signal("element_added", data)
-        return elements, data
+
+        def produce(item):
+            """
+            Encoding and geometry, in the worker thread for background batches.
+            """
+            source, this_code, (this_x, this_y), this_wd = item
+            if this_code in symbols:
+                symbol = symbols[this_code]
+            else:
+                symbol = qr_symbol(this_code, errcorr, version, boxsize, border)
+            if symbol is None:
+                channel(
+                    _("Code does not fit into a qr-code of this size: {code}").format(
+                        code=this_code
+                    )
+                )
+                return None
+            with stats.stage("geometry"):
+                # Repeated codes share their geometry
+                if pixel is not None:
+                    geometry = qr_image(
+                        symbol, this_code, errcorr, version, boxsize, border, this_wd, pixel
+                    )
+                    segments = 0
+                else:
+                    # The hatch geometry is established relative to the width of the code
+                    geometry, segments = qr_shared(
+                        symbol,
+                        this_code,
+                        errcorr,
+                        version,
+                        boxsize,
+                        border,
+                        outline,
+                        None if line_width is None else line_width / this_wd,
+                    )
+            return source, this_code, symbol, geometry, segments, this_x, this_y, this_wd
+
+        def consume(results):
+            """
+            Creates the nodes, always in the main thread.
+            """
+            created = []
+            with paused_notifications(elements):
+                for (
+                    source,
+                    this_code,
+                    symbol,
+                    geometry,
+                    segments,
+                    this_x,
+                    this_y,
+                    this_wd,
+                ) in results:
+                    params = {
+                        "command": "qrcode",
+                        "template": source,
+                        "payload": this_code,
+                        "wordlist": states[source],
+                        "errcorr": errcorr,
+                        "version": version,
+                        "boxsize": boxsize,
+                        "border": border,
+                        "outline": outline,
+                        "hatch": line_width,
+                        "image": None if pixel is None else dpi,
+                        "dim": this_wd,
+                        "columns": symbol.columns,
+                    }
+                    with stats.stage("nodes"):
+                        if pixel is not None:
+                            node = qr_image_node(
+                                geometry, this_code, this_x, this_y, pixel, dpi, params
+                            )
+                        else:
+                            node = qr_node(
+                                symbol,
+                                geometry,
+                                this_code,
+                                this_x,
+                                this_y,
+                                this_wd,
+                                line_width,
+                                params=params,
+                            )
+                        created.append(node)
+                    stats.count("codes")
+                    stats.count("nodes")
+                    stats.count("segments", segments)
+                    if pixel is None:
+                        with stats.stage("travel"):
+                            module_size = this_wd / symbol.columns
+                            travel.add(geometry, this_x, this_y, module_size, module_size)
+                with stats.stage("nodes"):
+                    attach_nodes(elements.elem_branch, created)
+                    if remove and texts is not None:
+                        remove_placeholders(channel, _, texts, len(results))
+            data.extend(created)
+            with stats.stage("signal"):
+                elements.signal("element_added", created)
+
+        def finish(cancelled, error):
+            if error is not None:
+                channel(
+                    _("Stopped by an error ({error}), created {count} qr-codes").format(
+                        error=error, count=len(data)
+                    )
+                )
+                return
+            if cancelled:
+                channel(_("Cancelled, created {count} qr-codes").format(count=len(data)))
+                return
+            report_travel(_kernel, channel, _, travel)
+            if is_batch:
+                channel(_("Created {count} qr-codes").format(count=len(data)))
+
+        threshold = _kernel.root.barcode_background
+        if is_batch and 0 < threshold <= len(items):
+            # Codes from texts replace them in one go
+            chunk_size = len(items) if texts is not None else 50
+            job = BatchJob(
+                "qrcode",
+                items,
+                produce,
+                consume,
+                channel,
+                finish,
+                chunk_size,
+                prepare=prepare,
+            )
+            channel(
+                _(
+                    "Creating {count} qr-codes in the background, barcode_cancel stops it"
+                ).format(count=len(items))
+            )
+            start_batch(_kernel, job)
+            # Empty for now, the codes are added as their chunks are created
+            return "elements", data
+        BatchJob(
+            "qrcode", items, produce, consume, None, finish, len(items), prepare=prepare
+        ).run()
+        return "elements", data
+
+    def apply_qr(node, params):
+        """
+        Brings a qr code in line with new generation parameters, in place.
+        The node keeps its matrix, a new size (or a different number of
+        modules) is applied in front of it. The encoding comes from the
+        cache, the path is only created again if the symbol or the style
+        changed, so a new size is just a new matrix.
+        @param node: path node carrying the parameters
+        @param params: new parameters, payload already translated
+        @return: False if the code doesn't fit with these parameters
+        """
+        if params.get("image"):
+            return apply_qr_image(node, params)
+        old = node.mkbarcode
+        keys = ("payload", "errcorr", "version", "boxsize", "border", "outline")
+        columns = old["columns"]
+        hatch = params["hatch"]
+        with stats.stage("update"):
+            if any(params[key] != old[key] for key in keys) or (
+                hatch is not None and (hatch != old["hatch"] or params["dim"] != old["dim"])
+            ):
+                symbol = qr_symbol(
+                    params["payload"],
+                    params["errcorr"],
+                    params["version"],
+                    params["boxsize"],
+                    params["border"],
+                )
+                if symbol is None:
+                    return False
+                columns = symbol.columns
+                # A geometry of its own, unless there are more of the same code
+                node.geometry, segments = qr_shared(
+                    symbol,
+                    params["payload"],
+                    params["errcorr"],
+                    params["version"],
+                    params["boxsize"],
+                    params["border"],
+                    params["outline"],
+                    None if hatch is None else hatch / params["dim"],
+                )
+                stats.count("segments", segments)
+            ratio = (params["dim"] / columns) / (old["dim"] / old["columns"])
+            if ratio != 1:
+                node.matrix = Matrix(ratio, 0, 0, ratio, 0, 0) * node.matrix
+            node.label = f"qr={params['payload']}"
+            # Never modify the dictionary, copies of the node share it
+            node.mkbarcode = dict(params, columns=columns)
+            node.altered()
+        stats.count("updated")
+        return True
+
+    def apply_qr_image(node, params):
+        """
+        An image node gets a new image for every change, the modules have
+        to stay blocks of whole pixels. The node keeps its position.
+        """
+        symbol = qr_symbol(
+            params["payload"],
+            params["errcorr"],
+            params["version"],
+            params["boxsize"],
+            params["border"],
+        )
+        if symbol is None:
+            return False
+        pixel, dpi = image_resolution(_kernel, params["image"])
+        with stats.stage("update"):
+            node.image = qr_image(
+                symbol,
+                params["payload"],
+                params["errcorr"],
+                params["version"],
+                params["boxsize"],
+                params["border"],
+                params["dim"],
+                pixel,
+            )
+            node.matrix = Matrix(pixel, 0, 0, pixel, node.matrix.e, node.matrix.f)
+            node.dpi = dpi
+            node.label = f"qr={params['payload']}"
+            node.mkbarcode = dict(params, image=dpi, columns=symbol.columns)
+            node.update(None)
+            node.altered()
+        stats.count("updated")
+        return True
+
+    kernel.register("barcode/apply/qrcode", apply_qr)
+
+    def encode_row(row, encode=True):
+        """
+        Encodes a row of a job file (see jobfile.parse_row), runs in the worker.
+        @param encode: False just checks the row, nothing is encoded
+        @return: function creating the (detached) nodes, to be called in the main thread
+        @raise ValueError: if the row can't be encoded
+        """
+        elements = _kernel.elements
+        code = row["payload"]
+        errcorr = row.get("errcorr", "M").upper()
+        if errcorr not in ("L", "M", "Q", "H"):
+            raise ValueError(_("Invalid error correction, use one of L, M, Q, H"))
+        version = row.get("version")
+        if version is not None and not 1 <= version <= 40:
+            raise ValueError(_("Invalid version {version}, use 1..40").format(version=version))
+        boxsize = row.get("boxsize", 10)
+        border = max(4, row.get("border", 4))
+        outline = row.get("outline", False)
+        try:
+            if boxsize <= 0:
+                raise ValueError
+            xp = elements.length_x(row["x"])
+            yp = elements.length_y(row["y"])
+            wd = elements.length(row["width"])
+            line_width = None
+            if "hatch" in row:
+                line_width = elements.length(row["hatch"])
+                if line_width <= 0:
+                    raise ValueError
+            pixel = dpi = None
+            if row.get("dpi", 1) <= 0:
+                raise ValueError
+            if row.get("image", False):
+                pixel, dpi = image_resolution(_kernel, row.get("dpi"))
+                outline = False
+                line_width = None
+        except ValueError:
+            raise ValueError(_("Invalid dimensions provided")) from None
+        if not encode:
+            try:
+                check_qr(code, errcorr, version)
+            except ValueError as e:
+                raise ValueError(
+                    _("Invalid code {code}: {error}").format(code=code, error=e)
+                ) from None
+            return None
+        symbol = qr_symbol(code, errcorr, version, boxsize, border)
+        if symbol is None:
+            raise ValueError(
+                _("Code does not fit into a qr-code of this size: {code}").format(code=code)
+            )
+        with stats.stage("geometry"):
+            if pixel is not None:
+                geometry = qr_image(
+                    symbol, code, errcorr, version, boxsize, border, wd, pixel
+                )
+                segments = 0
+            else:
+                geometry, segments = qr_shared(
+                    symbol,
+                    code,
+                    errcorr,
+                    version,
+                    boxsize,
+                    border,
+                    outline,
+                    None if line_width is None else line_width / wd,
+                )
+        params = {
+            "command": "qrcode",
+            "template": code,
+            "payload": code,
+            "errcorr": errcorr,
+            "version": version,
+            "boxsize": boxsize,
+            "border": border,
+            "outline": outline,
+            "hatch": line_width,
+            "image": dpi,
+            "dim": wd,
+            "columns": symbol.columns,
+        }
+
+        def place():
+            stats.count("codes")
+            stats.count("nodes")
+            stats.count("segments", segments)
+            if pixel is not None:
+                return [qr_image_node(geometry, code, xp, yp, pixel, dpi, params)]
+            return [
+                qr_node(
+                    symbol, geometry, code, xp, yp, wd, line_width, params=params
+                )
+            ]
+
+        return place
+
+    kernel.register("barcode/row/qrcode", encode_row)
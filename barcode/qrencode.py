@@ -0,0 +1,46 @@
+"""
+QR encoding, independent of meerk40t so it can run in worker processes.
+
+Encoding (data chunking, Reed-Solomon, evaluating all masks) is by far the
+most expensive part of a qr code. We use our own vectorized encoder (see
+qrengine), for large batches we additionally distribute it over a process
+pool, only the bit-packed Symbols come back.
+"""
+
+from .qrengine import DataOverflowError, encode
+from .symbol import Symbol
+
+
+def qr_modules(code, errcorr="M", version=None, boxsize=10, border=4):
+    """
+    Encodes a code, the module matrix (without the border) is all we need.
+    boxsize and border don't affect the modules, they are only part of the
+    signature to keep the cache keys and worker jobs aligned.
+    @param code: text to encode
+    @param errcorr: error correction level, one of L, M, Q, H
+    @param version: size (1..40), None chooses the smallest that fits
+    @return: module matrix (boolean numpy array) or None if the code doesn't fit into version
+    """
+    try:
+        return encode(code, errcorr, version)
+    except DataOverflowError:
+        return None
+
+
+def qr_symbol(code, errcorr="M", version=None, boxsize=10, border=4):
+    """
+    Encodes a code into a Symbol with modules of size 1.
+    @return: Symbol or None if the code doesn't fit into version
+    """
+    modules = qr_modules(code, errcorr, version, boxsize, border)
+    if modules is None:
+        return None
+    return Symbol.from_modules(modules, quiet_zone=border)
+
+
+def encode_symbol(job):
+    """
+    Worker entry point: job is a tuple of qr_symbol arguments.
+    @return: Symbol or None
+    """
+    return qr_symbol(*job)
@@ -0,0 +1,615 @@
+"""
+Native QR encoder.
+
+The qrcode library establishes the version by trial and evaluates the
+penalties of all eight masks with pure python loops over every module, which
+gets expensive for large codes. This engine looks the version up in the
+capacity tables, computes the Reed-Solomon codewords with table driven
+GF(256) arithmetic for all blocks at once and scores all masks as vectorized
+numpy operations over boolean matrices.
+
+The result is bit-identical to the qrcode library for the same data, version,
+error correction and mask, including its data segmentation and its choice of
+the best mask (test_qrengine compares both).
+"""
+
+import re
+from bisect import bisect_left
+from functools import lru_cache
+
+import numpy as np
+
+# Increase whenever the symbols produced change, persistent caches are keyed by it
+ENGINE_VERSION = 1
+
+# Error correction level -> (format indicator, index into RS_BLOCK_TABLE rows)
+ERROR_LEVELS = {
+    "L": (1, 0),
+    "M": (0, 1),
+    "Q": (3, 2),
+    "H": (2, 3),
+}
+
+# Number of rs blocks, total codewords, data codewords (optionally twice)
+# for every version and error correction level L, M, Q, H
+RS_BLOCK_TABLE = (
+    ((1, 26, 19), (1, 26, 16), (1, 26, 13), (1, 26, 9)),  # 1
+    ((1, 44, 34), (1, 44, 28), (1, 44, 22), (1, 44, 16)),  # 2
+    ((1, 70, 55), (1, 70, 44), (2, 35, 17), (2, 35, 13)),  # 3
+    ((1, 100, 80), (2, 50, 32), (2, 50, 24), (4, 25, 9)),  # 4
+    ((1, 134, 108), (2, 67, 43), (2, 33, 15, 2, 34, 16), (2, 33, 11, 2, 34, 12)),  # 5
+    ((2, 86, 68), (4, 43, 27), (4, 43, 19), (4, 43, 15)),  # 6
+    ((2, 98, 78), (4, 49, 31), (2, 32, 14, 4, 33, 15), (4, 39, 13, 1, 40, 14)),  # 7
+    ((2, 121, 97), (2, 60, 38, 2, 61, 39), (4, 40, 18, 2, 41, 19), (4, 40, 14, 2, 41, 15)),  # 8
+    ((2, 146, 116), (3, 58, 36, 2, 59, 37), (4, 36, 16, 4, 37, 17), (4, 36, 12, 4, 37, 13)),  # 9
+    ((2, 86, 68, 2, 87, 69), (4, 69, 43, 1, 70, 44),  # 10
+     (6, 43, 19, 2, 44, 20), (6, 43, 15, 2, 44, 16)),
+    ((4, 101, 81), (1, 80, 50, 4, 81, 51), (4, 50, 22, 4, 51, 23), (3, 36, 12, 8, 37, 13)),  # 11
+    ((2, 116, 92, 2, 117, 93), (6, 58, 36, 2, 59, 37),  # 12
+     (4, 46, 20, 6, 47, 21), (7, 42, 14, 4, 43, 15)),
+    ((4, 133, 107), (8, 59, 37, 1, 60, 38), (8, 44, 20, 4, 45, 21), (12, 33, 11, 4, 34, 12)),  # 13
+    ((3, 145, 115, 1, 146, 116), (4, 64, 40, 5, 65, 41),  # 14
+     (11, 36, 16, 5, 37, 17), (11, 36, 12, 5, 37, 13)),
+    ((5, 109, 87, 1, 110, 88), (5, 65, 41, 5, 66, 42),  # 15
+     (5, 54, 24, 7, 55, 25), (11, 36, 12, 7, 37, 13)),
+    ((5, 122, 98, 1, 123, 99), (7, 73, 45, 3, 74, 46),  # 16
+     (15, 43, 19, 2, 44, 20), (3, 45, 15, 13, 46, 16)),
+    ((1, 135, 107, 5, 136, 108), (10, 74, 46, 1, 75, 47),  # 17
+     (1, 50, 22, 15, 51, 23), (2, 42, 14, 17, 43, 15)),
+    ((5, 150, 120, 1, 151, 121), (9, 69, 43, 4, 70, 44),  # 18
+     (17, 50, 22, 1, 51, 23), (2, 42, 14, 19, 43, 15)),
+    ((3, 141, 113, 4, 142, 114), (3, 70, 44, 11, 71, 45),  # 19
+     (17, 47, 21, 4, 48, 22), (9, 39, 13, 16, 40, 14)),
+    ((3, 135, 107, 5, 136, 108), (3, 67, 41, 13, 68, 42),  # 20
+     (15, 54, 24, 5, 55, 25), (15, 43, 15, 10, 44, 16)),
+    ((4, 144, 116, 4, 145, 117), (17, 68, 42),  # 21
+     (17, 50, 22, 6, 51, 23), (19, 46, 16, 6, 47, 17)),
+    ((2, 139, 111, 7, 140, 112), (17, 74, 46), (7, 54, 24, 16, 55, 25), (34, 37, 13)),  # 22
+    ((4, 151, 121, 5, 152, 122), (4, 75, 47, 14, 76, 48),  # 23
+     (11, 54, 24, 14, 55, 25), (16, 45, 15, 14, 46, 16)),
+    ((6, 147, 117, 4, 148, 118), (6, 73, 45, 14, 74, 46),  # 24
+     (11, 54, 24, 16, 55, 25), (30, 46, 16, 2, 47, 17)),
+    ((8, 132, 106, 4, 133, 107), (8, 75, 47, 13, 76, 48),  # 25
+     (7, 54, 24, 22, 55, 25), (22, 45, 15, 13, 46, 16)),
+    ((10, 142, 114, 2, 143, 115), (19, 74, 46, 4, 75, 47),  # 26
+     (28, 50, 22, 6, 51, 23), (33, 46, 16, 4, 47, 17)),
+    ((8, 152, 122, 4, 153, 123), (22, 73, 45, 3, 74, 46),  # 27
+     (8, 53, 23, 26, 54, 24), (12, 45, 15, 28, 46, 16)),
+    ((3, 147, 117, 10, 148, 118), (3, 73, 45, 23, 74, 46),  # 28
+     (4, 54, 24, 31, 55, 25), (11, 45, 15, 31, 46, 16)),
+    ((7, 146, 116, 7, 147, 117), (21, 73, 45, 7, 74, 46),  # 29
+     (1, 53, 23, 37, 54, 24), (19, 45, 15, 26, 46, 16)),
+    ((5, 145, 115, 10, 146, 116), (19, 75, 47, 10, 76, 48),  # 30
+     (15, 54, 24, 25, 55, 25), (23, 45, 15, 25, 46, 16)),
+    ((13, 145, 115, 3, 146, 116), (2, 74, 46, 29, 75, 47),  # 31
+     (42, 54, 24, 1, 55, 25), (23, 45, 15, 28, 46, 16)),
+    ((17, 145, 115), (10, 74, 46, 23, 75, 47),  # 32
+     (10, 54, 24, 35, 55, 25), (19, 45, 15, 35, 46, 16)),
+    ((17, 145, 115, 1, 146, 116), (14, 74, 46, 21, 75, 47),  # 33
+     (29, 54, 24, 19, 55, 25), (11, 45, 15, 46, 46, 16)),
+    ((13, 145, 115, 6, 146, 116), (14, 74, 46, 23, 75, 47),  # 34
+     (44, 54, 24, 7, 55, 25), (59, 46, 16, 1, 47, 17)),
+    ((12, 151, 121, 7, 152, 122), (12, 75, 47, 26, 76, 48),  # 35
+     (39, 54, 24, 14, 55, 25), (22, 45, 15, 41, 46, 16)),
+    ((6, 151, 121, 14, 152, 122), (6, 75, 47, 34, 76, 48),  # 36
+     (46, 54, 24, 10, 55, 25), (2, 45, 15, 64, 46, 16)),
+    ((17, 152, 122, 4, 153, 123), (29, 74, 46, 14, 75, 47),  # 37
+     (49, 54, 24, 10, 55, 25), (24, 45, 15, 46, 46, 16)),
+    ((4, 152, 122, 18, 153, 123), (13, 74, 46, 32, 75, 47),  # 38
+     (48, 54, 24, 14, 55, 25), (42, 45, 15, 32, 46, 16)),
+    ((20, 147, 117, 4, 148, 118), (40, 75, 47, 7, 76, 48),  # 39
+     (43, 54, 24, 22, 55, 25), (10, 45, 15, 67, 46, 16)),
+    ((19, 148, 118, 6, 149, 119), (18, 75, 47, 31, 76, 48),  # 40
+     (34, 54, 24, 34, 55, 25), (20, 45, 15, 61, 46, 16)),
+)
+
+MODE_NUMBER = 1
+MODE_ALPHA_NUM = 2
+MODE_8BIT_BYTE = 4
+
+# Bits of the length field per mode for version 1-9, 10-26, 27-40
+MODE_SIZES = (
+    {MODE_NUMBER: 10, MODE_ALPHA_NUM: 9, MODE_8BIT_BYTE: 8},
+    {MODE_NUMBER: 12, MODE_ALPHA_NUM: 11, MODE_8BIT_BYTE: 16},
+    {MODE_NUMBER: 14, MODE_ALPHA_NUM: 13, MODE_8BIT_BYTE: 16},
+)
+
+ALPHA_NUM = b"0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ $%*+-./:"
+NUMBER_LENGTH = {3: 10, 2: 7, 1: 4}
+
+PAD0 = 0xEC
+PAD1 = 0x11
+
+# Mask penalty patterns: 1:1:3:1:1 finder-like pattern with 4 light modules
+PENALTY_PATTERNS = (0b10111010000, 0b00001011101)
+
+
+class DataOverflowError(ValueError):
+    pass
+
+
+def _size_class(version):
+    if version < 10:
+        return 0
+    if version < 27:
+        return 1
+    return 2
+
+
+def rs_blocks(version, level):
+    """
+    @return: list of (total_count, data_count) tuples for every block
+    """
+    row = RS_BLOCK_TABLE[version - 1][ERROR_LEVELS[level][1]]
+    blocks = []
+    for i in range(0, len(row), 3):
+        count, total_count, data_count = row[i : i + 3]
+        blocks.extend([(total_count, data_count)] * count)
+    return blocks
+
+
+# Capacity in bits for every level, indexed by version (index 0 is unused)
+BIT_LIMIT_TABLE = {
+    level: [0]
+    + [8 * sum(dc for tc, dc in rs_blocks(version, level)) for version in range(1, 41)]
+    for level in ERROR_LEVELS
+}
+
+# GF(256) with the qr polynomial x^8 + x^4 + x^3 + x^2 + 1
+GF_EXP = np.zeros(512, dtype=np.int32)
+GF_LOG = np.zeros(256, dtype=np.int32)
+_value = 1
+for _i in range(255):
+    GF_EXP[_i] = _value
+    GF_LOG[_value] = _i
+    _value <<= 1
+    if _value & 0x100:
+        _value ^= 0x11D
+GF_EXP[255:510] = GF_EXP[:255]
+del _value, _i
+
+
+def _gf_mul_table():
+    a = np.arange(256)
+    product = GF_EXP[(GF_LOG[a][:, None] + GF_LOG[a][None, :]) % 255]
+    product[0, :] = 0
+    product[:, 0] = 0
+    return product.astype(np.uint8)
+
+
+GF_MUL = _gf_mul_table()
+
+
+@lru_cache(maxsize=None)
+def _generator_table(ec_count):
+    """
+    Multiplication table of the generator polynomial of degree ec_count:
+    row f holds f * g(x) without the leading coefficient.
+    """
+    poly = [1]
+    for i in range(ec_count):
+        # multiply with (x - a^i)
+        root = int(GF_EXP[i])
+        result = poly + [0]
+        for j, coefficient in enumerate(poly):
+            result[j + 1] ^= int(GF_MUL[coefficient, root])
+        poly = result
+    return GF_MUL[:, np.array(poly[1:], dtype=np.uint8)]
+
+
+def rs_encode(blocks, ec_count):
+    """
+    Computes the error correction codewords of several blocks at once
+    by polynomial division, one data codeword per step for all blocks.
+    @param blocks: uint8 array (block count, data count)
+    @param ec_count: number of error correction codewords per block
+    @return: uint8 array (block count, ec count)
+    """
+    table = _generator_table(ec_count)
+    remainder = np.zeros((blocks.shape[0], ec_count), dtype=np.uint8)
+    for i in range(blocks.shape[1]):
+        factor = blocks[:, i] ^ remainder[:, 0]
+        remainder[:, :-1] = remainder[:, 1:]
+        remainder[:, -1] = 0
+        remainder ^= table[factor]
+    return remainder
+
+
+def _optimal_split(data, pattern):
+    while data:
+        match = re.search(pattern, data)
+        if not match:
+            break
+        start, end = match.start(), match.end()
+        if start:
+            yield False, data[:start]
+        yield True, data[start:end]
+        data = data[end:]
+    if data:
+        yield False, data
+
+
+def data_segments(data, minimum=20):
+    """
+    Splits data into (mode, bytes) segments the same way the qrcode library
+    does: numeric and alphanumeric runs of at least minimum characters get
+    their own segments.
+    """
+    if not isinstance(data, bytes):
+        data = str(data).encode("utf-8")
+    num_pattern = rb"\d"
+    alpha_pattern = b"[" + re.escape(ALPHA_NUM) + b"]"
+    if len(data) <= minimum:
+        num_pattern = re.compile(b"^" + num_pattern + b"+$")
+        alpha_pattern = re.compile(b"^" + alpha_pattern + b"+$")
+    else:
+        re_repeat = b"{" + str(minimum).encode("ascii") + b",}"
+        num_pattern = re.compile(num_pattern + re_repeat)
+        alpha_pattern = re.compile(alpha_pattern + re_repeat)
+    segments = []
+    for is_num, chunk in _optimal_split(data, num_pattern):
+        if is_num:
+            segments.append((MODE_NUMBER, chunk))
+            continue
+        for is_alpha, sub_chunk in _optimal_split(chunk, alpha_pattern):
+            segments.append((MODE_ALPHA_NUM if is_alpha else MODE_8BIT_BYTE, sub_chunk))
+    return segments
+
+
+class BitStream:
+    """
+    Collects bits in a python integer.
+    """
+
+    def __init__(self):
+        self.value = 0
+        self.length = 0
+
+    def __len__(self):
+        return self.length
+
+    def put(self, num, length):
+        self.value = (self.value << length) | (num & ((1 << length) - 1))
+        self.length += length
+
+    def to_bytes(self):
+        """Pads to a full byte with 0s"""
+        delimit = self.length % 8
+        if delimit:
+            self.put(0, 8 - delimit)
+        return self.value.to_bytes(self.length // 8, "big")
+
+
+def _write_segments(segments, version):
+    sizes = MODE_SIZES[_size_class(version)]
+    buffer = BitStream()
+    for mode, chunk in segments:
+        buffer.put(mode, 4)
+        buffer.put(len(chunk), sizes[mode])
+        if mode == MODE_NUMBER:
+            for i in range(0, len(chunk), 3):
+                chars = chunk[i : i + 3]
+                buffer.put(int(chars), NUMBER_LENGTH[len(chars)])
+        elif mode == MODE_ALPHA_NUM:
+            for i in range(0, len(chunk), 2):
+                chars = chunk[i : i + 2]
+                if len(chars) > 1:
+                    buffer.put(
+                        ALPHA_NUM.find(chars[0]) * 45 + ALPHA_NUM.find(chars[1]), 11
+                    )
+                else:
+                    buffer.put(ALPHA_NUM.find(chars), 6)
+        else:
+            buffer.put(int.from_bytes(chunk, "big"), 8 * len(chunk))
+    return buffer
+
+
+def best_version(segments, level, start=1):
+    """
+    Finds the smallest version the segments fit into, straight from the
+    capacity table. The length fields depend on the version, so if the
+    result lies in another size class than start we look again from there.
+    @return: version or None if the data is too large for any version
+    """
+    needed_bits = len(_write_segments(segments, start))
+    version = bisect_left(BIT_LIMIT_TABLE[level], needed_bits, start)
+    if version > 40:
+        return None
+    if _size_class(version) != _size_class(start):
+        return best_version(segments, level, version)
+    return version
+
+
+def required_version(data, errcorr="M"):
+    """
+    The smallest version data fits into, without encoding it.
+    @return: version or None if data is too large for any version
+    """
+    if errcorr not in ERROR_LEVELS:
+        errcorr = "M"
+    return best_version(data_segments(data), errcorr)
+
+
+def codewords(segments, version, level):
+    """
+    Creates the final sequence of data and error correction codewords.
+    @return: uint8 array
+    """
+    buffer = _write_segments(segments, version)
+    blocks = rs_blocks(version, level)
+    bit_limit = BIT_LIMIT_TABLE[level][version]
+    if len(buffer) > bit_limit:
+        raise DataOverflowError(
+            f"Code length overflow. Data size ({len(buffer)}) > size available ({bit_limit})"
+        )
+    # Terminator, byte alignment and alternating pad codewords
+    buffer.put(0, min(bit_limit - len(buffer), 4))
+    data = buffer.to_bytes()
+    pad_count = bit_limit // 8 - len(data)
+    data += bytes((PAD0, PAD1)) * (pad_count // 2) + bytes((PAD0,)) * (pad_count % 2)
+    data = np.frombuffer(data, dtype=np.uint8)
+
+    ec_count = blocks[0][0] - blocks[0][1]
+    max_dc = max(dc for tc, dc in blocks)
+    # Shorter blocks get a leading 0, which doesn't change the remainder
+    padded = np.zeros((len(blocks), max_dc), dtype=np.uint8)
+    valid = np.zeros((len(blocks), max_dc), dtype=bool)
+    offset = 0
+    for idx, (tc, dc) in enumerate(blocks):
+        padded[idx, max_dc - dc :] = data[offset : offset + dc]
+        valid[idx, :dc] = True
+        offset += dc
+    remainders = rs_encode(padded, ec_count)
+    # Interleave: data codewords column by column, the leading pads are
+    # shifted to the end of their rows so short blocks just run out earlier.
+    shifted = np.zeros_like(padded)
+    for idx, (tc, dc) in enumerate(blocks):
+        shifted[idx, :dc] = padded[idx, max_dc - dc :]
+    return np.concatenate((shifted.T[valid.T], remainders.T.ravel()))
+
+
+def alignment_positions(version):
+    if version == 1:
+        return []
+    count = version // 7 + 2
+    size = version * 4 + 17
+    if version == 32:
+        step = 26
+    else:
+        step = (version * 4 + count * 2 + 1) // (count * 2 - 2) * 2
+    return [6] + list(range(size - 7 - step * (count - 2), size - 6, step))
+
+
+def _bch_type_info(data):
+    d = data << 10
+    g15 = 0b10100110111
+    while d.bit_length() - g15.bit_length() >= 0:
+        d ^= g15 << (d.bit_length() - g15.bit_length())
+    return ((data << 10) | d) ^ 0b101010000010010
+
+
+def _bch_type_number(data):
+    d = data << 12
+    g18 = 0b1111100100101
+    while d.bit_length() - g18.bit_length() >= 0:
+        d ^= g18 << (d.bit_length() - g18.bit_length())
+    return (data << 12) | d
+
+
+def _format_positions(count):
+    """
+    Positions of the 15 format bits, once vertical and once horizontal.
+    """
+    vertical = []
+    horizontal = []
+    for i in range(15):
+        if i < 6:
+            vertical.append((i, 8))
+        elif i < 8:
+            vertical.append((i + 1, 8))
+        else:
+            vertical.append((count - 15 + i, 8))
+        if i < 8:
+            horizontal.append((8, count - i - 1))
+        elif i < 9:
+            horizontal.append((8, 15 - i))
+        else:
+            horizontal.append((8, 15 - i - 1))
+    return vertical, horizontal
+
+
+@lru_cache(maxsize=None)
+def _template(version):
+    """
+    Function patterns of a version.
+    @return: tuple (values, reserved, rows, cols): module values with format and
+        version information blank, mask of all function modules and the
+        coordinates of the data modules in placement order
+    """
+    count = version * 4 + 17
+    values = np.zeros((count, count), dtype=bool)
+    reserved = np.zeros((count, count), dtype=bool)
+    # Finder patterns with separators
+    for row, col in ((0, 0), (count - 7, 0), (0, count - 7)):
+        for r in range(-1, 8):
+            if not 0 <= row + r < count:
+                continue
+            for c in range(-1, 8):
+                if not 0 <= col + c < count:
+                    continue
+                reserved[row + r, col + c] = True
+                values[row + r, col + c] = (
+                    (0 <= r <= 6 and c in (0, 6))
+                    or (0 <= c <= 6 and r in (0, 6))
+                    or (2 <= r <= 4 and 2 <= c <= 4)
+                )
+    # Alignment patterns, unless they would overlap the finders
+    positions = alignment_positions(version)
+    for row in positions:
+        for col in positions:
+            if reserved[row, col]:
+                continue
+            for r in range(-2, 3):
+                for c in range(-2, 3):
+                    reserved[row + r, col + c] = True
+                    values[row + r, col + c] = (
+                        abs(r) == 2 or abs(c) == 2 or (r == 0 and c == 0)
+                    )
+    # Timing patterns
+    for i in range(8, count - 8):
+        if not reserved[i, 6]:
+            reserved[i, 6] = True
+            values[i, 6] = i % 2 == 0
+        if not reserved[6, i]:
+            reserved[6, i] = True
+            values[6, i] = i % 2 == 0
+    # Format information (and the dark module) and version information
+    vertical, horizontal = _format_positions(count)
+    for row, col in vertical + horizontal + [(count - 8, 8)]:
+        reserved[row, col] = True
+    if version >= 7:
+        reserved[:6, count - 11 : count - 8] = True
+        reserved[count - 11 : count - 8, :6] = True
+    # Data modules in placement order: pairs of columns from the right,
+    # alternating upwards and downwards, skipping the vertical timing pattern
+    order_rows = []
+    order_cols = []
+    upwards = True
+    for col in range(count - 1, 0, -2):
+        if col <= 6:
+            col -= 1
+        rows = range(count - 1, -1, -1) if upwards else range(count)
+        for row in rows:
+            for c in (col, col - 1):
+                if not reserved[row, c]:
+                    order_rows.append(row)
+                    order_cols.append(c)
+        upwards = not upwards
+    return (
+        values,
+        reserved,
+        np.array(order_rows, dtype=np.intp),
+        np.array(order_cols, dtype=np.intp),
+    )
+
+
+@lru_cache(maxsize=None)
+def _masks(count):
+    """
+    All eight mask patterns as one boolean array (8, count, count)
+    """
+    i, j = np.indices((count, count))
+    return np.array(
+        (
+            (i + j) % 2 == 0,
+            i % 2 == 0,
+            j % 3 == 0,
+            (i + j) % 3 == 0,
+            (i // 2 + j // 3) % 2 == 0,
+            (i * j) % 2 + (i * j) % 3 == 0,
+            ((i * j) % 2 + (i * j) % 3) % 2 == 0,
+            ((i * j) % 3 + (i + j) % 2) % 2 == 0,
+        )
+    )
+
+
+def penalties(candidates):
+    """
+    Evaluates the mask penalties of several matrices at once, with the same
+    rules as the qrcode library.
+    @param candidates: boolean array (n, count, count)
+    @return: integer array with n penalties
+    """
+    n, count, __ = candidates.shape
+    both = (candidates, candidates.transpose(0, 2, 1))
+    # 1: runs of 5 or more modules of the same color in rows and columns
+    lost = np.zeros(n, dtype=np.int64)
+    for matrix in both:
+        # A sentinel column separates the rows from each other
+        flat = np.concatenate(
+            (matrix.astype(np.int8), np.full((n, count, 1), 2, dtype=np.int8)), axis=2
+        ).ravel()
+        starts = np.concatenate(([0], np.flatnonzero(flat[1:] != flat[:-1]) + 1))
+        lengths = np.diff(np.concatenate((starts, [flat.size])))
+        long_runs = lengths >= 5
+        owner = starts[long_runs] // (count * (count + 1))
+        lost += np.bincount(
+            owner, weights=lengths[long_runs] - 2, minlength=n
+        ).astype(np.int64)
+    # 2: 2x2 blocks of the same color
+    block = candidates[:, :-1, :-1]
+    same = (
+        (block == candidates[:, 1:, :-1])
+        & (block == candidates[:, :-1, 1:])
+        & (block == candidates[:, 1:, 1:])
+    )
+    lost += 3 * same.sum(axis=(1, 2))
+    # 3: finder-like patterns in rows and columns
+    if count > 10:
+        for matrix in both:
+            window = np.zeros((n, count, count - 10), dtype=np.int32)
+            for k in range(11):
+                window = (window << 1) | matrix[:, :, k : count - 10 + k]
+            found = (window == PENALTY_PATTERNS[0]) | (window == PENALTY_PATTERNS[1])
+            lost += 40 * found.sum(axis=(1, 2))
+    # 4: proportion of dark modules
+    dark = candidates.sum(axis=(1, 2))
+    for idx in range(n):
+        percent = float(dark[idx]) / (count**2)
+        lost[idx] += int(abs(percent * 100 - 50) / 5) * 10
+    return lost
+
+
+def encode(data, errcorr="M", version=None, mask=None):
+    """
+    Encodes data as qr code.
+    @param data: text or bytes
+    @param errcorr: error correction level, one of L, M, Q, H
+    @param version: size (1..40), None chooses the smallest that fits
+    @param mask: mask pattern (0..7), None chooses the best one
+    @return: boolean numpy array with the modules (without quiet zone)
+    @raise DataOverflowError: if data does not fit into version
+    @raise ValueError: if version is not in 1..40
+    """
+    if version is not None and not 1 <= version <= 40:
+        raise ValueError(f"Invalid version {version}, use 1..40")
+    if errcorr not in ERROR_LEVELS:
+        errcorr = "M"
+    segments = data_segments(data)
+    if version is None:
+        version = best_version(segments, errcorr)
+        if version is None:
+            raise DataOverflowError("Data too large for any qr code")
+    words = codewords(segments, version, errcorr)
+    values, reserved, rows, cols = _template(version)
+    count = version * 4 + 17
+
+    # Remainder bits after the last codeword stay light
+    bits = np.zeros(len(rows), dtype=bool)
+    bits[: 8 * len(words)] = np.unpackbits(words)
+    placed = np.zeros((count, count), dtype=bool)
+    placed[rows, cols] = bits
+    data_modules = ~reserved
+    masks = _masks(count)
+    if mask is None:
+        # Like the library we score the masks with blank format information
+        candidates = values[None, :, :] | ((placed[None, :, :] ^ masks) & data_modules)
+        mask = int(np.argmin(penalties(candidates)))
+        modules = candidates[mask].copy()
+    else:
+        modules = values | ((placed ^ masks[mask]) & data_modules)
+
+    format_bits = _bch_type_info((ERROR_LEVELS[errcorr][0] << 3) | mask)
+    vertical, horizontal = _format_positions(count)
+    for i in range(15):
+        bit = (format_bits >> i) & 1 == 1
+        modules[vertical[i]] = bit
+        modules[horizontal[i]] = bit
+    modules[count - 8, 8] = True
+    if version >= 7:
+        version_bits = _bch_type_number(version)
+        for i in range(18):
+            bit = (version_bits >> i) & 1 == 1
+            modules[i // 3, i % 3 + count - 11] = bit
+            modules[i % 3 + count - 11, i // 3] = bit
+    return modules
@@ -0,0 +1,96 @@
+"""
+Timing instrumentation for the barcode commands.
+
+Every command splits its work into stages (encode, geometry, nodes, signal),
+we aggregate the time spent in every stage plus some counters (codes, nodes,
+path segments) until they are dumped and reset with barcode_stats.
+The overhead is two perf_counter calls per stage.
+"""
+
+import functools
+from contextlib import contextmanager
+from threading import Lock
+from time import perf_counter
+
+
+class Statistics:
+    """
+    Aggregated stage timings and counters.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        # stage: [total seconds, number of calls]
+        self.stages = {}
+        self.counters = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, perf_counter() - start)
+
+    def add_time(self, name, seconds):
+        with self._lock:
+            entry = self.stages.get(name)
+            if entry is None:
+                self.stages[name] = [seconds, 1]
+            else:
+                entry[0] += seconds
+                entry[1] += 1
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def reset(self):
+        with self._lock:
+            self.stages.clear()
+            self.counters.clear()
+
+    def report(self):
+        """
+        @return: list of text lines, the stages sorted by the time spent
+        """
+        with self._lock:
+            stages = sorted(self.stages.items(), key=lambda e: -e[1][0])
+            counters = sorted(self.counters.items())
+        total = sum(seconds for name, (seconds, calls) in stages)
+        lines = []
+        for name, (seconds, calls) in stages:
+            share = seconds / total if total else 0
+            lines.append(
+                f"{name:<10} {seconds * 1000:10.1f} ms {share:6.1%} {calls:8d} calls "
+                f"{seconds * 1000000 / calls:10.1f} us/call"
+            )
+        for name, value in counters:
+            lines.append(f"{name:<10} {value:10d}")
+        return lines
+
+
+def profiled(func):
+    """
+    Decorator for console commands: with a 'profile' keyword the invocation
+    runs under cProfile and the statistics are written to that file
+    (to be inspected with pstats or snakeviz).
+    """
+
+    @functools.wraps(func)
+    def wrapper(command, channel, _, *args, profile=None, **kwargs):
+        if profile is None:
+            return func(command, channel, _, *args, **kwargs)
+        import cProfile
+
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(func, command, channel, _, *args, **kwargs)
+        finally:
+            try:
+                profiler.dump_stats(profile)
+                channel(_("Profile written to {file}").format(file=profile))
+            except OSError as e:
+                channel(_("Could not write profile: {error}").format(error=e))
+
+    return wrapper
@@ -0,0 +1,136 @@
+"""
+Common intermediate representation of all codes.
+
+Both commands encode a code into a Symbol first: the dark/light modules
+bit-packed into a numpy array (8 modules per byte and row) plus the few
+values needed to turn them into geometry. All output styles (path, rects,
+outlines, hatch lines) are created from a Symbol, and the geometry cache
+and the worker processes only deal with Symbols, which take a few bytes
+per module instead of a couple of hundred for a path.
+
+A 1D code is a Symbol with a single row, its modules are module_width wide
+and module_height high, guard modules are module_height * guard_factor high.
+A 2D code has square modules of size 1, it gets scaled on placement.
+"""
+
+import numpy as np
+
+
+class Symbol:
+    """
+    Bit-packed module matrix with quiet zone and module size.
+    """
+
+    __slots__ = (
+        "packed",
+        "guards",
+        "columns",
+        "module_width",
+        "module_height",
+        "guard_factor",
+        "quiet_zone",
+    )
+
+    def __init__(
+        self,
+        packed,
+        columns,
+        module_width=1.0,
+        module_height=1.0,
+        quiet_zone=0,
+        guards=None,
+        guard_factor=1.0,
+    ):
+        """
+        @param packed: uint8 array (rows, ceil(columns / 8)) as created by np.packbits
+        @param columns: number of modules per row
+        @param module_width: width of a module
+        @param module_height: height of a module (bar height for 1D codes)
+        @param quiet_zone: light modules required around the code
+        @param guards: packed array of the same shape marking guard modules, or None
+        @param guard_factor: height of guard modules relative to module_height
+        """
+        self.packed = packed
+        self.columns = columns
+        self.module_width = module_width
+        self.module_height = module_height
+        self.quiet_zone = quiet_zone
+        self.guards = guards
+        self.guard_factor = guard_factor
+
+    @classmethod
+    def from_modules(cls, modules, guards=None, **kwargs):
+        """
+        @param modules: module matrix (rows of dark/light values)
+        @param guards: matrix of the same shape marking guard modules, or None
+        @param kwargs: metadata, see __init__
+        """
+        modules = np.asarray(modules, dtype=bool)
+        if modules.ndim == 1:
+            modules = modules[np.newaxis, :]
+        if guards is not None:
+            guards = np.packbits(np.asarray(guards, dtype=bool).reshape(modules.shape), axis=1)
+        return cls(np.packbits(modules, axis=1), modules.shape[1], guards=guards, **kwargs)
+
+    def __getstate__(self):
+        return {key: getattr(self, key) for key in self.__slots__}
+
+    def __setstate__(self, state):
+        for key, value in state.items():
+            setattr(self, key, value)
+
+    @property
+    def rows(self):
+        return self.packed.shape[0]
+
+    @property
+    def width(self):
+        return self.columns * self.module_width
+
+    @property
+    def height(self):
+        if self.guards is not None and self.guards.any():
+            return self.rows * self.module_height * max(1.0, self.guard_factor)
+        return self.rows * self.module_height
+
+    @property
+    def nbytes(self):
+        size = self.packed.nbytes
+        if self.guards is not None:
+            size += self.guards.nbytes
+        return size
+
+    @property
+    def modules(self):
+        """
+        The module matrix as boolean array (rows, columns)
+        """
+        return np.unpackbits(self.packed, axis=1, count=self.columns).astype(bool)
+
+    @property
+    def guard_modules(self):
+        if self.guards is None:
+            return None
+        return np.unpackbits(self.guards, axis=1, count=self.columns).astype(bool)
+
+    def __eq__(self, other):
+        if not isinstance(other, Symbol):
+            return NotImplemented
+        return (
+            self.columns == other.columns
+            and self.module_width == other.module_width
+            and self.module_height == other.module_height
+            and self.quiet_zone == other.quiet_zone
+            and self.guard_factor == other.guard_factor
+            and np.array_equal(self.packed, other.packed)
+            and (
+                (self.guards is None and other.guards is None)
+                or (
+                    self.guards is not None
+                    and other.guards is not None
+                    and np.array_equal(self.guards, other.guards)
+                )
+            )
+        )
+
+    __hash__ = None
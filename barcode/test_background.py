@@ -0,0 +1,155 @@
+import threading
+
+import pytest
+
+from barcode.background import BatchJob, start_batch
+from barcode.headless import StubKernel, create_kernel
+
+
+def wait_for(kernel):
+    """
+    Waits for the workers, then runs the scheduler once.
+    """
+    for thread in kernel.threads:
+        thread.join(10)
+    kernel.run_jobs()
+
+
+def test_run_in_calling_thread():
+    chunks = []
+    finished = []
+    job = BatchJob(
+        "test",
+        list(range(7)),
+        lambda item: None if item == 3 else item * 2,
+        chunks.append,
+        finish=lambda *args: finished.append(args),
+        chunk_size=4,
+    )
+    job.run()
+    assert chunks == [[0, 2, 4, 8], [10, 12]]
+    assert finished == [(False, None)]
+    assert not job.running
+
+
+def test_results_are_consumed_in_the_scheduler():
+    kernel = StubKernel()
+    consumer = []
+    messages = []
+    finished = []
+
+    def consume(results):
+        consumer.append(threading.current_thread())
+        finished.extend(results)
+
+    job = start_batch(
+        kernel,
+        BatchJob("test", list(range(100)), str, consume, messages.append, chunk_size=30),
+    )
+    assert job.name != "test"
+    wait_for(kernel)
+    assert finished == [str(i) for i in range(100)]
+    assert set(consumer) == {threading.current_thread()}
+    assert len(consumer) == 4
+    assert messages[-1].endswith("100/100")
+    assert kernel.jobs == {}
+
+
+def test_cancel_between_items():
+    kernel = StubKernel()
+    reached = threading.Event()
+    release = threading.Event()
+    results = []
+    finished = []
+
+    def produce(item):
+        if item == 5:
+            reached.set()
+            release.wait(10)
+        return item
+
+    job = start_batch(
+        kernel,
+        BatchJob(
+            "test",
+            list(range(1000)),
+            produce,
+            results.extend,
+            finish=lambda *args: finished.append(args),
+        ),
+    )
+    reached.wait(10)
+    job.cancel()
+    release.set()
+    wait_for(kernel)
+    assert results == list(range(6))
+    assert finished == [(True, None)]
+
+
+def test_failures_are_reported():
+    def rows():
+        yield 1
+        yield 2
+        raise OSError("damaged file")
+
+    finished = []
+    results = []
+    job = BatchJob("test", rows(), str, results.extend, finish=lambda *args: finished.append(args))
+    job.run()
+    # Reading the items failed: the batch stops there, it isn't cancelled
+    assert results == ["1", "2"]
+    assert finished[0][0] is False and str(finished[0][1]) == "damaged file"
+
+    def produce(item):
+        if item == 3:
+            raise ZeroDivisionError("bug")
+        return item
+
+    finished.clear()
+    results.clear()
+    job = BatchJob(
+        "test", list(range(6)), produce, results.extend, finish=lambda *args: finished.append(args)
+    )
+    # A bug is reported and raised again
+    with pytest.raises(ZeroDivisionError):
+        job.run()
+    assert results == [0, 1, 2]
+    assert finished[0][0] is False and isinstance(finished[0][1], ZeroDivisionError)
+
+
+def test_qr_batch_in_background():
+    kernel = create_kernel()
+    kernel.root.barcode_background = 10
+    messages = []
+    result = kernel.commands["qrcode"](
+        "qrcode", messages.append, str, "1cm", "1cm", "1cm", "Q-%03d", start=1, end=25
+    )
+    assert result == ("elements", [])
+    assert len(kernel.lookup("barcode/jobs")) == 1
+    wait_for(kernel)
+    nodes = kernel.elements.elem_branch.flat()
+    # The piped elements fill as the chunks are created
+    assert result[1] == nodes
+    # 5 columns, every other row backwards
+    rows = [list(range(first, first + 5)) for first in range(1, 26, 5)]
+    order = [i for row, numbers in enumerate(rows) for i in numbers[:: -1 if row % 2 else 1]]
+    assert [node.label for node in nodes] == [f"qr=Q-{i:03d}" for i in order]
+    assert messages[-2].startswith("Estimated travel: ")
+    assert messages[-1] == "Created 25 qr-codes"
+    kernel.commands["barcode_cancel"]("barcode_cancel", messages.append, str)
+    assert messages[-1] == "No batch running"
+
+
+def test_barcode_batch_in_background():
+    kernel = create_kernel()
+    kernel.root.barcode_background = 10
+    messages = []
+    result = kernel.commands["barcode"](
+        "barcode", messages.append, str, "1cm", "1cm", "3cm", "1cm", "code128", "B-%03d",
+        start=1, end=12,
+    )
+    assert result == ("elements", [])
+    wait_for(kernel)
+    assert messages[-1] == "Created 12 barcodes"
+    codes = [node for node in result[1] if hasattr(node, "mkbarcode")]
+    assert len(codes) == 12
@@ -0,0 +1,55 @@
+import pytest
+
+from barcode.batch import (
+    code_list,
+    grid_positions,
+    parallel_map,
+    parse_pitch,
+    serial_codes,
+    snake_order,
+)
+
+
+def test_serial_codes():
+    assert list(serial_codes("A-%03d", 1, 3)) == ["A-001", "A-002", "A-003"]
+    assert list(serial_codes("B", 10, 6, -2)) == ["B10", "B8", "B6"]
+    assert list(serial_codes(None, 5, None)) == ["5"]
+    with pytest.raises(ValueError):
+        list(serial_codes("C", 1, 2, 0))
+
+
+def test_code_list():
+    assert code_list("a, b,,c ") == ["a", "b", "c"]
+    assert code_list("a;b; c,d") == ["a", "b", "c", "d"]
+
+
+def test_parse_pitch():
+    assert parse_pitch(None) == (None, None)
+    assert parse_pitch("2cm") == ("2cm", "2cm")
+    assert parse_pitch("2cm, 3cm") == ("2cm", "3cm")
+    assert parse_pitch("2cm;3cm") == ("2cm", "3cm")
+
+
+def test_console_keeps_lists():
+    from meerk40t.kernel.functions import _cmd_parser
+
+    # Unquoted commas separate arguments, semicolons don't
+    values = [value for kind, value, *__ in _cmd_parser('--codes A;B "C,D" E,F')]
+    assert values == ["codes", "A;B", "C,D", "E", "F"]
+
+
+def test_grid_positions():
+    positions = list(grid_positions(5, 2, 10, 20, 1, 2))
+    assert positions == [(1, 2), (11, 2), (1, 22), (11, 22), (1, 42)]
+
+
+def test_snake_order():
+    assert snake_order(5, 2) == [0, 1, 3, 2, 4]
+    assert snake_order(8, 3) == [0, 1, 2, 5, 4, 3, 6, 7]
+    assert snake_order(3, None) == [0, 1, 2]
+
+
+def test_parallel_map_keeps_order():
+    jobs = ["a" * n for n in range(20)]
+    assert parallel_map(len, jobs, 2) == list(range(20))
+    assert parallel_map(len, jobs, 0) == list(range(20))
@@ -0,0 +1,51 @@
+import numpy as np
+
+from barcode.headless import create_kernel
+from barcode.bitmap import pixel_size, symbol_bitmap
+from barcode.symbol import Symbol
+
+
+def test_pixels_are_whole_steps():
+    # A device with 1000 steps per inch
+    pixel, dpi = pixel_size(300, 65.535)
+    assert abs(pixel - 3 * 65.535) < 1e-9
+    assert abs(dpi - 1000 / 3) < 1e-9
+    # Never smaller than a step
+    assert pixel_size(5000, 65.535)[0] == 65.535
+    assert pixel_size(500)[0] == 65535 / 500
+
+
+def test_modules_become_blocks_of_pixels():
+    symbol = Symbol.from_modules([[1, 0], [0, 1]])
+    dark = symbol_bitmap(symbol, 3, 3)
+    assert dark.shape == (6, 6)
+    assert dark[:3, :3].all() and not dark[:3, 3:].any()
+    # Guards of 1D codes reach below the other bars
+    bars = Symbol.from_modules([1, 0, 1, 1], guards=[1, 0, 0, 0], guard_factor=1.5)
+    dark = symbol_bitmap(bars, 2, 4, 6)
+    assert dark.shape == (6, 8)
+    assert dark[:4].sum() == 6 * 4
+    assert np.array_equal(dark[5], [1, 1, 0, 0, 0, 0, 0, 0])
+
+
+def test_image_output():
+    kernel = create_kernel()
+    kernel.root.barcode_image_dpi = 254
+    node = kernel.commands["qrcode"](
+        "qrcode", print, str, "1cm", "1cm", "2cm", "Raster", image=True
+    )[1][0]
+    assert node.type == "elem image" and node.dither is False
+    assert node.image.mode == "1"
+    # 2cm are 200 pixels at 254 dpi, a whole number of pixels per module
+    columns = node.mkbarcode["columns"]
+    assert node.image.size[0] == columns * round(200 / columns)
+    assert node.matrix.a == node.matrix.d == 65535 / 254
+    messages = []
+    kernel.commands["barcode_edit"](
+        "barcode_edit", messages.append, str, data=[node], code="Raster engraving"
+    )
+    assert messages == ["Updated 1 codes"]
+    assert node.mkbarcode["columns"] > columns
+    assert node.image.size[0] == node.mkbarcode["columns"] * round(
+        200 / node.mkbarcode["columns"]
+    )
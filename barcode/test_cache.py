@@ -0,0 +1,44 @@
+from barcode.cache import GeometryCache
+
+
+def test_lru_eviction():
+    cache = GeometryCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    # b was the least recently used entry
+    assert "b" not in cache
+    assert "a" in cache and "c" in cache
+    assert cache.hits == 1
+
+
+def test_fetch_and_counters():
+    cache = GeometryCache(4)
+    calls = []
+
+    def create():
+        calls.append(1)
+        return "geometry"
+
+    assert cache.fetch("key", create) == "geometry"
+    assert cache.fetch("key", create) == "geometry"
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+    # Invalid results are not cached
+    assert cache.fetch("invalid", lambda: None) is None
+    assert "invalid" not in cache
+
+
+def test_resize_and_clear():
+    cache = GeometryCache(3)
+    for idx in range(3):
+        cache.put(idx, idx)
+    cache.size = 1
+    assert len(cache) == 1 and 2 in cache
+    cache.clear()
+    assert len(cache) == 0 and cache.hits == 0
+    cache.size = 0
+    cache.put("x", 1)
+    assert len(cache) == 0
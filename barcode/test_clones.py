@@ -0,0 +1,48 @@
+from copy import copy
+
+import pytest
+
+from barcode.headless import create_kernel
+
+
+def create_copies(kernel, count, code="Target"):
+    return kernel.commands["qrcode"](
+        "qrcode", print, str, "1cm", "1cm", "1cm", code, codes=",".join([code] * count)
+    )[1]
+
+
+def test_copies_share_one_geometry():
+    kernel = create_kernel()
+    nodes = create_copies(kernel, 50)
+    assert len({id(node.geometry) for node in nodes}) == 1
+    assert len({(node.matrix.e, node.matrix.f) for node in nodes}) == 50
+    # Later calls share it as well
+    more = create_copies(kernel, 2)
+    assert more[0].geometry is nodes[0].geometry
+
+
+def test_edited_copy_gets_its_own_geometry():
+    kernel = create_kernel()
+    nodes = create_copies(kernel, 3)
+    shared = nodes[0].geometry
+    messages = []
+    kernel.commands["barcode_edit"]("barcode_edit", messages.append, str, data=[nodes[1]], errcorr="H")
+    assert messages == ["Updated 1 codes"]
+    assert nodes[1].geometry is not shared
+    assert nodes[0].geometry is shared and nodes[2].geometry is shared
+    kernel.commands["barcode_edit"]("barcode_edit", messages.append, str, data=[nodes[1]], errcorr="M")
+    assert nodes[1].geometry is shared
+
+
+def test_shared_geometry_in_a_real_tree():
+    kernel = create_kernel(real_nodes=True)
+    nodes = create_copies(kernel, 2)
+    first, second = nodes
+    assert first.geometry is second.geometry
+    assert first.bbox()[0] != second.bbox()[0]
+    # A copy made by meerk40t has a geometry of its own, in place changes fail
+    duplicate = copy(first)
+    assert duplicate.geometry is not first.geometry
+    duplicate.geometry.segments[0, 0] = 0
+    with pytest.raises(ValueError):
+        first.geometry.segments[0, 0] = 0
@@ -0,0 +1,114 @@
+import threading
+
+from barcode.headless import create_kernel
+from barcode.cache import GeometryCache
+from barcode.diskcache import TOUCH_EVERY, DiskCache, encoder_versions
+from barcode.symbol import Symbol
+
+
+def test_survives_a_restart(tmp_path):
+    filename = str(tmp_path / "cache.sqlite")
+    symbol = Symbol.from_modules([[1, 0, 1], [0, 1, 0], [1, 1, 0]])
+    first = GeometryCache(4, DiskCache(filename, 1 << 20, "v1"))
+    first.put(("qr", "A"), symbol)
+    first.store.close()
+    second = GeometryCache(4, DiskCache(filename, 1 << 20, "v1"))
+    assert ("qr", "A") in second
+    assert second.fetch(("qr", "A"), lambda: None) == symbol
+    assert second.store.hits == 1
+    # New encoder versions don't see the old entries
+    other = DiskCache(filename, 1 << 20, "v2")
+    assert other.get(("qr", "A")) is None
+
+
+def test_eviction_by_size(tmp_path):
+    store = DiskCache(str(tmp_path / "cache.sqlite"), 4000)
+    for idx in range(64):
+        store.put(idx, bytes(200))
+        if idx == 60:
+            # recently used entries survive
+            store.get(0)
+    stats = store.stats()
+    assert stats["bytes"] <= 4000 * 0.8
+    assert 0 in store and 1 not in store
+    assert 63 in store
+
+
+def test_concurrent_instances(tmp_path):
+    filename = str(tmp_path / "cache.sqlite")
+    stores = [DiskCache(filename, 1 << 20) for _ in range(2)]
+    errors = []
+
+    def write(store, offset):
+        try:
+            for idx in range(100):
+                store.put((offset, idx), [offset, idx])
+                assert store.get((1 - offset, idx)) in (None, [1 - offset, idx])
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(store, n)) for n, store in enumerate(stores)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(30)
+    assert errors == []
+    assert stores[0].get((1, 99)) == [1, 99]
+    assert stores[0].errors == stores[1].errors == 0
+
+
+def test_unusable_file_is_a_miss(tmp_path):
+    filename = tmp_path / "cache.sqlite"
+    filename.write_bytes(b"not a database" * 100)
+    store = DiskCache(str(filename), 1 << 20)
+    store.put("a", 1)
+    assert store.get("a") is None
+    assert store.errors == 2
+
+
+class Stale:
+    pass
+
+
+def test_stale_entries_are_errors(tmp_path, monkeypatch):
+    store = DiskCache(str(tmp_path / "cache.sqlite"), 1 << 20)
+    store.put("a", Stale())
+    # The class went away (or changed) since the entry was stored
+    monkeypatch.delitem(globals(), "Stale")
+    assert store.get("a", "default") == "default"
+    assert store.errors == 1
+    assert encoder_versions().startswith("format=")
+
+
+def test_hits_are_marked_in_batches(tmp_path):
+    store = DiskCache(str(tmp_path / "cache.sqlite"), 1 << 20)
+    for idx in range(TOUCH_EVERY):
+        store.put(idx, idx)
+
+    def used():
+        return dict(store._connection().execute("SELECT key, used FROM symbols"))
+
+    before = used()
+    store.get(0)
+    assert used() == before
+    for idx in range(1, TOUCH_EVERY):
+        store.get(idx)
+    after = used()
+    assert all(after[key] > before[key] for key in before)
+    store.get(0)
+    store.close()
+    assert store.get(0) == 0
+
+
+def test_disk_command(tmp_path):
+    kernel = create_kernel()
+    kernel.os_information["WORKDIR"] = str(tmp_path)
+    messages = []
+    kernel.commands["barcode_cache"]("barcode_cache", messages.append, str, "disk", 1)
+    assert messages[-1].startswith("Persistent cache: 0 entries")
+    kernel.commands["qrcode"]("qrcode", print, str, "1cm", "1cm", "2cm", "Persistent")
+    kernel.commands["barcode_cache"]("barcode_cache", messages.append, str)
+    assert messages[-1].startswith("Persistent cache: 1 entries")
+    kernel.commands["barcode_cache"]("barcode_cache", messages.append, str, "disk", 0)
+    assert kernel.lookup("barcode/cache").store is None
+    assert kernel.root.barcode_disk_cache == 0
@@ -0,0 +1,58 @@
+from meerk40t.svgelements import Point
+
+from barcode.headless import create_kernel
+
+
+def create_code(kernel, code="Test", **options):
+    return kernel.commands["qrcode"]("qrcode", print, str, "1cm", "1cm", "2cm", code, **options)[1]
+
+
+def edit(kernel, nodes, **options):
+    messages = []
+    kernel.commands["barcode_edit"]("barcode_edit", messages.append, str, data=nodes, **options)
+    return messages
+
+
+def test_resize_and_move_is_a_matrix_update():
+    kernel = create_kernel()
+    stats = kernel.lookup("barcode/stats")
+    nodes = create_code(kernel)
+    node = nodes[0]
+    geometry = node.geometry
+    width = node.matrix.a * node.mkbarcode["columns"]
+    stats.reset()
+    assert edit(kernel, nodes, width="4cm", position="3cm,3cm") == ["Updated 1 codes"]
+    assert node.geometry is geometry
+    assert "encode" not in stats.stages
+    assert abs(node.matrix.a * node.mkbarcode["columns"] - 2 * width) < 1e-6
+    origin = node.matrix.point_in_matrix_space(Point(0, 0))
+    assert abs(origin.x - 3 * width / 2) < 1e-6
+    assert abs(origin.y - 3 * width / 2) < 1e-6
+
+
+def test_encoding_changes_reencode_in_place():
+    kernel = create_kernel()
+    first = create_code(kernel, "A")[0]
+    second = create_code(kernel, "B")[0]
+    messages = edit(kernel, [first, second], errcorr="h", code="{lot}-X")
+    assert messages == ["Updated 2 codes"]
+    for node in (first, second):
+        assert node.mkbarcode["errcorr"] == "H"
+        assert node.mkbarcode["template"] == "{lot}-X"
+        assert node.label == "qr={lot}-X"
+    kernel.elements.mywordlist.values["lot"] = 7
+    kernel.elements.signal("wordlist")
+    assert first.label == second.label == "qr=7-X"
+
+
+def test_invalid_changes():
+    kernel = create_kernel()
+    nodes = create_code(kernel, "A" * 20)
+    assert edit(kernel, nodes, errcorr="X")[-1].startswith("Invalid error correction")
+    for version in (41, -1):
+        assert edit(kernel, nodes, version=version) == ["Invalid version, use 1..40 (0 for auto)"]
+    assert nodes[0].mkbarcode["version"] is None
+    messages = edit(kernel, nodes, version=1, errcorr="H")
+    assert messages[0].startswith("Could not apply")
+    assert nodes[0].mkbarcode["errcorr"] == "M"
+    assert edit(kernel, []) == ["No barcodes selected"]
@@ -0,0 +1,85 @@
+from barcode.headless import create_kernel
+from barcode.verify import verify_code
+
+
+def add_texts(kernel, texts, selected=True):
+    mm = kernel.elements.length("1mm")
+    return [
+        kernel.elements.elem_branch.add(
+            type="elem text",
+            text=text,
+            bounds=(idx * 30 * mm, 10 * mm, (idx * 30 + 20) * mm, 15 * mm),
+            emphasized=selected,
+        )
+        for idx, text in enumerate(texts)
+    ]
+
+
+def added(kernel):
+    signals = []
+    kernel.listen("element_added", lambda origin, *args: signals.append(args[0]))
+    return signals
+
+
+def test_qr_codes_replace_texts():
+    kernel = create_kernel()
+    kernel.root.barcode_background = 2
+    texts = add_texts(kernel, ["SN-{lot}-1", "SN-{lot}-2", "SN-{lot}-3"])
+    kernel.elements.mywordlist.values["lot"] = 7
+    signals = added(kernel)
+    messages = []
+    kernel.commands["qrcode"]("qrcode", messages.append, str, fromtext=True, remove=True)
+    kernel.threads[-1].join()
+    kernel.run_jobs()
+    assert messages[-1] == "Created 3 qr-codes"
+    assert len(signals) == 1
+    nodes = signals[0]
+    assert [node.mkbarcode["payload"] for node in nodes] == ["SN-7-1", "SN-7-2", "SN-7-3"]
+    assert [node.mkbarcode["template"] for node in nodes] == ["SN-{lot}-1", "SN-{lot}-2", "SN-{lot}-3"]
+    mm = kernel.elements.length("1mm")
+    for node in nodes:
+        # As wide as the text
+        assert abs(node.mkbarcode["dim"] - 20 * mm) < 1e-6
+        assert verify_code(node) is None
+    assert all(text.parent is None for text in texts)
+
+
+def test_nothing_to_convert():
+    kernel = create_kernel()
+    add_texts(kernel, ["A"], selected=False)
+    messages = []
+    kernel.commands["qrcode"]("qrcode", messages.append, str, fromtext=True)
+    assert messages == ["No text elements selected"]
+    texts = add_texts(kernel, ["1234", "x" * 3000])
+    kernel.commands["qrcode"]("qrcode", messages.append, str, fromtext=True, remove=True)
+    assert messages[-1] == "Nothing created, 1 invalid codes"
+    assert all(text.parent is not None for text in texts)
+
+
+def test_piped_texts_stay():
+    kernel = create_kernel()
+    texts = add_texts(kernel, ["A", "B"], selected=False)
+    __, nodes = kernel.commands["qrcode"](
+        "qrcode", print, str, data=texts[1:], fromtext=True, outline=True
+    )
+    assert [node.mkbarcode["payload"] for node in nodes] == ["B"]
+    assert nodes[0].mkbarcode["outline"]
+    # Without --remove the texts stay
+    assert texts[1].parent is not None
+
+
+def test_barcodes_fill_texts():
+    kernel = create_kernel()
+    kernel.root.barcode_background = 0
+    texts = add_texts(kernel, ["5901234123457", "4006381333931"])
+    messages = []
+    __, nodes = kernel.commands["barcode"](
+        "barcode", messages.append, str, "ean13", fromtext=True, remove=True
+    )
+    assert messages[-1] == "Created 2 barcodes"
+    codes = [node for node in nodes if hasattr(node, "mkbarcode")]
+    assert [node.mkbarcode["payload"] for node in codes] == ["5901234123457", "4006381333931"]
+    mm = kernel.elements.length("1mm")
+    assert abs(codes[0].mkbarcode["dimx"] - 20 * mm) < 1e-6
+    assert all(verify_code(node) is None for node in codes)
+    assert all(text.parent is None for text in texts)
@@ -0,0 +1,104 @@
+from barcode.geometry import (
+    bar_hatch_lines,
+    hatch_lines,
+    matrix_path,
+    matrix_rects,
+    module_contours,
+    module_runs,
+    outline_path,
+    rect_segments,
+    serpentine_contours,
+)
+
+
+def test_module_runs():
+    modules = [
+        [True, True, False, True],
+        [False, False, False, False],
+        [False, True, True, True],
+    ]
+    assert list(module_runs(modules)) == [(0, 0, 2), (0, 3, 4), (2, 1, 4)]
+
+
+def test_matrix_rects():
+    modules = [[True, False], [True, True]]
+    rects = matrix_rects(modules, 10, 20, 5)
+    assert rects == [(10, 20, 5, 5), (10, 25, 10, 5)]
+
+
+def test_matrix_path():
+    modules = [[True, False, True], [False, True, False], [True, False, True]]
+    path = matrix_path(modules, 100, 200, 10)
+    assert path.bbox() == (100, 200, 130, 230)
+    # Five runs with 5 segments each
+    assert len(path) == 25
+
+
+def test_serpentine_order():
+    rects = [(0, 0, 1, 1), (2, 0, 1, 1), (0, 1, 1, 1), (2, 1, 1, 1), (0, 2, 3, 1)]
+    starts = [seg.end for seg in rect_segments(rects, serpentine=True)[::5]]
+    # The second row runs backwards and starts at the top right corners
+    assert [(p.x, p.y) for p in starts] == [(0, 0), (2, 0), (3, 1), (1, 1), (0, 2)]
+    squares = [[(4, 0), (5, 0), (5, 1), (4, 1)], [(0, 0), (1, 0), (1, 1), (0, 1)]]
+    squares.append([(0, 2), (1, 2), (1, 3), (0, 3)])
+    # Left to right, then the closest corner of the next row
+    assert [c[0] for c in serpentine_contours(squares)] == [(0, 0), (4, 0), (1, 2)]
+
+
+def test_module_contours():
+    # A ring: one outer contour and one hole with opposite orientation
+    modules = [[True, True, True], [True, False, True], [True, True, True]]
+    contours = module_contours(modules)
+    assert len(contours) == 2
+    assert sorted(len(c) for c in contours) == [4, 4]
+    areas = []
+    for contour in contours:
+        closed = contour + contour[:1]
+        areas.append(
+            sum(x0 * y1 - x1 * y0 for (x0, y0), (x1, y1) in zip(closed, closed[1:])) / 2
+        )
+    assert sorted(abs(a) for a in areas) == [1, 9]
+    assert areas[0] * areas[1] < 0
+
+
+def test_module_contours_touching_corners():
+    # Diagonal neighbours stay separate areas
+    modules = [[True, False], [False, True]]
+    contours = module_contours(modules)
+    assert sorted(sorted(c) for c in contours) == [
+        [(0, 0), (0, 1), (1, 0), (1, 1)],
+        [(1, 1), (1, 2), (2, 1), (2, 2)],
+    ]
+
+
+def test_outline_path():
+    modules = [[True, True, False], [True, True, True], [False, True, True]]
+    path = outline_path(modules, 100, 200, 10)
+    assert path.bbox() == (100, 200, 130, 230)
+    # One polygon with 8 corners: move, 7 lines, close
+    assert len(path) == 9
+    assert len(matrix_path(modules, 100, 200, 10)) == 15
+
+
+def test_hatch_lines():
+    modules = [[True, True, False, True], [False, False, False, False], [False, True, True, True]]
+    lines = hatch_lines(modules, 0.5)
+    # Two lines per row, runs are merged, directions alternate
+    assert lines == [
+        ((0, 0.25), (2, 0.25)),
+        ((3, 0.25), (4, 0.25)),
+        ((4, 0.75), (3, 0.75)),
+        ((2, 0.75), (0, 0.75)),
+        ((1, 2.25), (4, 2.25)),
+        ((4, 2.75), (1, 2.75)),
+    ]
+    # A distance larger than a module still hits every row once
+    assert len(hatch_lines(modules, 3)) == 3
+
+
+def test_bar_hatch_lines():
+    bars = [(0, 0, 0.4, 10), (1, 0, 0.1, 12)]
+    lines = bar_hatch_lines(bars, 0.2)
+    # Two lines in the wide bar, one in the narrow one, alternating
+    assert [round(p0[0], 6) for p0, p1 in lines] == [0.1, 0.3, 1.05]
+    assert [(p0[1], p1[1]) for p0, p1 in lines] == [(0, 10), (10, 0), (0, 12)]
@@ -0,0 +1,31 @@
+from meerk40t.svgelements import Path
+
+from barcode.glyphs import GLYPHS, glyph_lines, supported, text_segments, text_width
+
+
+def test_glyphs_stay_in_their_cell():
+    for char in GLYPHS:
+        for line in glyph_lines(char, 6.0):
+            for x, y in line:
+                assert 0 <= x <= 4
+                # the stroke of the dollar sign reaches a little beyond
+                assert -6.5 <= y <= 0.5
+
+
+def test_text_is_assembled_from_cached_glyphs():
+    glyph_lines.cache_clear()
+    segments = text_segments("8008", 100, 50, 6.0, "middle")
+    assert glyph_lines.cache_info().misses == 2
+    x0, y0, x1, y1 = Path(segments).bbox()
+    assert abs((x1 + x0) / 2 - 100) < 1e-6
+    assert abs(x1 - x0 - text_width("8008", 6.0)) < 1e-6
+    assert y0 == 44 and y1 == 50
+    start = Path(text_segments("7", 0, 0, 6.0, "start")).bbox()
+    end = Path(text_segments("7", 0, 0, 6.0, "end")).bbox()
+    assert start[0] == 0 and end[2] == 0
+
+
+def test_unsupported_characters():
+    assert supported("ISBN 978-3-16-148410-0")
+    assert not supported("lower")
+    assert text_segments("Ab", 0, 0, 1.0) is None
@@ -0,0 +1,113 @@
+import json
+
+import pytest
+
+from barcode.headless import create_kernel
+from barcode.jobfile import parse_row, read_rows
+from barcode.test_background import wait_for
+
+
+def write_csv(path, count):
+    lines = ["symbology,payload,x,y,width,errcorr"]
+    lines.extend(f"qr,SN-{i:04d},{i},10,20,H" for i in range(1, count + 1))
+    path.write_text("\n".join(lines) + "\n")
+    return path
+
+
+def test_parse_row():
+    row = parse_row({"Type": "QR", "code": " A1 ", "x": "10", "y": "5in", "size": 20})
+    assert row["command"] == "qrcode"
+    assert row["payload"] == "A1"
+    assert (row["x"], row["y"], row["width"], row["height"]) == ("10mm", "5in", "20mm", None)
+    row = parse_row('{"symbology": "ean13", "payload": 123, "x": 0, "y": 0, "width": 30, "notext": "yes"}')
+    assert row["command"] == "barcode"
+    assert row["notext"] is True
+    with pytest.raises(ValueError):
+        parse_row({"symbology": "qr", "x": 0, "y": 0, "width": 20})
+    with pytest.raises(ValueError):
+        parse_row({"symbology": "qr", "payload": 1, "x": 0, "y": 0, "width": 20, "version": "a"})
+
+
+def test_read_rows_resumes(tmp_path):
+    rows = list(read_rows(str(write_csv(tmp_path / "job.csv", 5)), 4))
+    assert [number for number, row in rows] == [4, 5]
+    assert rows[0][1]["payload"] == "SN-0004"
+    jsonl = tmp_path / "job.jsonl"
+    jsonl.write_text(json.dumps({"payload": 1}) + "\n\n" + json.dumps({"payload": 2}) + "\n")
+    assert [number for number, row in read_rows(str(jsonl))] == [1, 2]
+
+
+def test_job_in_chunks(tmp_path):
+    kernel = create_kernel()
+    filename = write_csv(tmp_path / "job.csv", 30)
+    with filename.open("a") as f:
+        f.write("qr,,1,1,20,H\nqr,X,1,1,20,Z\n")
+    messages = []
+    kernel.commands["barcode_job"]("barcode_job", messages.append, str, str(filename), chunk=8)
+    wait_for(kernel)
+    nodes = kernel.elements.elem_branch.flat()
+    assert [node.label for node in nodes] == [f"qr=SN-{i:04d}" for i in range(1, 31)]
+    assert nodes[0].mkbarcode["errcorr"] == "H"
+    assert messages[-1] == "Job done: 30 codes created, 2 invalid rows"
+    errors = [message for message in messages if message.startswith("Row ")]
+    assert errors == [
+        "Row 31: payload is missing",
+        "Row 32: Invalid error correction, use one of L, M, Q, H",
+    ]
+
+
+def test_resume_and_missing_file(tmp_path):
+    kernel = create_kernel()
+    filename = str(write_csv(tmp_path / "job.csv", 10))
+    messages = []
+    kernel.commands["barcode_job"]("barcode_job", messages.append, str, filename, resume=7, wait=True)
+    assert [node.label for node in kernel.elements.elem_branch.flat()] == [
+        f"qr=SN-{i:04d}" for i in range(7, 11)
+    ]
+    kernel.commands["barcode_job"]("barcode_job", messages.append, str, "missing.csv")
+    assert messages[-1] == "No such file."
+
+
+def test_rows_take_the_command_options(tmp_path):
+    kernel = create_kernel()
+    filename = tmp_path / "job.csv"
+    filename.write_text(
+        "symbology,payload,x,y,width,boxsize,dpi\n"
+        "qr,A,1,1,20,5,\n"
+        "qr,B,1,1,20,,\n"
+        "qr,C,1,1,20,0,\n"
+        "qr,D,1,1,20,,-1\n"
+    )
+    messages = []
+    kernel.commands["barcode_job"]("barcode_job", messages.append, str, str(filename), wait=True)
+    nodes = kernel.elements.elem_branch.flat()
+    assert [node.mkbarcode["boxsize"] for node in nodes] == [5, 10]
+    assert messages[-1] == "Job done: 2 codes created, 2 invalid rows"
+    errors = [message for message in messages if message.startswith("Row ")]
+    assert errors == ["Row 3: Invalid dimensions provided", "Row 4: Invalid dimensions provided"]
+    # Validated like the qrcode command
+    messages.clear()
+    kernel.commands["qrcode"]("qrcode", messages.append, str, "1cm", "1cm", "2cm", "C", boxsize=0)
+    assert messages == ["Invalid dimensions provided"]
+
+
+def test_rows_with_invalid_versions(tmp_path):
+    kernel = create_kernel()
+    filename = tmp_path / "job.csv"
+    filename.write_text(
+        "symbology,payload,x,y,width,version\n"
+        "qr,A,1,1,20,50\n"
+        "qr,B,1,1,20,-3\n"
+        "qr,C,1,1,20,0\n"
+        "qr,D,1,1,20,2\n"
+    )
+    messages = []
+    kernel.commands["barcode_job"]("barcode_job", messages.append, str, str(filename), wait=True)
+    assert [node.mkbarcode["version"] for node in kernel.elements.elem_branch.flat()] == [2]
+    errors = [message for message in messages if message.startswith("Row ")]
+    assert errors == [
+        "Row 1: Invalid version 50, use 1..40",
+        "Row 2: Invalid version -3, use 1..40",
+        "Row 3: Invalid version 0, use 1..40",
+    ]
+    assert messages[-1] == "Job done: 1 codes created, 3 invalid rows"
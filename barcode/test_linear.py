@@ -0,0 +1,30 @@
+from barcode.linear import LayoutWriter, linear_layout
+
+
+def test_bars():
+    layout = linear_layout("0011010001", {"module_width": 1, "module_height": 10})
+    assert layout.bars == [(0, 0, 2, 10), (3, 0, 1, 10), (7, 0, 1, 10)]
+    assert layout.width == 8
+    assert layout.height == 10
+    assert layout.texts == []
+
+
+def test_centered_text():
+    options = {"module_width": 1, "module_height": 10, "text": "AB", "text_distance": 5}
+    layout = linear_layout("1010", options)
+    assert layout.texts == [("AB", 2, 15)]
+    assert layout.font_size == 10
+
+
+def test_guards():
+    options = {"module_width": 1, "module_height": 10, "text": "1 23"}
+    layout = linear_layout("G0G11G0G", options)
+    assert layout.height == 11
+    assert [t[0] for t in layout.texts] == ["1", "23"]
+
+
+def test_writer_protocol():
+    writer = LayoutWriter()
+    writer.set_options({"module_width": 0.5, "text": ""})
+    layout = writer.render(["101"])
+    assert layout.bars == [(0, 0, 0.5, 15.0), (1.0, 0, 0.5, 15.0)]
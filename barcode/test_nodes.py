@@ -0,0 +1,45 @@
+from meerk40t.core.node.node import Node
+
+from barcode.headless import create_kernel, real_tree
+from barcode.verify import verify_code
+
+
+def created(kernel, command, *args, **options):
+    messages = []
+    __, nodes = kernel.commands[command](command, messages.append, str, *args, **options)
+    return [node for node in nodes if hasattr(node, "mkbarcode")]
+
+
+def test_bulk_insertion_into_a_real_tree():
+    kernel = create_kernel()
+    kernel.root.barcode_background = 0
+    branch, listener = real_tree()
+    kernel.elements.elem_branch = branch
+    nodes = created(
+        kernel, "barcode", "1cm", "1cm", "4cm", "2cm", "code128", "SN%02d",
+        start=1, end=20, asgroup=True,
+    )
+    assert branch.children == nodes
+    types = {child.type for node in nodes for child in node.children}
+    assert types == {"elem rect", "elem text"}
+    # The tree is told once at the end, not for every node
+    assert listener.notifications == 0
+    assert kernel.elements.signals == 2
+
+
+def test_real_nodes_verify():
+    kernel = create_kernel(real_nodes=True)
+    kernel.root.barcode_background = 0
+    for options in ({}, {"hatch": "0.1mm"}, {"asgroup": True}, {"image": True}, {"glyphs": True}):
+        nodes = created(
+            kernel, "barcode", "1cm", "1cm", "4cm", "2cm", "code128", "SN%02d",
+            start=1, end=3, **options,
+        )
+        assert len(nodes) == 3
+        for node in nodes:
+            assert isinstance(node, Node)
+            assert verify_code(node) is None, options
+    for options in ({}, {"hatch": "0.1mm"}, {"outline": True}, {"image": True}):
+        nodes = created(kernel, "qrcode", "1cm", "1cm", "2cm", "SN-42", codes="A;A;B", **options)
+        assert isinstance(nodes[0], Node)
+        assert all(verify_code(node) is None for node in nodes), options
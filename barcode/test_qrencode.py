@@ -0,0 +1,20 @@
+import pickle
+
+from barcode.qrencode import encode_symbol, qr_modules, qr_symbol
+
+
+def test_symbol_roundtrip():
+    modules = qr_modules("Some data here", "Q")
+    symbol = encode_symbol(("Some data here", "Q"))
+    assert symbol.packed.nbytes < len(modules) ** 2
+    assert (symbol.modules == modules).all()
+    assert symbol.columns == symbol.rows == len(modules)
+    assert symbol.quiet_zone == 4
+    # Symbols come back from worker processes
+    assert pickle.loads(pickle.dumps(symbol)) == symbol
+
+
+def test_overflow():
+    assert qr_modules("X" * 500, "H", version=1) is None
+    assert qr_symbol("X" * 500, "H", version=1) is None
+    assert encode_symbol(("X" * 500, "H", 1)) is None
@@ -0,0 +1,114 @@
+import random
+import string
+
+import numpy as np
+import qrcode
+import qrcode.util
+
+from barcode.qrengine import (
+    BIT_LIMIT_TABLE,
+    DataOverflowError,
+    alignment_positions,
+    best_version,
+    data_segments,
+    encode,
+)
+
+LEVELS = {
+    "L": qrcode.constants.ERROR_CORRECT_L,
+    "M": qrcode.constants.ERROR_CORRECT_M,
+    "Q": qrcode.constants.ERROR_CORRECT_Q,
+    "H": qrcode.constants.ERROR_CORRECT_H,
+}
+
+ALPHABETS = (
+    string.digits,
+    string.ascii_uppercase + string.digits + " $%*+-./:",
+    string.printable + "äöü€",
+)
+
+
+def library_modules(data, errcorr, version=None, mask=None):
+    qr = qrcode.QRCode(
+        version=version, error_correction=LEVELS[errcorr], mask_pattern=mask
+    )
+    qr.add_data(data)
+    qr.make(fit=version is None)
+    return np.array(qr.modules, dtype=bool)
+
+
+def random_payload(rnd):
+    length = rnd.choice((10, 60, 400, 1500))
+    if rnd.random() < 0.25:
+        # Mixed content, so we get several segments
+        return (
+            "".join(rnd.choices(string.digits, k=25))
+            + "".join(rnd.choices(string.ascii_lowercase, k=3))
+            + "".join(rnd.choices(ALPHABETS[1], k=30))
+        )
+    return "".join(rnd.choices(rnd.choice(ALPHABETS), k=rnd.randint(1, length)))
+
+
+def test_alignment_positions():
+    for version in range(1, 41):
+        assert alignment_positions(version) == list(qrcode.util.pattern_position(version))
+
+
+def test_capacity():
+    for level, constant in LEVELS.items():
+        for version in range(1, 41):
+            assert BIT_LIMIT_TABLE[level][version] == qrcode.util.BIT_LIMIT_TABLE[constant][version]
+
+
+def test_identical_to_library():
+    rnd = random.Random(4711)
+    compared = 0
+    while compared < 150:
+        data = random_payload(rnd)
+        errcorr = rnd.choice("LMQH")
+        try:
+            expected = library_modules(data, errcorr)
+        except qrcode.exceptions.DataOverflowError:
+            continue
+        assert np.array_equal(encode(data, errcorr), expected), (data, errcorr)
+        compared += 1
+
+
+def test_fixed_version_and_mask():
+    for version in (1, 6, 7, 9, 10, 26, 27, 40):
+        for mask in (None, 0, 5):
+            assert np.array_equal(
+                encode("Fixed 123", "Q", version, mask),
+                library_modules("Fixed 123", "Q", version, mask),
+            )
+
+
+def test_overflow():
+    try:
+        encode("X" * 500, "H", 1)
+    except DataOverflowError:
+        pass
+    else:
+        raise AssertionError("DataOverflowError expected")
+    assert best_version(data_segments("x" * 5000), "L") is None
+
+
+def test_invalid_versions():
+    for version in (0, -3, 41, 50):
+        try:
+            encode("X", "M", version)
+        except DataOverflowError:
+            raise AssertionError(f"version {version} doesn't overflow")
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"ValueError expected for version {version}")
+
+
+def test_large_versions():
+    rnd = random.Random(42)
+    for version in (25, 40):
+        data = "".join(rnd.choices(string.ascii_letters, k=BIT_LIMIT_TABLE["M"][version] // 8 - 4))
+        modules = encode(data, "M")
+        assert len(modules) == version * 4 + 17
+        assert np.array_equal(modules, library_modules(data, "M"))
@@ -0,0 +1,40 @@
+import pstats
+
+from barcode.stats import Statistics, profiled
+
+
+def test_stages_and_counters():
+    stats = Statistics()
+    for __ in range(3):
+        with stats.stage("encode"):
+            pass
+    stats.add_time("nodes", 0.5)
+    stats.count("codes")
+    stats.count("segments", 25)
+    assert stats.stages["encode"][1] == 3
+    assert stats.stages["nodes"] == [0.5, 1]
+    assert stats.counters == {"codes": 1, "segments": 25}
+    lines = stats.report()
+    # Slowest stage first, counters at the end
+    assert lines[0].startswith("nodes")
+    assert lines[-1].startswith("segments")
+    stats.reset()
+    assert stats.report() == []
+
+
+def test_profiled(tmp_path):
+    calls = []
+
+    @profiled
+    def command(command, channel, _, value=None, **kwargs):
+        calls.append(value)
+        return "elements", value
+
+    messages = []
+    assert command("cmd", messages.append, str, value=1) == ("elements", 1)
+    assert messages == []
+    filename = str(tmp_path / "cmd.prof")
+    assert command("cmd", messages.append, str, value=2, profile=filename) == ("elements", 2)
+    assert calls == [1, 2]
+    assert messages == [f"Profile written to {filename}"]
+    assert pstats.Stats(filename).total_calls > 0
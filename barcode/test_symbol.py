@@ -0,0 +1,51 @@
+import numpy as np
+
+from barcode.geometry import symbol_hatch_lines, symbol_path, symbol_rects
+from barcode.symbol import Symbol
+
+
+def test_packing():
+    modules = np.random.default_rng(1).random((21, 21)) < 0.5
+    symbol = Symbol.from_modules(modules, quiet_zone=4)
+    # 3 bytes per row instead of 21 objects
+    assert symbol.nbytes == 21 * 3
+    assert np.array_equal(symbol.modules, modules)
+    assert symbol.rows == symbol.columns == 21
+    assert symbol.guard_modules is None
+
+
+def test_matrix_rects():
+    symbol = Symbol.from_modules([[True, True, False], [False, True, True]])
+    assert symbol_rects(symbol) == [(0, 0, 2, 1), (1, 1, 2, 1)]
+    assert len(symbol_path(symbol)) == 10
+    # One polygon with 8 corners
+    assert len(symbol_path(symbol, outline=True)) == 9
+
+
+def test_linear_rects():
+    # bar, guard, guard+bar: guard and regular modules are separate bars
+    symbol = Symbol.from_modules(
+        [True, False, True, True, True],
+        guards=[False, False, True, True, False],
+        module_width=0.5,
+        module_height=10,
+        guard_factor=1.5,
+    )
+    assert symbol.rows == 1
+    assert symbol.width == 2.5
+    assert symbol.height == 15
+    assert symbol_rects(symbol) == [(0, 0, 0.5, 10), (1.0, 0, 1.0, 15), (2.0, 0, 0.5, 10)]
+    lines = symbol_hatch_lines(symbol, 0.5)
+    assert len(lines) == 4
+    assert all(p0[0] == p1[0] for p0, p1 in lines)
+
+
+def test_matrix_hatch():
+    symbol = Symbol.from_modules([[True, True], [False, True]])
+    lines = symbol_hatch_lines(symbol, 0.5)
+    assert lines == [
+        ((0, 0.25), (2, 0.25)),
+        ((2, 0.75), (0, 0.75)),
+        ((1, 1.25), (2, 1.25)),
+        ((2, 1.75), (1, 1.75)),
+    ]
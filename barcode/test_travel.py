@@ -0,0 +1,49 @@
+from meerk40t.core.geomstr import Geomstr
+from meerk40t.svgelements import Path
+
+from barcode.benchmark import measure_startup
+from barcode.travel import TravelEstimate, chain_travel, grid_order, symbol_travel
+
+
+def segments(path):
+    geometry = Geomstr.svg(Path(path))
+    return geometry.segments[: geometry.index]
+
+
+def test_symbol_travel():
+    # Second rect first: the raster order starts at the top left one
+    raster, created = symbol_travel(segments("M3,0 h1 v1 h-1 z M0,0 h1 v1 h-1 z"))
+    assert raster == (0j, 3 + 0j, 3.0)
+    assert created == (3 + 0j, 0j, 3.0)
+    # Fill lines: the raster order runs every line from the left
+    raster, created = symbol_travel(segments("M0,0 h4 M4,1 h-4"), 2, 1)
+    assert raster[2] == abs(complex(8, 1))
+    assert created[2] == 1.0
+
+
+def test_batch_travel():
+    piece = (0j, 2 + 0j, 1.0)
+    assert chain_travel([(0, 0, piece), (10, 0, piece)]) == 1 + 8 + 1
+    estimate = TravelEstimate()
+    geometry = Geomstr.svg(Path("M0,0 h4 M4,1 h-4"))
+    for x, y in [(0, 0), (10, 0), (10, 10), (0, 10)]:
+        estimate.add(geometry, x, y)
+    raster, created = estimate.result()
+    # Created in snake order, the raster order jumps back to the left
+    assert created < raster
+    assert len(estimate) == 4
+
+
+def test_grid_order():
+    positions = [(0, 0), (10, 0), (0, 10), (10, 10)]
+    # A code that ends where it starts: every other row backwards
+    square = Geomstr.svg(Path("M0,0 h1 v1 h-1 z"))
+    assert grid_order(positions, 2, square) == [0, 1, 3, 2]
+    # A code that ends on the right (like the bars of 1D codes): row by row
+    line = Geomstr.svg(Path("M0,0 h4"))
+    assert grid_order(positions, 2, line) == [0, 1, 2, 3]
+    assert grid_order(positions, 2, None) == [0, 1, 2, 3]
+
+
+def test_registration_loads_nothing_heavy():
+    assert measure_startup(repeat=1)["loaded"] == []
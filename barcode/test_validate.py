@@ -0,0 +1,91 @@
+import pytest
+
+from barcode.headless import create_kernel
+from barcode.test_jobfile import write_csv
+from barcode.validate import check_barcode, check_batch, check_qr
+
+
+def test_check_digits():
+    assert check_barcode("ean13", "590123412345") == ("590123412345", None)
+    assert check_barcode("ean13", "5901234123457") == ("5901234123457", None)
+    assert check_barcode("ean13", "5901234123450") == (
+        "5901234123457",
+        "check digit 0 corrected to 7",
+    )
+    assert check_barcode("upca", "036000291453")[0] == "036000291452"
+    assert check_barcode("ean8", "9638507")[1] is None
+    # Short codes are padded like before
+    assert check_barcode("ean14", "123")[0] == "0000000000123"
+    # Hyphens stay, unless the check digit is wrong
+    assert check_barcode("isbn10", "3-16-148410-X") == ("3-16-148410-X", None)
+    assert check_barcode("isbn10", "3-16-148410-0")[0] == "316148410X"
+    assert check_barcode("isbn", "978-3-16-148410-5")[0] == "9783161484100"
+
+
+def test_invalid_codes():
+    cases = {
+        ("ean13", "59012341234x"): "only contain digits",
+        ("ean13", "590123412345799"): "12 digits",
+        ("isbn", "9771234567003"): "978 or 979",
+        ("jan", "5901234123457"): "450-459",
+        ("code39", "A_B"): "'_'",
+        ("itf", "12a"): "'a'",
+        ("codabar", "1234"): "A, B, C or D",
+        ("code128", ""): "empty",
+    }
+    for (btype, code), reason in cases.items():
+        with pytest.raises(ValueError, match=reason):
+            check_barcode(btype, code)
+
+
+def test_qr_capacity():
+    assert check_qr("A" * 25, "L", 1) == ("A" * 25, None)
+    with pytest.raises(ValueError, match="needs version 2"):
+        check_qr("A" * 26, "L", 1)
+    with pytest.raises(ValueError, match="too long"):
+        check_qr("x" * 3000, "H")
+    with pytest.raises(ValueError, match="version"):
+        check_qr("A", "M", 41)
+
+
+def test_batch_is_all_or_nothing():
+    checked, notes, errors = check_batch(
+        ["5901234123457", "5901234123450", "12345678901234"],
+        lambda code: check_barcode("ean13", code),
+    )
+    assert checked == ["5901234123457", "5901234123457", None]
+    assert notes == [(1, "5901234123450", "check digit 0 corrected to 7")]
+    assert [index for index, code, text in errors] == [2]
+    kernel = create_kernel()
+    messages = []
+    kernel.commands["qrcode"](
+        "qrcode", messages.append, str, "1cm", "1cm", "1cm", "",
+        codes="short,{},also short,{}".format("A" * 30, "B" * 40), version=1, errcorr="L",
+    )
+    assert messages == [
+        f"Code 2 ({'A' * 30}): needs version 2 at error correction L, not 1",
+        f"Code 4 ({'B' * 40}): needs version 2 at error correction L, not 1",
+        "Nothing created, 2 invalid codes",
+    ]
+    assert kernel.elements.elem_branch.children == []
+
+
+def test_job_check(tmp_path):
+    kernel = create_kernel()
+    filename = write_csv(tmp_path / "job.csv", 5)
+    with filename.open("a") as f:
+        f.write("qr,{},1,1,20,H\nqr,X,1,1,zz,H\n".format("A" * 5000))
+    messages = []
+    kernel.commands["barcode_job"](
+        "barcode_job", messages.append, str, str(filename), wait=True, check=True
+    )
+    assert kernel.elements.elem_branch.children == []
+    assert messages == [
+        "Row 6: Invalid code {}: too long for a qr code at error correction H".format("A" * 5000),
+        "Row 7: Invalid dimensions provided",
+        "Nothing created, 2 invalid rows",
+    ]
+    kernel.commands["barcode_job"](
+        "barcode_job", messages.append, str, str(filename), wait=True, check=True, resume=8
+    )
+    assert messages[-1] == "Job done: 0 codes created, 0 invalid rows"
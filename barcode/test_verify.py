@@ -0,0 +1,103 @@
+import numpy as np
+
+from barcode.headless import create_kernel
+from barcode.test_jobfile import write_csv
+from barcode.verify import (
+    close_gaps,
+    decode_code39,
+    decode_code128,
+    decode_ean,
+    verify_code,
+)
+
+# Modules as python-barcode creates them
+EAN13 = "10100010110100111011001100100110111101001110101010110011011011001000010101110010011101000100101"
+CODE39 = "1000101110111010111010100010111010111010001011101000101011101110111010001010111010111000101011101110101000111010100010111011101"
+CODE128 = "110100100001100010100010000110100110110011001100100111011001110010111011101101100011101011"
+
+
+def widths(modules, pixels=4):
+    edges = np.flatnonzero(np.diff(np.array([int(m) for m in modules]))) + 1
+    return np.diff(np.concatenate(([0], edges, [len(modules)]))) * pixels
+
+
+def create_qr(kernel, code, **options):
+    return kernel.commands["qrcode"]("qrcode", print, str, "1cm", "1cm", "2cm", code, **options)[1]
+
+
+def test_barcode_decoders():
+    assert decode_ean(widths(EAN13)) == "5901234123457"
+    assert decode_code39(widths(CODE39), checksum=True) == "AB-12"
+    assert decode_code128(widths(CODE128)) == "Hi 42"
+    # Slightly uneven bars still read
+    uneven = widths(CODE128) + np.resize([1, -1, 0], len(widths(CODE128)))
+    assert decode_code128(uneven) == "Hi 42"
+
+
+def test_close_gaps():
+    dark = np.array([[1, 1, 0, 1, 1, 0, 0, 0, 1]], dtype=bool)
+    assert close_gaps(dark, (0, 1)).astype(int).tolist() == [[1, 1, 1, 1, 1, 0, 0, 0, 1]]
+
+
+def test_qr_roundtrip():
+    kernel = create_kernel()
+    code = "Grüße, SN-0042 ☃"
+    for options in ({}, {"outline": True}, {"hatch": "0.2mm"}, {"image": True}, {"errcorr": "H"}):
+        nodes = create_qr(kernel, code, **options)
+        assert verify_code(nodes[0]) is None, options
+    node = create_qr(kernel, "SN-0001")[0]
+    node.mkbarcode["payload"] = "SN-0002"
+    assert verify_code(node) == "reads 'SN-0001' instead of 'SN-0002'"
+
+
+def test_barcode_roundtrip():
+    kernel = create_kernel()
+    kernel.root.barcode_background = 0
+    for btype, code in (("ean13", "590123412345"), ("code39", "AB-12"), ("code128", "Hi 42")):
+        for options in ({}, {"hatch": "0.1mm"}, {"asgroup": True}, {"image": True}):
+            messages = []
+            __, nodes = kernel.commands["barcode"](
+                "barcode", messages.append, str, "1cm", "1cm", "4cm", "2cm", btype, code,
+                **options,
+            )
+            assert nodes, (btype, options, messages)
+            assert verify_code(nodes[0]) is None, (btype, options)
+    messages = []
+    kernel.commands["barcode"](
+        "barcode", messages.append, str, "1cm", "1cm", "3cm", "1cm", "code128", "SN%03d",
+        start=1, end=4,
+    )
+    # 1D codes end on the right, so the grid is created row by row
+    assert messages == [
+        "Estimated travel: 224.5mm in raster order, 224.5mm as created",
+        "Created 4 barcodes",
+    ]
+
+
+def test_verify_command():
+    kernel = create_kernel()
+    good = create_qr(kernel, "A")[0]
+    bad = create_qr(kernel, "B")[0]
+    bad.mkbarcode["payload"] = "C"
+    messages = []
+    result = kernel.commands["barcode_verify"]("barcode_verify", messages.append, str)
+    assert result == ("elements", [bad])
+    assert messages[0] == "qr=B: reads 'B' instead of 'C'"
+    assert messages[1].startswith("Verified 2 codes in ")
+    assert messages[1].endswith(", 1 failed")
+    messages.clear()
+    kernel.commands["barcode_verify"]("barcode_verify", messages.append, str, data=[good])
+    assert messages[0].endswith(", 0 failed")
+
+
+def test_job_verify(tmp_path):
+    kernel = create_kernel()
+    filename = write_csv(tmp_path / "job.csv", 5)
+    messages = []
+    kernel.commands["barcode_job"](
+        "barcode_job", messages.append, str, str(filename), wait=True, verify=True
+    )
+    assert messages[-2:] == [
+        "Job done: 5 codes created, 0 invalid rows",
+        "0 of 5 codes failed verification",
+    ]
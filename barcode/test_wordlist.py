@@ -0,0 +1,69 @@
+from barcode.headless import create_kernel
+
+
+def create_codes(kernel, template, values, **options):
+    elements = kernel.elements
+    elements.mywordlist.values.update(values)
+    kernel.commands["qrcode"]("qrcode", print, str, "1cm", "1cm", "2cm", template, **options)
+    return elements.elem_branch.flat()
+
+
+def test_changed_payload_is_updated_in_place():
+    kernel = create_kernel()
+    stats = kernel.lookup("barcode/stats")
+    nodes = create_codes(kernel, "SN-{serial}", {"serial": 1})
+    fixed = create_codes(kernel, "FIXED", {})[-1]
+    node = nodes[0]
+    matrix = node.matrix
+    assert node.mkbarcode["template"] == "SN-{serial}"
+    assert node.mkbarcode["payload"] == "SN-1"
+
+    stats.reset()
+    kernel.elements.mywordlist.values["serial"] = 2
+    kernel.elements.signal("wordlist")
+    assert kernel.elements.elem_branch.flat()[0] is node
+    assert node.label == "qr=SN-2"
+    assert node.mkbarcode["payload"] == "SN-2"
+    assert node.matrix == matrix
+    assert fixed.label == "qr=FIXED"
+    assert stats.counters["updated"] == 1
+
+    # Nothing changed, nothing to do
+    kernel.elements.signal("wordlist_modified")
+    assert stats.counters["updated"] == 1
+
+
+def test_larger_version_keeps_size():
+    kernel = create_kernel()
+    node = create_codes(kernel, "{text}", {"text": "A"}, outline=True)[0]
+    columns = node.mkbarcode["columns"]
+    width = node.matrix.a * columns
+    kernel.elements.mywordlist.values["text"] = "A" * 200
+    kernel.elements.signal("wordlist")
+    assert node.mkbarcode["columns"] > columns
+    assert abs(node.matrix.a * node.mkbarcode["columns"] - width) < 1e-6
+
+
+def test_counter_codes_ignore_unrelated_changes():
+    kernel = create_kernel()
+    stats = kernel.lookup("barcode/stats")
+    wordlist = kernel.elements.mywordlist
+    wordlist.counters["counter"] = 5
+    node = create_codes(kernel, "SN-{counter}", {"other": "A"})[0]
+    assert node.mkbarcode["payload"] == "SN-5"
+    assert wordlist.counters["counter"] == 6
+
+    stats.reset()
+    wordlist.values["other"] = "B"
+    kernel.elements.signal("wordlist")
+    assert node.mkbarcode["payload"] == "SN-5"
+    assert node.label == "qr=SN-5"
+    assert "updated" not in stats.counters
+
+    # Setting the counter is a change the code follows
+    wordlist.counters["counter"] = 20
+    kernel.elements.signal("wordlist_modified")
+    assert node.mkbarcode["payload"] == "SN-20"
+    assert stats.counters["updated"] == 1
+    kernel.elements.signal("wordlist")
+    assert stats.counters["updated"] == 1
@@ -0,0 +1,160 @@
+"""
+Estimates of the travel of the laser between the subpaths of the codes.
+
+Every subpath starts with a jump from where the last one ended, on a galvo
+that is a noticeable share of the time of a job. The estimate works on the
+geometry of the nodes (Geomstr segments, see main.shared_geometry) and
+compares the order the subpaths are created in with the raster order (top
+to bottom, left to right, every subpath entered at its top left) they would
+have without any ordering. Across a batch the codes are visited in the
+order they are created, compared with the rows of the grid.
+"""
+
+
+def _points(segments, scale_x, scale_y):
+    """
+    Start and end points of the segments, scaled to native units.
+    """
+    from meerk40t.core.geomstr import TYPE_END
+
+    segments = segments[segments[:, 2].real != TYPE_END]
+    starts = segments[:, 0]
+    ends = segments[:, 4]
+    if scale_x != 1 or scale_y != 1:
+        starts = starts.real * scale_x + 1j * starts.imag * scale_y
+        ends = ends.real * scale_x + 1j * ends.imag * scale_y
+    return starts, ends
+
+
+def _jumps(entries, exits):
+    import numpy as np
+
+    return float(np.abs(entries[1:] - exits[:-1]).sum())
+
+
+def symbol_travel(segments, scale_x=1.0, scale_y=1.0):
+    """
+    The travel inside one code.
+    @param segments: Geomstr segment array of the geometry (in use rows only)
+    @param scale_x: horizontal scale of the node matrix
+    @param scale_y: vertical scale of the node matrix
+    @return: tuple (raster, created), both (entry, exit, travel): entry and
+        exit point (complex, relative to the origin of the code) and the
+        travel between the subpaths
+    """
+    import numpy as np
+
+    starts, ends = _points(segments, scale_x, scale_y)
+    if starts.size == 0:
+        return None, None
+    created = (starts[0], ends[-1], _jumps(starts, ends))
+    # A subpath begins wherever a segment doesn't start at the last end
+    first = np.flatnonzero(np.concatenate(([True], starts[1:] != ends[:-1])))
+    last = np.concatenate((first[1:], [starts.size])) - 1
+    group = np.repeat(np.arange(first.size), np.diff(np.append(first, starts.size)))
+    # Top left point of every subpath, the first in (y, x) order
+    order = np.lexsort((starts.real, starts.imag, group))
+    top_left = starts[order[first]]
+    closed = starts[first] == ends[last]
+    # Open subpaths (fill lines) run from their left or upper end
+    head = starts[first]
+    tail = ends[last]
+    swap = (tail.real < head.real) | ((tail.real == head.real) & (tail.imag < head.imag))
+    entries = np.where(closed, top_left, np.where(swap, tail, head))
+    exits = np.where(closed, top_left, np.where(swap, head, tail))
+    raster = np.lexsort(
+        (np.minimum.reduceat(starts.real, first), np.minimum.reduceat(starts.imag, first))
+    )
+    entries = entries[raster]
+    exits = exits[raster]
+    return (entries[0], exits[-1], _jumps(entries, exits)), created
+
+
+def chain_travel(pieces):
+    """
+    The travel through a sequence of codes.
+    @param pieces: list of (x, y, (entry, exit, travel)) in the order of the job
+    @return: travel in native units
+    """
+    total = 0.0
+    last = None
+    for x, y, (entry, exit, travel) in pieces:
+        origin = complex(x, y)
+        if last is not None:
+            total += abs(origin + entry - last)
+        total += travel
+        last = origin + exit
+    return total
+
+
+def grid_order(positions, columns, geometry=None, scale_x=1.0, scale_y=1.0):
+    """
+    The order to create a grid of codes in (see batch.grid_positions): row
+    by row in alternating directions (batch.snake_order) if that is the
+    shorter travel for codes like the given one, otherwise row by row. A
+    1D code ends on the right, so the next row is better entered on the left.
+    @param positions: list of (x, y) of the codes in grid order
+    @param columns: number of codes per row
+    @param geometry: Geomstr of a code of the grid, None keeps the rows
+    @param scale_x: horizontal scale of the node matrix
+    @param scale_y: vertical scale of the node matrix
+    @return: list of indices
+    """
+    from .batch import snake_order
+
+    rows = list(range(len(positions)))
+    if geometry is None:
+        return rows
+    __, created = symbol_travel(geometry.segments[: geometry.index], scale_x, scale_y)
+    if created is None:
+        return rows
+    snake = snake_order(len(positions), columns)
+
+    def travel(order):
+        return chain_travel([(*positions[idx], created) for idx in order])
+
+    if travel(snake) < travel(rows):
+        return snake
+    return rows
+
+
+class TravelEstimate:
+    """
+    Collects the codes of one command, see main.report_travel.
+    Codes sharing their geometry (and scale) are estimated once.
+    """
+
+    def __init__(self):
+        self.raster = []
+        self.created = []
+        self._symbols = {}
+
+    def add(self, geometry, x, y, scale_x=1.0, scale_y=1.0):
+        """
+        Adds a code in the order the codes are created.
+        @param geometry: Geomstr of the node
+        """
+        key = (id(geometry), scale_x, scale_y)
+        entry = self._symbols.get(key)
+        if entry is None:
+            # The geometry is kept, so its id stays unique
+            entry = (
+                geometry,
+                symbol_travel(geometry.segments[: geometry.index], scale_x, scale_y),
+            )
+            self._symbols[key] = entry
+        raster, created = entry[1]
+        if raster is None:
+            return
+        self.raster.append((x, y, raster))
+        self.created.append((x, y, created))
+
+    def __len__(self):
+        return len(self.created)
+
+    def result(self):
+        """
+        @return: tuple (travel in raster order, travel as created), native units
+        """
+        raster = sorted(self.raster, key=lambda piece: (piece[1], piece[0]))
+        return chain_travel(raster), chain_travel(self.created)
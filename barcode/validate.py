@@ -0,0 +1,254 @@
+"""
+Validation of codes ahead of their generation.
+
+A batch used to find out about a bad code only when it came to it, with the
+codes before it already in the tree. The checks in here don't encode
+anything and don't need python-barcode: the characters and the length a
+symbology accepts, the check digit of EAN/UPC/ISBN/ISSN/PZN codes and the
+capacity of a qr code at its error correction. So a whole batch is checked
+before the first code gets created, and every invalid code is reported.
+
+The checks follow what python-barcode accepts: numeric codes shorter than
+the symbology needs are padded with leading zeros, a check digit may be
+given. python-barcode ignores a given check digit and computes its own,
+we report a wrong one as corrected.
+"""
+
+CODE39_CHARS = frozenset("0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ-. $/+%")
+# ASCII plus the function characters of python-barcode
+CODE128_CHARS = frozenset(chr(n) for n in range(128)) | frozenset("\xf1\xf2\xf3\xf4")
+CODABAR_CHARS = frozenset("0123456789-$:/.+")
+CODABAR_STARTSTOP = frozenset("ABCD")
+DIGITS = frozenset("0123456789")
+
+
+def gs1_check_digit(data):
+    """
+    Check digit of EAN, UPC, GTIN and ISBN-13: weights 3 and 1 from the right.
+    @param data: digits without check digit
+    @return: check digit as character
+    """
+    total = sum(
+        int(digit) * (3 if n % 2 == 0 else 1) for n, digit in enumerate(reversed(data))
+    )
+    return str(-total % 10)
+
+
+def isbn10_check_digit(data):
+    total = sum(n * int(digit) for n, digit in enumerate(data, start=1)) % 11
+    return "X" if total == 10 else str(total)
+
+
+def issn_check_digit(data):
+    total = -sum(n * int(digit) for n, digit in enumerate(reversed(data), start=2)) % 11
+    return "X" if total == 10 else str(total)
+
+
+def pzn_check_digit(data):
+    total = sum(n * int(digit) for n, digit in enumerate(data, start=2)) % 11
+    if total == 10:
+        raise ValueError("no valid check digit for this PZN")
+    return str(total)
+
+
+def _numeric(code, digits, check_digit, name, check_chars="0123456789"):
+    """
+    A numeric code of a fixed number of digits followed by a check digit.
+    @param check_digit: function(data) -> check digit
+    @return: tuple (code, note), note describes a corrected check digit
+    """
+    if not code:
+        raise ValueError("empty code")
+    code = code.rjust(digits, "0")
+    data = code[:digits]
+    if not set(data) <= DIGITS:
+        raise ValueError(f"{name} codes can only contain digits")
+    if len(code) > digits + 1:
+        raise ValueError(
+            f"{name} codes have {digits} digits and a check digit, not {len(code)}"
+        )
+    expected = check_digit(data)
+    if len(code) == digits:
+        return code, None
+    given = code[digits]
+    if given not in check_chars:
+        raise ValueError(f"invalid check digit {given}")
+    if given != expected:
+        return data + expected, f"check digit {given} corrected to {expected}"
+    return code, None
+
+
+def _ean13(code):
+    return _numeric(code, 12, gs1_check_digit, "EAN-13")
+
+
+def _ean8(code):
+    return _numeric(code, 7, gs1_check_digit, "EAN-8")
+
+
+def _ean14(code):
+    return _numeric(code, 13, gs1_check_digit, "EAN-14")
+
+
+def _upca(code):
+    return _numeric(code, 11, gs1_check_digit, "UPC-A")
+
+
+def _jan(code):
+    code, note = _ean13(code)
+    if not (450 <= int(code[:3]) <= 459 or 490 <= int(code[:3]) <= 499):
+        raise ValueError("JAN codes start with 450-459 or 490-499")
+    return code, note
+
+
+def _hyphenated(code, digits, check_digit, name, check_chars="0123456789"):
+    """
+    ISBN and ISSN may be written with hyphens, they stay unless the
+    check digit gets corrected.
+    """
+    result, note = _numeric(
+        code.replace("-", "").upper(), digits, check_digit, name, check_chars
+    )
+    return (code, None) if note is None else (result, note)
+
+
+def _isbn13(code):
+    result, note = _hyphenated(code, 12, gs1_check_digit, "ISBN-13")
+    digits = code.replace("-", "").rjust(12, "0")
+    if digits[:3] not in ("978", "979"):
+        raise ValueError("ISBN-13 codes start with 978 or 979")
+    if digits[:3] == "979" and digits[3] not in ("1", "8"):
+        raise ValueError("ISBN-13 codes starting with 979 continue with 1 or 8")
+    return result, note
+
+
+def _isbn10(code):
+    return _hyphenated(code, 9, isbn10_check_digit, "ISBN-10", "0123456789X")
+
+
+def _issn(code):
+    return _hyphenated(code, 7, issn_check_digit, "ISSN", "0123456789X")
+
+
+def _pzn(code):
+    return _numeric(code, 6, pzn_check_digit, "PZN")
+
+
+def _charset(chars, name):
+    def check(code):
+        if not code:
+            raise ValueError("empty code")
+        wrong = sorted(set(code) - chars)
+        if wrong:
+            raise ValueError(
+                "invalid characters for {name}: {wrong}".format(
+                    name=name, wrong=", ".join(repr(char) for char in wrong)
+                )
+            )
+        return code, None
+
+    return check
+
+
+def _code39(code):
+    # python-barcode encodes the capital letters
+    return _charset(CODE39_CHARS, "Code 39")(code.upper())
+
+
+def _itf(code):
+    return _charset(DIGITS, "ITF")(code)
+
+
+def _codabar(code):
+    if len(code) < 2:
+        raise ValueError("Codabar codes need a start and a stop character")
+    if code[0] not in CODABAR_STARTSTOP or code[-1] not in CODABAR_STARTSTOP:
+        raise ValueError("Codabar codes start and end with A, B, C or D")
+    if not set(code[1:-1]) <= CODABAR_CHARS:
+        raise ValueError("Codabar codes can only contain digits and -$:/.+")
+    return code, None
+
+
+BARCODE_CHECKS = {
+    "codabar": _codabar,
+    "code128": _charset(CODE128_CHARS, "Code 128"),
+    "code39": _code39,
+    "ean": _ean13,
+    "ean13": _ean13,
+    "ean13-guard": _ean13,
+    "ean14": _ean14,
+    "ean8": _ean8,
+    "ean8-guard": _ean8,
+    "gs1": _isbn13,
+    "gs1_128": _charset(CODE128_CHARS, "GS1-128"),
+    "gtin": _ean14,
+    "isbn": _isbn13,
+    "isbn10": _isbn10,
+    "isbn13": _isbn13,
+    "issn": _issn,
+    "itf": _itf,
+    "jan": _jan,
+    "nw-7": _codabar,
+    "pzn": _pzn,
+    "upc": _upca,
+    "upca": _upca,
+}
+
+
+def check_barcode(btype, code):
+    """
+    Checks a code for a python-barcode symbology.
+    @return: tuple (code, note): the code as it will be encoded (padded,
+        check digit corrected), note describes a correction or is None
+    @raise ValueError: with the reason if the code can't be encoded
+    """
+    check = BARCODE_CHECKS.get(btype)
+    if check is None:
+        # A symbology we have no rules for is left to python-barcode
+        return code, None
+    return check(code)
+
+
+def check_qr(code, errcorr="M", version=None):
+    """
+    Checks whether a code fits into a qr code, without encoding it.
+    @return: tuple (code, None), like check_barcode
+    @raise ValueError: with the reason if the code doesn't fit
+    """
+    from .qrengine import required_version
+
+    if code == "":
+        raise ValueError("empty code")
+    if version is not None and not 1 <= version <= 40:
+        raise ValueError(f"invalid version {version}, use 1..40")
+    needed = required_version(code, errcorr)
+    if needed is None:
+        raise ValueError(f"too long for a qr code at error correction {errcorr}")
+    if version is not None and needed > version:
+        raise ValueError(
+            f"needs version {needed} at error correction {errcorr}, not {version}"
+        )
+    return code, None
+
+
+def check_batch(codes, check):
+    """
+    Checks all codes of a batch in one pass.
+    @param check: function(code) -> (code, note), raising ValueError for invalid codes
+    @return: tuple (checked codes, notes, errors); notes and errors are
+        lists of (index, code, text), checked has None for invalid codes
+    """
+    checked = []
+    notes = []
+    errors = []
+    for index, code in enumerate(codes):
+        try:
+            result, note = check(code)
+        except ValueError as e:
+            errors.append((index, code, str(e)))
+            checked.append(None)
+            continue
+        if note is not None:
+            notes.append((index, code, note))
+        checked.append(result)
+    return checked, notes, errors
@@ -0,0 +1,811 @@
+"""
+Round trip verification of the created codes.
+
+The nodes of a code are rasterized into a numpy array and decoded again,
+the way a scanner reads them: the bars of a 1D code along a scanline
+through the middle of the bars, a qr code by sampling the centers of its modules. The
+decoded text is compared with the payload the code was created for.
+
+All output styles become vertical edges with a winding direction (the
+outlines of a path, rect nodes, hatch lines as rectangles of their stroke
+width), a difference array of the edges summed up along both axes gives the
+winding number of every pixel. Images are read as they are. The resolution
+follows the narrowest feature of the code, so a few thousand small codes
+are verified per second.
+
+Nodes have to be axis-aligned (as created), rotated codes aren't verified.
+Decoding needs no python-barcode: the tables in here are the ones of the
+symbology standards, the qr code reuses the function patterns and the
+block structure of qrengine.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+# Pixels across the narrowest bar, space or module
+PIXELS_PER_FEATURE = 4
+# Rasters larger than this are not worth verifying (or not created by us)
+MAX_PIXELS = 16_000_000
+
+# EAN/UPC: L codes, G codes are the reversed R codes, R codes the inverted L codes
+EAN_L = (
+    "0001101",
+    "0011001",
+    "0010011",
+    "0111101",
+    "0100011",
+    "0110001",
+    "0101111",
+    "0111011",
+    "0110111",
+    "0001011",
+)
+EAN_R = tuple(code.translate(str.maketrans("01", "10")) for code in EAN_L)
+EAN_G = tuple(code[::-1] for code in EAN_R)
+# Parity of the six left digits of an EAN-13, indexed by the leading digit
+EAN_PARITY = (
+    "LLLLLL",
+    "LLGLGG",
+    "LLGGLG",
+    "LLGGGL",
+    "LGLLGG",
+    "LGGLLG",
+    "LGGGLL",
+    "LGLGLG",
+    "LGLGGL",
+    "LGGLGL",
+)
+EAN_LEFT = {code: (digit, "L") for digit, code in enumerate(EAN_L)}
+EAN_LEFT.update({code: (digit, "G") for digit, code in enumerate(EAN_G)})
+EAN_RIGHT = {code: digit for digit, code in enumerate(EAN_R)}
+
+# Wide elements of the digits 0..9 in 2 of 5 codes (ITF, the bars of Code 39)
+TWO_OF_FIVE = ("00110", "10001", "01001", "11000", "00101", "10100", "01100", "00011", "10010", "01010")
+
+CODE39_CHARS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ-. $/+%"
+
+# Code 128: bar and space widths in modules of the values 0..105
+CODE128 = (
+    "212222", "222122", "222221", "121223", "121322", "131222", "122213", "122312",
+    "132212", "221213", "221312", "231212", "112232", "122132", "122231", "113222",
+    "123122", "123221", "223211", "221132", "221231", "213212", "223112", "312131",
+    "311222", "321122", "321221", "312212", "322112", "322211", "212123", "212321",
+    "232121", "111323", "131123", "131321", "112313", "132113", "132311", "211313",
+    "231113", "231311", "112133", "112331", "132131", "113123", "113321", "133121",
+    "313121", "211331", "231131", "213113", "213311", "213131", "311123", "311321",
+    "331121", "312113", "312311", "332111", "314111", "221411", "431111", "111224",
+    "111422", "121124", "121421", "141122", "141221", "112214", "112412", "122114",
+    "122411", "142112", "142211", "241211", "221114", "413111", "241112", "134111",
+    "111242", "121142", "121241", "114212", "124112", "124211", "411212", "421112",
+    "421211", "212141", "214121", "412121", "111143", "111341", "131141", "114113",
+    "114311", "411113", "411311", "113141", "114131", "311141", "411131", "211412",
+    "211214", "211232",
+)  # fmt: skip
+CODE128_VALUES = {widths: value for value, widths in enumerate(CODE128)}
+CODE128_STOP = "2331112"
+CODE128_START = {103: "A", 104: "B", 105: "C"}
+# Function characters, as python-barcode writes them
+FNC1, FNC2, FNC3, FNC4 = "\xf1", "\xf2", "\xf3", "\xf4"
+
+# Codabar: wide elements of the 4 bars and 3 spaces of every character
+CODABAR = {
+    "0000011": "0",
+    "0000110": "1",
+    "0001001": "2",
+    "1100000": "3",
+    "0010010": "4",
+    "1000010": "5",
+    "0100001": "6",
+    "0100100": "7",
+    "0110000": "8",
+    "1001000": "9",
+    "0001100": "-",
+    "0011000": "$",
+    "1000101": ":",
+    "1010001": "/",
+    "1010100": ".",
+    "0010101": "+",
+    "0011010": "A",
+    "0101001": "B",
+    "0001011": "C",
+    "0001110": "D",
+}
+
+
+def _code39_table():
+    """
+    Code 39 characters by their wide elements (5 bars, 4 spaces).
+    The bars follow 2 of 5 for 1..9, 0, the wide space selects the group of
+    ten; $ / + % have three wide spaces and no wide bar.
+    """
+    bars = TWO_OF_FIVE[1:] + TWO_OF_FIVE[:1]
+    groups = ("1234567890", "ABCDEFGHIJ", "KLMNOPQRST", "UVWXYZ-. *")
+    spaces = ("0100", "0010", "0001", "1000")
+    extra = {"$": "1110", "/": "1101", "+": "1011", "%": "0111"}
+
+    def interleave(bar, space):
+        return "".join(b + s for b, s in zip(bar, space)) + bar[-1]
+
+    table = {}
+    for chars, space in zip(groups, spaces):
+        for char, bar in zip(chars, bars):
+            table[interleave(bar, space)] = char
+    for char, space in extra.items():
+        table[interleave("00000", space)] = char
+    return table
+
+
+CODE39 = _code39_table()
+
+
+# ---------------------------------------------------------------- rasterizing
+
+
+def _transform(node):
+    """
+    @return: (a, d, e, f) of an axis-aligned node matrix
+    @raise ValueError: for rotated or skewed nodes
+    """
+    matrix = node.matrix
+    if abs(matrix.b) > 1e-9 or abs(matrix.c) > 1e-9:
+        raise ValueError("rotated codes can't be verified")
+    return matrix.a, matrix.d, matrix.e, matrix.f
+
+
+def _rect_edges(x0, y0, x1, y1):
+    """
+    Vertical edges of rectangles (arrays), all in the same direction.
+    """
+    left = np.minimum(x0, x1)
+    right = np.maximum(x0, x1)
+    top = np.minimum(y0, y1)
+    bottom = np.maximum(y0, y1)
+    ones = np.ones(left.size, dtype=np.int32)
+    return (
+        np.concatenate((left, right)),
+        np.concatenate((top, top)),
+        np.concatenate((bottom, bottom)),
+        np.concatenate((-ones, ones)),
+    )
+
+
+def _stroked(node):
+    """
+    Fill lines: a path burnt along its segments, not filled.
+    """
+    return getattr(node, "fill", None) is None and getattr(node, "stroke_width", 0) > 0
+
+
+def node_edges(node, line_x=0.0, line_y=0.0):
+    """
+    The dark areas of a path node as vertical edges in scene units.
+    @param line_x: smallest width of vertical fill lines, thinner ones get this width
+    @param line_y: the same for horizontal fill lines
+    @return: tuple of arrays (x, top, bottom, direction)
+    """
+    from meerk40t.core.geomstr import TYPE_LINE
+
+    a, d, e, f = _transform(node)
+    geometry = node.geometry
+    segments = geometry.segments[: geometry.index]
+    segments = segments[segments[:, 2].real == TYPE_LINE]
+    starts = segments[:, 0]
+    ends = segments[:, 4]
+    sx = a * starts.real + e
+    sy = d * starts.imag + f
+    ex = a * ends.real + e
+    ey = d * ends.imag + f
+    if _stroked(node):
+        # Fill lines burn a rectangle of their stroke width
+        vertical = starts.real == ends.real
+        grow_x = np.where(vertical, max(node.stroke_width, line_x) / 2, 0)
+        grow_y = np.where(vertical, 0, max(node.stroke_width, line_y) / 2)
+        return _rect_edges(
+            np.minimum(sx, ex) - grow_x,
+            np.minimum(sy, ey) - grow_y,
+            np.maximum(sx, ex) + grow_x,
+            np.maximum(sy, ey) + grow_y,
+        )
+    vertical = (starts.real == ends.real) & (starts.imag != ends.imag)
+    sy = sy[vertical]
+    ey = ey[vertical]
+    return (
+        sx[vertical],
+        np.minimum(sy, ey),
+        np.maximum(sy, ey),
+        np.where(ey > sy, 1, -1).astype(np.int32),
+    )
+
+
+def nodes_edges(nodes, line_x=0.0, line_y=0.0):
+    """
+    The edges of all rect and path nodes, the rects (the bars of a group)
+    in one go.
+    """
+    rects = []
+    parts = []
+    for node in nodes:
+        if node.type == "elem rect":
+            a, d, e, f = _transform(node)
+            rects.append((a * node.x + e, d * node.y + f, a * node.width, d * node.height))
+        elif node.type == "elem path":
+            parts.append(node_edges(node, line_x, line_y))
+    if rects:
+        x, y, width, height = np.array(rects).T
+        parts.append(_rect_edges(x, y, x + width, y + height))
+    if not parts:
+        raise ValueError("nothing to verify")
+    return tuple(np.concatenate(arrays) for arrays in zip(*parts))
+
+
+def _feature(values, gap=0.0):
+    """
+    The smallest distance between two different coordinates.
+    @param gap: distances up to this size don't count
+    """
+    distances = np.diff(np.unique(np.round(values, 3)))
+    distances = distances[distances > gap * 1.01]
+    if distances.size == 0:
+        raise ValueError("nothing to verify")
+    return float(distances.min())
+
+
+def close_gaps(dark, sizes):
+    """
+    Closes light gaps between dark pixels, along both axes: fill lines are
+    spread over a band, their distance may be a bit more than the line
+    width, the beam burns the gaps anyway.
+    @param sizes: (rows, columns), the widest gaps to close in pixels
+    """
+    for axis, size in enumerate(sizes):
+        radius = (size + 1) // 2
+        dark = ~_spread(~_spread(dark, radius, axis), radius, axis)
+    return dark
+
+
+def _spread(dark, radius, axis):
+    """
+    Dilation along an axis: dark if any pixel within radius is dark.
+    """
+    if radius == 0:
+        return dark
+    counts = np.cumsum(dark, axis=axis, dtype=np.int32)
+    counts = np.concatenate(
+        (np.zeros_like(counts.take([0], axis=axis)), counts), axis=axis
+    )
+    length = dark.shape[axis]
+    upper = np.minimum(np.arange(length) + radius + 1, length)
+    lower = np.maximum(np.arange(length) - radius, 0)
+    return (counts.take(upper, axis=axis) - counts.take(lower, axis=axis)) > 0
+
+
+def rasterize(edges, pixel_x=None, pixel_y=None):
+    """
+    Rasterizes vertical edges with the nonzero rule, a pixel is dark if
+    its center lies inside.
+    @param edges: tuple of arrays (x, top, bottom, direction), see node_edges
+    @param pixel_x: pixel width, default: a fraction of the narrowest feature
+    @param pixel_y: pixel height, default: a fraction of the lowest feature
+    @return: boolean array (rows, columns), True for dark pixels
+    """
+    x, top, bottom, direction = edges
+    if x.size == 0:
+        raise ValueError("nothing to verify")
+    if pixel_x is None:
+        pixel_x = _feature(x) / PIXELS_PER_FEATURE
+    if pixel_y is None:
+        pixel_y = _feature(np.concatenate((top, bottom))) / PIXELS_PER_FEATURE
+    left = x.min()
+    upper = top.min()
+    width = int(np.ceil((x.max() - left) / pixel_x))
+    height = int(np.ceil((bottom.max() - upper) / pixel_y))
+    if width * height > MAX_PIXELS:
+        raise ValueError("too large to verify")
+    cols = np.ceil((x - left) / pixel_x - 0.5).astype(np.intp)
+    row0 = np.ceil((top - upper) / pixel_y - 0.5).astype(np.intp)
+    row1 = np.ceil((bottom - upper) / pixel_y - 0.5).astype(np.intp)
+    winding = np.zeros((height + 1, width + 1), dtype=np.int32)
+    np.add.at(winding, (row0, cols), direction)
+    np.add.at(winding, (row1, cols), -direction)
+    np.cumsum(winding, axis=0, out=winding)
+    np.cumsum(winding, axis=1, out=winding)
+    return winding[:height, :width] != 0
+
+
+def raster(nodes):
+    """
+    The dark pixels of the nodes showing a code (the bars or modules, no text).
+    An image node is taken as it is.
+    @return: boolean array, True for dark pixels
+    """
+    nodes = list(nodes)
+    if len(nodes) == 1 and nodes[0].type == "elem image":
+        _transform(nodes[0])
+        return ~np.asarray(nodes[0].image.convert("1"))
+    edges = nodes_edges(nodes)
+    # Fill lines leave gaps narrower than a line between each other
+    gap = max((node.stroke_width for node in nodes if _stroked(node)), default=0.0)
+    if not gap:
+        return rasterize(edges)
+    # Along the lines the only features are the lines, there the pixels
+    # follow the features across them
+    features = []
+    for values in (edges[0], np.concatenate(edges[1:3])):
+        try:
+            features.append(_feature(values, gap) / PIXELS_PER_FEATURE)
+        except ValueError:
+            features.append(None)
+    if features == [None, None]:
+        raise ValueError("nothing to verify")
+    pixel_x, pixel_y = (pixel or min(filter(None, features)) for pixel in features)
+    # Lines thinner than a pixel would fall between the pixel centers
+    edges = nodes_edges(nodes, pixel_x, pixel_y)
+    dark = rasterize(edges, pixel_x, pixel_y)
+    # Lines are at most a line apart, up to half a line of gap
+    return close_gaps(
+        dark, (int(np.ceil(gap / 2 / pixel_y)), int(np.ceil(gap / 2 / pixel_x)))
+    )
+
+
+# ------------------------------------------------------------------ 1D codes
+
+
+def scanline(dark):
+    """
+    The element widths along the middle row of the bars.
+    @return: integer array of widths in pixels, starting and ending with a bar
+    """
+    rows = np.flatnonzero(dark.any(axis=1))
+    if rows.size == 0:
+        raise ValueError("no bars found")
+    row = dark[(rows[0] + rows[-1]) // 2]
+    dark_columns = np.flatnonzero(row)
+    if dark_columns.size == 0:
+        raise ValueError("no bars found")
+    row = row[dark_columns[0] : dark_columns[-1] + 1]
+    edges = np.flatnonzero(row[1:] != row[:-1]) + 1
+    return np.diff(np.concatenate(([0], edges, [row.size])))
+
+
+def _modules(widths, count):
+    """
+    Element widths in modules, for a symbol of count modules.
+    """
+    modules = np.rint(widths * (count / widths.sum())).astype(int)
+    if modules.min() < 1 or modules.sum() != count:
+        raise ValueError("unreadable bars")
+    return modules
+
+
+def _bits(modules):
+    return "".join(("1" if idx % 2 == 0 else "0") * int(m) for idx, m in enumerate(modules))
+
+
+def _wide(widths):
+    """
+    Tells wide from narrow elements.
+    @return: string of 0 (narrow) and 1 (wide)
+    """
+    narrow = widths.min()
+    threshold = (narrow + widths.max()) / 2
+    if widths.max() < 1.5 * narrow:
+        raise ValueError("no wide elements found")
+    return "".join("1" if w > threshold else "0" for w in widths.tolist())
+
+
+def decode_ean(widths):
+    """
+    EAN-13, EAN-8 and the other EAN-like layouts python-barcode creates:
+    guard, left digits (the parity of six of them gives a leading digit),
+    center guard, right digits, guard.
+    @return: digits
+    """
+    digits = (len(widths) - 11) / 4
+    if digits < 1 or digits != int(digits):
+        raise ValueError("no EAN/UPC symbol")
+    bits = _bits(_modules(widths, 11 + 7 * int(digits)))
+    if not bits.startswith("101") or not bits.endswith("101"):
+        raise ValueError("EAN guard bars missing")
+    pos = 3
+    left = []
+    parity = ""
+    while bits[pos : pos + 5] != "01010":
+        digit = EAN_LEFT.get(bits[pos : pos + 7])
+        if digit is None:
+            raise ValueError("invalid EAN digit")
+        left.append(str(digit[0]))
+        parity += digit[1]
+        pos += 7
+    pos += 5
+    right = []
+    while pos < len(bits) - 3:
+        digit = EAN_RIGHT.get(bits[pos : pos + 7])
+        if digit is None:
+            raise ValueError("invalid EAN digit")
+        right.append(str(digit))
+        pos += 7
+    text = "".join(left + right)
+    if len(left) == 6:
+        if parity not in EAN_PARITY:
+            raise ValueError("invalid EAN parity")
+        text = str(EAN_PARITY.index(parity)) + text
+    elif "G" in parity:
+        raise ValueError("invalid EAN parity")
+    if len(text) in (8, 13):
+        from .validate import gs1_check_digit
+
+        if gs1_check_digit(text[:-1]) != text[-1]:
+            raise ValueError("wrong EAN check digit")
+    return text
+
+
+def decode_upc(widths):
+    """
+    UPC-A is an EAN-13 with a leading 0.
+    """
+    text = decode_ean(widths)
+    if len(text) != 13 or text[0] != "0":
+        raise ValueError("no UPC-A symbol")
+    return text[1:]
+
+
+def decode_code39(widths, checksum=False):
+    """
+    @param checksum: the last character is a modulo 43 check character
+    """
+    if (len(widths) + 1) % 10:
+        raise ValueError("no Code 39 symbol")
+    wide = _wide(widths)
+    chars = []
+    for idx in range(0, len(wide), 10):
+        char = CODE39.get(wide[idx : idx + 9])
+        if char is None:
+            raise ValueError("invalid Code 39 character")
+        chars.append(char)
+    if len(chars) < 2 or chars[0] != "*" or chars[-1] != "*":
+        raise ValueError("Code 39 start/stop character missing")
+    text = "".join(chars[1:-1])
+    if checksum:
+        if not text:
+            raise ValueError("Code 39 check character missing")
+        total = sum(CODE39_CHARS.index(char) for char in text[:-1]) % 43
+        if CODE39_CHARS[total] != text[-1]:
+            raise ValueError("wrong Code 39 check character")
+        text = text[:-1]
+    return text
+
+
+def decode_code128(widths):
+    """
+    Code 128 with all three code sets, shift and the function characters.
+    """
+    chars = (len(widths) - 7) / 6
+    if chars < 2 or chars != int(chars):
+        raise ValueError("no Code 128 symbol")
+    chars = int(chars)
+    modules = "".join(str(m) for m in _modules(widths, 11 * chars + 13).tolist())
+    if modules[-7:] != CODE128_STOP:
+        raise ValueError("Code 128 stop character missing")
+    values = []
+    for idx in range(0, 6 * chars, 6):
+        value = CODE128_VALUES.get(modules[idx : idx + 6])
+        if value is None:
+            raise ValueError("invalid Code 128 character")
+        values.append(value)
+    if values[0] not in CODE128_START:
+        raise ValueError("Code 128 start character missing")
+    checksum = (values[0] + sum(idx * v for idx, v in enumerate(values[1:-1], start=1))) % 103
+    if checksum != values[-1]:
+        raise ValueError("wrong Code 128 check character")
+    codeset = CODE128_START[values[0]]
+    shift = False
+    text = []
+    for value in values[1:-1]:
+        current = codeset
+        if shift:
+            current = "B" if codeset == "A" else "A"
+            shift = False
+        if current == "C":
+            if value < 100:
+                text.append(f"{value:02d}")
+            elif value == 102:
+                text.append(FNC1)
+            else:
+                codeset = "B" if value == 100 else "A"
+            continue
+        if value < 64:
+            text.append(chr(value + 32))
+        elif value < 96:
+            text.append(chr(value - 64) if current == "A" else chr(value + 32))
+        elif value == 96:
+            text.append(FNC3)
+        elif value == 97:
+            text.append(FNC2)
+        elif value == 98:
+            shift = True
+        elif value == 99:
+            codeset = "C"
+        elif value == 102:
+            text.append(FNC1)
+        elif (value == 101) == (current == "A"):
+            text.append(FNC4)
+        else:
+            codeset = "B" if current == "A" else "A"
+    return "".join(text)
+
+
+def decode_itf(widths):
+    """
+    Interleaved 2 of 5: pairs of digits, one in the bars, one in the spaces.
+    """
+    if (len(widths) - 7) % 10 or len(widths) < 17:
+        raise ValueError("no ITF symbol")
+    wide = _wide(widths)
+    if wide[:4] != "0000" or wide[-3:] != "100":
+        raise ValueError("ITF start/stop pattern missing")
+    digits = []
+    for idx in range(4, len(wide) - 3, 10):
+        pair = wide[idx : idx + 10]
+        for pattern in (pair[0::2], pair[1::2]):
+            if pattern not in TWO_OF_FIVE:
+                raise ValueError("invalid ITF digit")
+            digits.append(str(TWO_OF_FIVE.index(pattern)))
+    return "".join(digits)
+
+
+def decode_codabar(widths):
+    if (len(widths) + 1) % 8:
+        raise ValueError("no Codabar symbol")
+    wide = _wide(widths)
+    chars = []
+    for idx in range(0, len(wide), 8):
+        char = CODABAR.get(wide[idx : idx + 7])
+        if char is None:
+            raise ValueError("invalid Codabar character")
+        chars.append(char)
+    if chars[0] not in "ABCD" or chars[-1] not in "ABCD" or len(chars) < 2:
+        raise ValueError("Codabar start/stop character missing")
+    return "".join(chars)
+
+
+def _ean_expected(digits, prefix="", suffix=""):
+    def expected(code):
+        from .validate import gs1_check_digit
+
+        data = prefix + code.replace("-", "").rjust(digits, "0")[:digits] + suffix
+        return data + gs1_check_digit(data)
+
+    return expected
+
+
+def _pzn_expected(code):
+    from .validate import pzn_check_digit
+
+    data = code.rjust(6, "0")[:6]
+    return "PZN-" + data + pzn_check_digit(data)
+
+
+def _code39_decoder(widths):
+    return decode_code39(widths, checksum=True)
+
+
+# Symbology: (decoder, function(payload) -> text the code has to contain),
+# following what python-barcode encodes for a payload
+BARCODE_DECODERS = {
+    "codabar": (decode_codabar, str),
+    "code128": (decode_code128, str),
+    "code39": (_code39_decoder, str.upper),
+    "ean": (decode_ean, _ean_expected(12)),
+    "ean13": (decode_ean, _ean_expected(12)),
+    "ean13-guard": (decode_ean, _ean_expected(12)),
+    "ean14": (decode_ean, _ean_expected(13)),
+    "ean8": (decode_ean, _ean_expected(7)),
+    "ean8-guard": (decode_ean, _ean_expected(7)),
+    "gs1": (decode_ean, _ean_expected(12)),
+    "gs1_128": (decode_code128, lambda code: FNC1 + code),
+    "gtin": (decode_ean, _ean_expected(13)),
+    "isbn": (decode_ean, _ean_expected(12)),
+    "isbn10": (decode_ean, _ean_expected(9, "978")),
+    "isbn13": (decode_ean, _ean_expected(12)),
+    "issn": (decode_ean, _ean_expected(7, "977", "00")),
+    "itf": (decode_itf, lambda code: code if len(code) % 2 == 0 else "0" + code),
+    "jan": (decode_ean, _ean_expected(12)),
+    "nw-7": (decode_codabar, str),
+    "pzn": (decode_code39, _pzn_expected),
+    "upc": (decode_upc, _ean_expected(11)),
+    "upca": (decode_upc, _ean_expected(11)),
+}
+
+
+# ------------------------------------------------------------------- qr codes
+
+
+@lru_cache(maxsize=None)
+def _format_table():
+    """
+    All 32 format informations: 15 bit word -> (error correction, mask)
+    """
+    from .qrengine import ERROR_LEVELS, _bch_type_info
+
+    return {
+        _bch_type_info((indicator << 3) | mask): (level, mask)
+        for level, (indicator, __) in ERROR_LEVELS.items()
+        for mask in range(8)
+    }
+
+
+def qr_modules(dark):
+    """
+    Samples the modules of a qr code (without quiet zone) from its raster.
+    The module size follows from the top left finder pattern, 7 modules wide.
+    @return: boolean module matrix
+    """
+    rows = np.flatnonzero(dark.any(axis=1))
+    cols = np.flatnonzero(dark.any(axis=0))
+    if rows.size == 0:
+        raise ValueError("no qr code found")
+    dark = dark[rows[0] : rows[-1] + 1, cols[0] : cols[-1] + 1]
+    height, width = dark.shape
+    first_row = dark[0]
+    finder = int(np.argmin(first_row)) if not first_row.all() else width
+    count = width * 7 / finder
+    version = int(round((count - 17) / 4))
+    if not 1 <= version <= 40:
+        raise ValueError("no qr code found")
+    count = version * 4 + 17
+    centers = (np.arange(count) + 0.5) / count
+    return dark[
+        (centers * height).astype(np.intp)[:, None], (centers * width).astype(np.intp)
+    ]
+
+
+def decode_qr(modules):
+    """
+    Decodes a qr code from its modules: format information, unmasking, the
+    codewords of all blocks (the error correction codewords have to match,
+    no errors are corrected) and the numeric, alphanumeric and byte segments.
+    @return: text (utf-8)
+    """
+    from .qrengine import (
+        ALPHA_NUM,
+        MODE_8BIT_BYTE,
+        MODE_ALPHA_NUM,
+        MODE_NUMBER,
+        MODE_SIZES,
+        _format_positions,
+        _masks,
+        _size_class,
+        _template,
+        rs_blocks,
+        rs_encode,
+    )
+
+    count = modules.shape[0]
+    version = (count - 17) // 4
+    vertical, horizontal = _format_positions(count)
+    level = mask = None
+    for positions in (vertical, horizontal):
+        word = sum(int(modules[pos]) << idx for idx, pos in enumerate(positions))
+        best = min(_format_table(), key=lambda valid: bin(valid ^ word).count("1"))
+        if bin(best ^ word).count("1") <= 3:
+            level, mask = _format_table()[best]
+            break
+    if level is None:
+        raise ValueError("unreadable format information")
+    __, reserved, rows, cols = _template(version)
+    bits = modules[rows, cols] ^ _masks(count)[mask][rows, cols]
+    blocks = rs_blocks(version, level)
+    total = sum(tc for tc, dc in blocks)
+    words = np.packbits(bits[: 8 * total])
+    # Undo the interleaving: data codewords column by column, then the
+    # error correction codewords
+    max_dc = max(dc for tc, dc in blocks)
+    ec_count = blocks[0][0] - blocks[0][1]
+    data = np.zeros((len(blocks), max_dc), dtype=np.uint8)
+    offset = 0
+    for col in range(max_dc):
+        for idx, (tc, dc) in enumerate(blocks):
+            if col < dc:
+                data[idx, col] = words[offset]
+                offset += 1
+    ec = words[offset:].reshape(ec_count, len(blocks)).T
+    # Shorter blocks get a leading 0 for the division, like in qrengine
+    padded = np.zeros_like(data)
+    for idx, (tc, dc) in enumerate(blocks):
+        padded[idx, max_dc - dc :] = data[idx, :dc]
+    if not np.array_equal(rs_encode(padded, ec_count), ec):
+        raise ValueError("qr code has errors")
+    stream = np.unpackbits(
+        np.concatenate([data[idx, :dc] for idx, (tc, dc) in enumerate(blocks)])
+    )
+    value = int.from_bytes(np.packbits(stream).tobytes(), "big")
+    length = stream.size
+    pos = 0
+
+    def read(bits):
+        nonlocal pos
+        if pos + bits > length:
+            raise ValueError("qr data ends early")
+        pos += bits
+        return (value >> (length - pos)) & ((1 << bits) - 1)
+
+    sizes = MODE_SIZES[_size_class(version)]
+    result = bytearray()
+    while length - pos >= 4:
+        mode = read(4)
+        if mode == 0:
+            break
+        if mode not in sizes:
+            raise ValueError(f"unsupported qr mode {mode}")
+        chars = read(sizes[mode])
+        if mode == MODE_NUMBER:
+            while chars > 0:
+                digits = min(3, chars)
+                result += str(read({3: 10, 2: 7, 1: 4}[digits])).zfill(digits).encode()
+                chars -= digits
+        elif mode == MODE_ALPHA_NUM:
+            while chars > 1:
+                pair = read(11)
+                result += bytes((ALPHA_NUM[pair // 45], ALPHA_NUM[pair % 45]))
+                chars -= 2
+            if chars:
+                result += bytes((ALPHA_NUM[read(6)],))
+        elif mode == MODE_8BIT_BYTE:
+            result += bytes(read(8) for __ in range(chars))
+    try:
+        return result.decode("utf-8")
+    except UnicodeDecodeError:
+        raise ValueError("qr data is no utf-8 text") from None
+
+
+# --------------------------------------------------------------------- codes
+
+
+def bar_nodes(node):
+    """
+    The nodes showing the bars or modules of a code: its path, image or
+    rects, without the human readable text.
+    """
+    if node.type != "group":
+        return [node]
+    return [
+        child
+        for child in node.children
+        if child.type in ("elem rect", "elem image")
+        or (child.type == "elem path" and not str(child.label).startswith("text="))
+    ]
+
+
+def decode_code(nodes, params):
+    """
+    Reads a code back from its nodes.
+    @param params: generation parameters of the code (mkbarcode)
+    @return: tuple (decoded text, text the code has to contain)
+    @raise ValueError: if the code can't be read
+    """
+    dark = raster(nodes)
+    if params["command"] == "qrcode":
+        return decode_qr(qr_modules(dark)), params["payload"]
+    decoder = BARCODE_DECODERS.get(params["btype"])
+    if decoder is None:
+        raise ValueError(f"no decoder for {params['btype']}")
+    decode, expected = decoder
+    return decode(scanline(dark)), expected(params["payload"])
+
+
+def verify_code(node, params=None):
+    """
+    Verifies a code created by the qrcode or barcode command.
+    @param node: the node carrying the generation parameters (group, path or image)
+    @return: None if the code reads back as its payload, otherwise the reason
+    """
+    if params is None:
+        params = node.mkbarcode
+    try:
+        decoded, expected = decode_code(bar_nodes(node), params)
+    except ValueError as e:
+        return str(e)
+    if decoded != expected:
+        return f"reads {decoded!r} instead of {expected!r}"
+    return None
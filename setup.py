@@ -1,8 +1,12 @@
-from setuptools import setup
-setup(
-    install_requires=[
-        "meerk40t>=0.7",
-        "qrcode>=7.0"
-        "python-barcode>=0.10"
-    ],
-)
\ No newline at end of file
+from setuptools import setup
+setup(
+    install_requires=[
+        "meerk40t>=0.7",
+        "python-barcode>=0.10",
+        "numpy",
+    ],
+    extras_require={
+        # The tests compare the native qr encoder with the qrcode library
+        "test": ["qrcode>=7.0", "pytest"],
+    },
+)